@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Mede a montagem das listas de dimensoes (subcategorias/produtos) de
+aggregated.json: o laco anterior com mascaras booleanas por
+(categoria, subcategoria) contra AggregationAccumulator.result(), que usa
+build_dimension_tree (uma passada pelas celulas do cubo).
+
+Os registros sao sinteticos; o numero de registros e o tamanho do catalogo
+crescem juntos para mostrar que result() permanece linear.
+
+Uso: python scripts/benchmarks/dimension_tree.py [--scales 1 10 100]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import preprocess_data as pp  # noqa: E402
+
+# Tamanho aproximado do corpus atual
+BASE_RECORDS = 35000
+BASE_CATEGORIES = 10
+BASE_SUBCATEGORIES = 5
+BASE_PRODUCTS = 6
+
+
+def legacy_dimension_tree(df):
+    """Implementacao anterior: O(categorias x subcategorias x registros)"""
+    categorias = sorted(df['categoria'].unique().tolist())
+    subcategorias = {}
+    for cat in categorias:
+        subcategorias[cat] = sorted(df[df['categoria'] == cat]['subcategoria'].unique().tolist())
+
+    produtos = {}
+    for cat in categorias:
+        produtos[cat] = {}
+        for subcat in subcategorias.get(cat, []):
+            produtos[cat][subcat] = sorted(
+                df[(df['categoria'] == cat) & (df['subcategoria'] == subcat)]['produto'].unique().tolist()
+            )
+    return subcategorias, produtos
+
+
+def synthetic_records(scale, seed=0):
+    """Registros sinteticos; catalogo cresce com a raiz da escala"""
+    rng = np.random.default_rng(seed)
+    n = int(BASE_RECORDS * scale)
+    growth = max(1, int(round(np.sqrt(scale))))
+    n_cat = BASE_CATEGORIES * growth
+    n_sub = BASE_SUBCATEGORIES * growth
+    n_prod = BASE_PRODUCTS
+
+    cat = rng.integers(0, n_cat, n).tolist()
+    sub = rng.integers(0, n_sub, n).tolist()
+    prod = rng.integers(0, n_prod, n).tolist()
+    mes = rng.integers(1, 13, n).tolist()
+    preco = rng.uniform(10, 500, n).tolist()
+    records = pp.RecordStore()
+    for c, s, p, m, v in zip(cat, sub, prod, mes, preco):
+        records.append(2020, m, 'Regiao', f"Categoria {c:04d}", f"Subcategoria {s:04d}",
+                       f"Produto {c}-{s}-{p}", 'm3', v)
+    return records, n_cat * n_sub
+
+
+def timed(func, arg, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-legacy-above', type=float, default=16,
+                        help="nao executa a versao anterior acima desta escala")
+    args = parser.parse_args()
+
+    print(f"{'escala':>7}{'registros':>12}{'celulas':>10}{'pares cat/sub':>15}"
+          f"{'anterior (s)':>14}{'result() (s)':>14}{'ns/registro':>13}")
+    for scale in args.scales:
+        records, pairs = synthetic_records(scale)
+        acc = pp.AggregationAccumulator()
+        acc.update(records)
+        t_new, new = timed(lambda a: a.result(), acc, args.repeat)
+        if scale <= args.skip_legacy_above:
+            t_old, old = timed(legacy_dimension_tree, records.to_dataframe(), 1)
+            assert old == (new['subcategorias'], new['produtos']), "resultados divergentes"
+            old_txt = f"{t_old:>14.3f}"
+        else:
+            old_txt = f"{'-':>14}"
+        print(f"{scale:>7g}{len(records):>12}{len(acc.cells):>10}{pairs:>15}{old_txt}"
+              f"{t_new:>14.3f}{t_new / len(records) * 1e9:>13.0f}")
+
+if __name__ == '__main__':
+    main()
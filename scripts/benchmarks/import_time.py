@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Mede o tempo de inicializacao dos scripts do pipeline (import do modulo e
+'--help'), com a lista das importacoes mais caras segundo python -X importtime.
+Com --budget-ms, termina com codigo 1 se algum import exceder o limite.
+
+Uso: python scripts/benchmarks/import_time.py [--repeat 5] [--top 8] [--budget-ms 300]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+MODULES = ['preprocess_data', 'generate_forecasts']
+
+
+def run_python(args):
+    """Executa um interpretador novo com scripts/ no sys.path; retorna (segundos, stderr)"""
+    env = dict(os.environ, PYTHONPATH=str(SCRIPTS_DIR))
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable] + args, env=env, cwd=SCRIPTS_DIR.parent,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True
+    )
+    return time.perf_counter() - start, proc.stderr
+
+
+def import_profile(module):
+    """Linhas de -X importtime: [(cumulativo_us, proprio_us, nome)]"""
+    _, stderr = run_python(['-X', 'importtime', '-c', f'import {module}'])
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return rows
+
+
+def best_of(args, repeat):
+    return min(run_python(args)[0] for _ in range(repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8)
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help="limite para o import de cada modulo (ms)")
+    args = parser.parse_args()
+
+    baseline = best_of(['-c', 'pass'], args.repeat)
+    print(f"\ninterpretador vazio: {baseline * 1000:.0f} ms")
+
+    over_budget = []
+    for module in MODULES:
+        rows = import_profile(module)
+        total_ms = next(c for c, _, name in rows if name.strip() == module) / 1000
+        t_import = best_of(['-c', f'import {module}'], args.repeat) - baseline
+        t_help = best_of([str(SCRIPTS_DIR / f'{module}.py'), '--help'], args.repeat) - baseline
+
+        print(f"\n{module}")
+        print(f"  import (importtime): {total_ms:>8.1f} ms")
+        print(f"  import (parede):     {t_import * 1000:>8.1f} ms")
+        print(f"  --help (parede):     {t_help * 1000:>8.1f} ms")
+        print(f"  {'cumulativo (ms)':>16}{'proprio (ms)':>14}  modulo")
+        heaviest = sorted((r for r in rows if r[2].strip() != module), reverse=True)
+        for cumulative_us, self_us, name in heaviest[:args.top]:
+            print(f"  {cumulative_us / 1000:>16.1f}{self_us / 1000:>14.1f}  {name.strip()}")
+
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            over_budget.append(f"{module}: {total_ms:.1f} ms > {args.budget_ms:.0f} ms")
+
+    if over_budget:
+        print("\nAcima do limite:\n  " + "\n  ".join(over_budget))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
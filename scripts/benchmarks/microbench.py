@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+"""
+Microbenchmarks dos caminhos quentes de preprocess_data: normalizacao,
+classificacao (acerto exato, por substring e heuristica), regioes, unidades,
+precos, mojibake e cada parser de layout, com fixtures extraidas dos
+boletins em data/.
+
+Cada medida repete o lote de entradas ate durar --min-time e coleta
+--samples amostras; o relatorio traz a mediana de ops/s e a dispersao
+(desvio absoluto mediano e intervalo interquartil). Funcoes memoizadas
+sao medidas a frio: os caches sao limpos antes de cada repeticao, e o
+cache de tabelas de PDF em disco e desativado.
+
+Comparacao entre revisoes:
+  python scripts/benchmarks/microbench.py --save base.json
+  python scripts/benchmarks/microbench.py --compare base.json
+  python scripts/benchmarks/microbench.py --compare base.json novo.json
+  python scripts/benchmarks/microbench.py --rev HEAD~3   (worktree temporaria)
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+REPO_DIR = SCRIPTS_DIR.parent
+
+# Fixtures: no maximo este numero de boletins por layout e de entradas por funcao
+FILES_PER_LAYOUT = 4
+MAX_INPUTS = 2000
+
+
+def load_module(scripts_dir):
+    sys.path.insert(0, str(scripts_dir))
+    return importlib.import_module('preprocess_data')
+
+
+def layout_of(filepath, year):
+    """Mesmo criterio de despacho de preprocess_data.parse_file"""
+    name = filepath.name.lower()
+    if filepath.suffix.lower() == '.pdf':
+        return 'pdf'
+    if year >= 2018 or 'compilacao' in name or 'compilação' in name:
+        return 'modern'
+    return 'old'
+
+
+def sample_files(pp, data_dir):
+    """Ate FILES_PER_LAYOUT boletins por layout, espalhados no tempo"""
+    by_layout = {}
+    for filepath in sorted(data_dir.iterdir()):
+        if filepath.suffix.lower() not in ('.xlsx', '.xls', '.ods', '.pdf'):
+            continue
+        year, month = pp.extract_date_from_filename(filepath.name)
+        if not year:
+            continue
+        by_layout.setdefault(layout_of(filepath, year), []).append((filepath, year, month))
+    sample = {}
+    for layout, entries in by_layout.items():
+        step = max(1, len(entries) // FILES_PER_LAYOUT)
+        sample[layout] = entries[::step][:FILES_PER_LAYOUT]
+    return sample
+
+
+def read_sheets(filepath):
+    try:
+        return pd.read_excel(filepath, sheet_name=None, header=None)
+    except Exception:
+        try:
+            return pd.read_excel(filepath, sheet_name=None, header=None, engine='xlrd')
+        except Exception:
+            return {}
+
+
+def distinct(values):
+    return list(dict.fromkeys(values))[:MAX_INPUTS]
+
+
+def build_fixtures(pp, data_dir):
+    """Entradas reais extraidas de uma amostra dos boletins"""
+    files = sample_files(pp, data_dir)
+    names, units, headers, prices = [], [], [], []
+    frames = []
+    for layout in ('modern', 'old'):
+        for filepath, year, month in files.get(layout, []):
+            for sheet_name, df in read_sheets(filepath).items():
+                frames.append((layout, filepath, year, month, sheet_name, df))
+                for col in range(min(2, df.shape[1])):
+                    cells = [v for v in df.iloc[:, col].tolist() if isinstance(v, str) and v.strip()]
+                    (names if col == 0 else units).extend(cells)
+                headers.extend(v for v in df.iloc[:15].to_numpy().ravel().tolist()
+                               if isinstance(v, str))
+                if df.shape[1] > 2:
+                    prices.extend(v for v in df.iloc[:, 2:].to_numpy().ravel().tolist()
+                                  if not pd.isna(v))
+
+    mapping = pp.PRODUCT_MAPPING
+    keys = sorted(mapping, key=len, reverse=True)
+    exact, substring, heuristic = [], [], []
+    for name in distinct(names):
+        key = pp.normalize_key(pp.fix_mojibake(name.strip()))
+        if not key:
+            continue
+        if key in mapping:
+            exact.append(name)
+        elif any(k in key for k in keys):
+            substring.append(name)
+        else:
+            heuristic.append(name)
+
+    return {
+        'names': distinct(names),
+        'exact': exact,
+        'substring': substring,
+        'heuristic': heuristic,
+        'units': distinct(units),
+        'headers': distinct(headers),
+        'prices': prices[:MAX_INPUTS],
+        'frames': frames,
+        'files': files,
+    }
+
+
+def clear_memo(pp):
+    for fn in getattr(pp, '_MEMOIZED', {}).values():
+        fn.cache_clear()
+
+
+def batch(func, inputs):
+    def run():
+        for value in inputs:
+            func(value)
+    return run, len(inputs)
+
+
+def pick_frame(pp, frames, layout, parser):
+    """Primeira aba (do layout) em que o parser extrai registros"""
+    for frame_layout, filepath, year, month, sheet_name, df in frames:
+        if frame_layout != layout:
+            continue
+        with contextlib.redirect_stdout(io.StringIO()):
+            if len(parser(df, year, month, sheet_name, filepath)):
+                return filepath, year, month, sheet_name, df
+    return None
+
+
+def build_benchmarks(pp, fixtures):
+    """{nome: (funcao sem argumentos, operacoes por chamada, limpar memo)}"""
+    benches = {
+        'normalize_key': batch(pp.normalize_key, fixtures['names']) + (True,),
+        'classify_product[exato]': batch(pp.classify_product, fixtures['exact']) + (True,),
+        'classify_product[substring]': batch(pp.classify_product, fixtures['substring']) + (True,),
+        'classify_product[heuristica]': batch(pp.classify_product, fixtures['heuristic']) + (True,),
+        'normalize_region_name': batch(pp.normalize_region_name, fixtures['headers']) + (True,),
+        'extract_unit': batch(pp.extract_unit, fixtures['units']) + (False,),
+        'parse_price': batch(pp.parse_price, fixtures['prices']) + (False,),
+        'fix_mojibake': batch(pp.fix_mojibake, fixtures['names']) + (False,),
+    }
+
+    for layout, parser in (('modern', pp.parse_modern_excel), ('old', pp.parse_old_excel),
+                           ('pdf', pp.parse_pdf)):
+        entries = fixtures['files'].get(layout, [])
+        if entries:
+            filepath, year, month = entries[0]
+            benches[f'{parser.__name__}[{filepath.name}]'] = (
+                lambda parser=parser, args=entries[0]: parser(*args), 1, True
+            )
+
+    frame_parsers = (
+        ('old', pp.parse_old_sheet, lambda df, y, m, s, f: pp.parse_old_sheet(df, y, m, s, f.name)),
+        ('modern', pp.parse_matrix_format, lambda df, y, m, s, f: pp.parse_matrix_format(df, y, m, f)),
+        ('old', pp.parse_long_format_sheet, lambda df, y, m, s, f: pp.parse_long_format_sheet(df, s, f.name)),
+    )
+    for layout, parser, call in frame_parsers:
+        found = pick_frame(pp, fixtures['frames'], layout, call)
+        if found:
+            filepath, year, month, sheet_name, df = found
+            benches[f'{parser.__name__}[{filepath.name}:{sheet_name}]'] = (
+                lambda call=call, found=found: call(found[4], *found[1:4], found[0]), 1, True
+            )
+    return benches
+
+
+def measure(pp, func, ops, cold, min_time, samples, warmup):
+    """ops/s de cada amostra; cada amostra repete func ate durar min_time"""
+    def run(loops):
+        elapsed = 0.0
+        for _ in range(loops):
+            if cold:
+                clear_memo(pp)
+            start = time.perf_counter()
+            func()
+            elapsed += time.perf_counter() - start
+        return elapsed
+
+    loops = 1
+    while True:
+        elapsed = run(loops)
+        if elapsed >= min_time or loops >= 1 << 16:
+            break
+        loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9) * 1.2))
+
+    rates = []
+    for i in range(warmup + samples):
+        elapsed = run(loops)
+        if i >= warmup:
+            rates.append(loops * ops / elapsed)
+    return rates
+
+
+def summarize(rates):
+    median = statistics.median(rates)
+    q1, _, q3 = statistics.quantiles(rates, n=4) if len(rates) > 1 else (median, median, median)
+    mad = statistics.median(abs(r - median) for r in rates)
+    return {
+        'ops_s': median,
+        'mad_pct': 100 * mad / median if median else 0.0,
+        'q1': q1,
+        'q3': q3,
+        'amostras': len(rates),
+    }
+
+
+def git_revision(cwd):
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=cwd,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+
+def run_suite(args):
+    pp = load_module(args.scripts_dir)
+    if hasattr(pp, 'configure_pdf_extraction'):
+        # parse_pdf a frio: sem o cache de tabelas por pagina, cada chamada
+        # extrai o PDF de novo, como nas revisoes anteriores ao cache
+        pp.configure_pdf_extraction(use_cache=False)
+    fixtures = build_fixtures(pp, args.data_dir)
+    benches = build_benchmarks(pp, fixtures)
+    results = {}
+    for name, (func, ops, cold) in benches.items():
+        if args.filter and args.filter not in name:
+            continue
+        if not ops:
+            continue
+        with contextlib.redirect_stdout(io.StringIO()):
+            rates = measure(pp, func, ops, cold, args.min_time, args.samples, args.warmup)
+        results[name] = summarize(rates)
+        if not args.quiet:
+            print_row(name, results[name])
+    return {
+        'revisao': git_revision(args.scripts_dir),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'resultados': results,
+    }
+
+
+def print_header():
+    print(f"\n{'benchmark':<64}{'ops/s':>14}{'+-MAD':>9}{'n':>4}")
+
+
+def print_row(name, stats):
+    print(f"{name[:63]:<64}{stats['ops_s']:>14,.1f}{stats['mad_pct']:>8.1f}%{stats['amostras']:>4}")
+
+
+def compare(base, new):
+    """Razao das medianas; '*' quando os intervalos interquartis nao se sobrepoem"""
+    print(f"\nbase: {base.get('revisao') or '?'}   novo: {new.get('revisao') or '?'}")
+    print(f"{'benchmark':<64}{'base ops/s':>14}{'novo ops/s':>14}{'razao':>9}")
+    for name, stats in new['resultados'].items():
+        old = base['resultados'].get(name)
+        if old is None:
+            print(f"{name[:63]:<64}{'-':>14}{stats['ops_s']:>14,.1f}")
+            continue
+        ratio = stats['ops_s'] / old['ops_s']
+        significant = stats['q1'] > old['q3'] or stats['q3'] < old['q1']
+        print(f"{name[:63]:<64}{old['ops_s']:>14,.1f}{stats['ops_s']:>14,.1f}"
+              f"{ratio:>8.2f}x{'*' if significant else ''}")
+
+
+def run_revision(rev, args):
+    """Executa a suite (deste arquivo) contra os scripts da revisao rev"""
+    worktree = Path(tempfile.mkdtemp(prefix='microbench-'))
+    output = worktree.with_suffix('.json')
+    subprocess.run(['git', 'worktree', 'add', '--detach', str(worktree), rev],
+                   cwd=REPO_DIR, check=True, capture_output=True)
+    try:
+        command = [
+            sys.executable, str(Path(__file__).resolve()),
+            '--scripts-dir', str(worktree / 'scripts'), '--data-dir', str(args.data_dir),
+            '--samples', str(args.samples), '--warmup', str(args.warmup),
+            '--min-time', str(args.min_time), '--save', str(output), '--quiet',
+        ]
+        if args.filter:
+            command += ['--filter', args.filter]
+        subprocess.run(command, check=True)
+        with open(output, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        subprocess.run(['git', 'worktree', 'remove', '--force', str(worktree)],
+                       cwd=REPO_DIR, capture_output=True)
+        shutil.rmtree(worktree, ignore_errors=True)
+        output.unlink(missing_ok=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data-dir', type=Path, default=REPO_DIR / 'data')
+    parser.add_argument('--scripts-dir', type=Path, default=SCRIPTS_DIR,
+                        help="diretorio de onde preprocess_data e importado")
+    parser.add_argument('--filter', help="executa apenas benchmarks cujo nome contem o texto")
+    parser.add_argument('--samples', type=int, default=15)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help="duracao minima de cada amostra (s)")
+    parser.add_argument('--save', type=Path, help="grava os resultados em JSON")
+    parser.add_argument('--compare', type=Path, nargs='+', metavar='JSON',
+                        help="compara com resultados salvos (BASE [NOVO])")
+    parser.add_argument('--rev', help="compara a arvore atual com esta revisao do git")
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args(argv)
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare aceita no maximo dois arquivos")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.compare and len(args.compare) == 2:
+        base, new = (json.loads(p.read_text(encoding='utf-8')) for p in args.compare)
+        compare(base, new)
+        return
+
+    base = None
+    if args.rev:
+        print(f"Medindo a revisao {args.rev}...")
+        base = run_revision(args.rev, args)
+    elif args.compare:
+        base = json.loads(args.compare[0].read_text(encoding='utf-8'))
+
+    if not args.quiet:
+        print_header()
+    results = run_suite(args)
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2), encoding='utf-8')
+    if base is not None:
+        compare(base, results)
+
+
+if __name__ == '__main__':
+    main()
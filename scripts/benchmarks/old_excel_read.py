@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Compara a leitura das planilhas antigas (flor*) abrindo o arquivo uma vez
+por aba (comportamento anterior de parse_old_excel) com a leitura de todas
+as abas a partir de uma unica pasta aberta (iter_workbook_sheets).
+
+Uso: python scripts/benchmarks/old_excel_read.py [--data-dir data] [--repeat 3]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import preprocess_data as pp  # noqa: E402
+
+
+def read_per_sheet(filepath):
+    """Leitura anterior: reabre e decodifica o arquivo a cada aba"""
+    try:
+        xl = pd.ExcelFile(filepath)
+    except Exception:
+        xl = pd.ExcelFile(filepath, engine='xlrd')
+    sheets = 0
+    for sheet_name in xl.sheet_names:
+        try:
+            try:
+                pd.read_excel(filepath, sheet_name=sheet_name, header=None)
+            except Exception:
+                pd.read_excel(filepath, sheet_name=sheet_name, header=None, engine='xlrd')
+        except Exception:
+            continue
+        sheets += 1
+    return sheets
+
+
+def read_single_open(filepath):
+    """Leitura atual: uma unica pasta aberta para todas as abas"""
+    with pp.open_workbook(filepath) as xl:
+        return sum(1 for _ in pp.iter_workbook_sheets(xl, filepath))
+
+
+def best_of(func, filepath, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(filepath)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def legacy_files(data_dir):
+    """Arquivos que seguem pelo caminho parse_old_excel"""
+    out = []
+    for filepath, year, month in pp.list_input_files(data_dir):
+        name = filepath.name.lower()
+        if filepath.suffix.lower() == '.pdf':
+            continue
+        if year >= 2018 or 'compilacao' in name or 'compilação' in name:
+            continue
+        out.append(filepath)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data-dir', type=Path, default=SCRIPTS_DIR.parent / 'data')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    files = legacy_files(args.data_dir)
+    total_old = total_new = 0.0
+    print(f"\n{'arquivo':<28}{'abas':>6}{'por aba (s)':>14}{'unica (s)':>12}{'ganho':>8}")
+    for filepath in files:
+        sheets = read_single_open(filepath)
+        t_old = best_of(read_per_sheet, filepath, args.repeat)
+        t_new = best_of(read_single_open, filepath, args.repeat)
+        total_old += t_old
+        total_new += t_new
+        print(f"{filepath.name:<28}{sheets:>6}{t_old:>14.3f}{t_new:>12.3f}{t_old / t_new:>7.1f}x")
+
+    if files:
+        print(f"{'TOTAL':<28}{'':>6}{total_old:>14.3f}{total_new:>12.3f}{total_old / total_new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Gera um corpus sintetico de boletins nos layouts historicos tratados pelos
+parsers de preprocess_data, em escala configuravel (anos, produtos, regioes):
+
+- flor<ano><abr|set>.ods: planilhas antigas com varias abas (cabecalho de
+  regioes apos o preambulo) e uma aba no formato longo (colunas de datas)
+- <ano>05florestaisd.xlsx: matriz de 201905, com coluna 'Produto' explicita
+  (cabecalho apos a 10a linha, fora da busca do layout 2018+)
+- compilacao_precos_florestais_pr_<ano>_<nn><mes>_publicacao.xlsx: layout
+  2018+ com 'Produto / unidade / Apucarana ... / Media Atual'
+
+Anos anteriores a 2018 geram boletins antigos; a partir de 2018, boletins
+trimestrais (maio no formato matriz). Produtos alem do catalogo base sao
+variantes ('<nome> - LOTE n') que caem na busca por substring do classificador.
+
+Uso: python scripts/benchmarks/synthetic_corpus.py SAIDA [--inicio 1997] [--fim 2025]
+         [--produtos 48] [--regioes 22] [--preenchimento 0.45] [--seed 0]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import preprocess_data as pp  # noqa: E402
+
+# Catalogo base por aba dos boletins antigos: (nome no boletim, unidade, preco tipico)
+CATALOG = {
+    'SEMENTES': [
+        ('SEMENTES EUCALIPTO (Eucalyptus dunnii) kg', 'R$/kg', 2700.0),
+        ('SEMENTES EUCALIPTO (Eucalyptus grandis) kg', 'R$/kg', 2500.0),
+        ('SEMENTES EUCALIPTO (Eucalyptus saligna) kg', 'R$/kg', 2400.0),
+        ('SEMENTES EUCALIPTO (Eucalyptus viminalis) kg', 'R$/kg', 2600.0),
+    ],
+    'MUDAS': [
+        ('MUDAS DE EUCALIPTO - Corymbia citriodora', 'R$/unid.', 0.45),
+        ('MUDAS DE EUCALIPTO - Eucalyptus dunnii', 'R$/unid.', 0.45),
+        ('MUDAS DE EUCALIPTO - Eucalyptus grandis', 'R$/unid.', 0.42),
+        ('MUDAS DE EUCALIPTO - Eucalyptus saligna', 'R$/unid.', 0.40),
+        ('MUDAS DE PINUS - Pinus elliottii', 'R$/unid.', 0.30),
+        ('MUDAS DE PINUS - Pinus taeda', 'R$/unid.', 0.30),
+        ('MUDAS DE ARAUCÁRIA - Araucaria angustifolia', 'R$/unid.', 1.50),
+        ('MUDAS DE ERVA-MATE - llex paraguariensis', 'R$/unid.', 0.90),
+        ('MUDAS DE PALMITO-PUPUNHA - Bactris gasipaes', 'R$/unid.', 0.80),
+        ('Mudas de essencias florestais nativas diversas', 'R$/unid.', 2.00),
+    ],
+    'TORAS': [
+        ('TORAS DE ARAUCÁRIA EM PÉ', 'R$/m³', 180.0),
+        ('TORAS DE EUCALIPTO EM PÉ - DIÂMETRO 14 - 18 cm', 'R$/m³', 70.0),
+        ('TORAS DE EUCALIPTO EM PÉ - DIÂMETRO 18 - 25 cm', 'R$/m³', 90.0),
+        ('TORAS DE EUCALIPTO EM PÉ - DIÂMETRO > 35 cm', 'R$/m³', 140.0),
+        ('TORAS DE PINUS EM PÉ - DIÂMETRO 14 – 18 cm', 'R$/m³', 80.0),
+        ('TORAS DE PINUS EM PÉ - DIÂMETRO 18 – 25  cm', 'R$/m³', 110.0),
+        ('TORAS DE PINUS EM PÉ - DIÂMETRO > 35 cm', 'R$/m³', 190.0),
+    ],
+    'PFNM': [
+        ('FOLHA DE ERVA-MATE NO PÉ', 'R$/arroba', 20.0),
+        ('PINHÃO', 'R$/kg', 5.0),
+        ('RESINA', 'R$/kg', 3.5),
+    ],
+}
+
+# Produtos da aba no formato longo dos boletins antigos
+LONG_FORMAT_CATALOG = [
+    ('LENHA POSTA NO CONSUMIDOR', 'R$/m³', 60.0),
+    ('CAVACO LIMPO ONDE FOI PRODUZIDO', 'R$/t', 95.0),
+    ('CAVACO SUJO ONDE FOI PRODUZIDO', 'R$/t', 70.0),
+]
+
+LEGACY_MONTHS = [(4, 'abr'), (9, 'set')]
+MODERN_MONTHS = [(2, 'fevereiro'), (5, None), (8, 'agosto'), (11, 'novembro')]
+PREAMBLE = [
+    'SECRETARIA DE ESTADO DA AGRICULTURA E DO ABASTECIMENTO - SEAB',
+    'DEPARTAMENTO DE ECONOMIA RURAL - DERAL',
+]
+
+
+def expand_catalog(catalog, n_products):
+    """Repete o catalogo com variantes '<nome> - LOTE n' ate n_products itens"""
+    items = []
+    lot = 0
+    while len(items) < n_products:
+        for name, unit, price in catalog:
+            items.append((name if lot == 0 else f"{name} - LOTE {lot}", unit, price))
+            if len(items) == n_products:
+                break
+        lot += 1
+    return items
+
+
+def price_matrix(rng, products, n_regions, fill):
+    """Precos por (produto, regiao) em torno do preco tipico; NaN nas celulas vazias"""
+    base = np.array([price for _, _, price in products])[:, None]
+    prices = np.round(base * rng.lognormal(0.0, 0.15, (len(products), n_regions)), 2)
+    prices[rng.random(prices.shape) >= fill] = np.nan
+    return prices
+
+
+def legacy_sheet(rng, title, products, regions, fill):
+    """Aba antiga: preambulo, cabecalho 'ESPECIE FLORESTAL' + regioes e produtos na coluna B"""
+    width = 3 + len(regions)
+    rows = [[None] * width for _ in range(10)]
+    for i, text in enumerate(PREAMBLE):
+        rows[i][1] = text
+    rows[6][1] = f"PREÇOS DE {title} NO PARANÁ"
+    rows[8][1] = 'ESPÉCIE FLORESTAL'
+    rows[8][3:] = [r.upper() for r in regions]
+    rows[9][1] = 'NOME VULGAR'
+    prices = price_matrix(rng, products, len(regions), fill)
+    for (name, _, _), row_prices in zip(products, prices):
+        rows.append([None, name, None] + row_prices.tolist())
+    return pd.DataFrame(rows)
+
+
+def long_format_sheet(rng, products, regions, dates, fill):
+    """Aba no formato longo: uma linha por (produto, regiao), uma coluna por data"""
+    rows = [['concatena', 'n', 'nr', 'NOME COMPLETO'] + list(dates) + ['OBS']]
+    for n, (name, unit, price) in enumerate(products):
+        prices = price_matrix(rng, [(name, unit, price)] * len(regions), len(dates), fill)
+        for region, row_prices in zip(regions, prices):
+            rows.append([0, n, region.upper(), f"{name} {unit}"] + row_prices.tolist() + [None])
+    return pd.DataFrame(rows)
+
+
+def matrix_sheet(rng, products, regions, fill, month_label):
+    """Matriz de 201905: coluna 'Produto' explicita e cabecalho apos a 10a linha"""
+    lead = ['VBP', 'S', None, 'Produto', 'unidade', None, None, None, None]
+    rows = [[None] * (len(lead) + len(regions)) for _ in range(10)]
+    for i, text in enumerate(PREAMBLE):
+        rows[i][3] = text
+    rows[2][3] = f"LEVANTAMENTO SEMESTRAL DE PREÇOS FLORESTAIS RELATIVO A {month_label}"
+    rows.append(lead + list(regions))
+    prices = price_matrix(rng, products, len(regions), fill)
+    for code, ((name, unit, _), row_prices) in enumerate(zip(products, prices), start=4000):
+        rows.append(['VBP', 'S', code, name, unit, None, None, None, None] + row_prices.tolist())
+    return pd.DataFrame(rows)
+
+
+def modern_sheet(rng, products, regions, fill, month_label):
+    """Layout 2018+: 'Produto', 'unidade', regioes e as colunas de media"""
+    header = ['Produto', 'unidade'] + list(regions) + [None, 'Média Anterior', 'Média Atual', 'Variação']
+    rows = [[None] * len(header) for _ in range(5)]
+    for i, text in enumerate(PREAMBLE, start=1):
+        rows[i][0] = text
+    rows[3][0] = 'PREÇOS DE PRODUTOS FLORESTAIS'
+    rows[4][0] = f"Referência: {month_label}"
+    rows.append(header)
+    rows.append(['Mudas Plantio Comercial (produção por sementes)'] + [None] * (len(header) - 1))
+    prices = price_matrix(rng, products, len(regions), fill)
+    for (name, unit, _), row_prices in zip(products, prices):
+        filled = row_prices[~np.isnan(row_prices)]
+        media = round(float(filled.mean()), 2) if filled.size else None
+        rows.append([name, unit] + row_prices.tolist() + [None, media, media, 0.0])
+    return pd.DataFrame(rows)
+
+
+def write_workbook(path, sheets):
+    engine = 'odf' if path.suffix == '.ods' else 'openpyxl'
+    with pd.ExcelWriter(path, engine=engine) as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, header=False, index=False)
+
+
+def check_filename(path, year, month):
+    """Garante que o nome sera lido com o ano/mes esperados pelo pipeline"""
+    if pp.extract_date_from_filename(path.name) != (year, month):
+        raise ValueError(f"{path.name} nao corresponde a {year}-{month:02d}")
+
+
+def generate_corpus(output_dir, start=1997, end=2025, n_products=48, n_regions=22,
+                    fill=0.45, seed=0, legacy_ext='ods'):
+    """Grava o corpus em output_dir; retorna a lista de arquivos gerados"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    regions = pp.REGIOES[:n_regions]
+    base_catalog = [item for items in CATALOG.values() for item in items]
+    products = expand_catalog(base_catalog, n_products)
+    long_products = expand_catalog(LONG_FORMAT_CATALOG, max(1, n_products // 16))
+    files = []
+
+    for year in range(start, end + 1):
+        if year < 2018:
+            for month, label in LEGACY_MONTHS:
+                path = output_dir / f"flor{year}{label}.{legacy_ext}"
+                sheets = {}
+                # Distribui os produtos entre as abas na proporcao do catalogo base
+                offset = 0
+                for title, items in CATALOG.items():
+                    share = max(1, round(len(products) * len(items) / len(base_catalog)))
+                    sheets[title] = legacy_sheet(rng, title, products[offset:offset + share],
+                                                 regions, fill)
+                    offset += share
+                sheets['Planilha2'] = long_format_sheet(
+                    rng, long_products, regions, [pd.Timestamp(year, month, 1)], fill
+                )
+                check_filename(path, year, month)
+                write_workbook(path, sheets)
+                files.append(path)
+            continue
+
+        for quarter, (month, label) in enumerate(MODERN_MONTHS, start=1):
+            month_label = f"{month:02d}/{year}"
+            if label is None:
+                path = output_dir / f"{year}{month:02d}florestaisd.xlsx"
+                sheet = matrix_sheet(rng, products, regions, fill, month_label)
+            else:
+                path = output_dir / f"compilacao_precos_florestais_pr_{year}_{quarter:02d}{label}_publicacao.xlsx"
+                sheet = modern_sheet(rng, products, regions, fill, month_label)
+            check_filename(path, year, month)
+            write_workbook(path, {'FORMULÁRIO': sheet})
+            files.append(path)
+
+    return files
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('output_dir', type=Path)
+    parser.add_argument('--inicio', type=int, default=1997, help="primeiro ano")
+    parser.add_argument('--fim', type=int, default=2025, help="ultimo ano")
+    parser.add_argument('--produtos', type=int, default=48, help="produtos por boletim")
+    parser.add_argument('--regioes', type=int, default=len(pp.REGIOES),
+                        help=f"regioes por boletim (maximo {len(pp.REGIOES)})")
+    parser.add_argument('--preenchimento', type=float, default=0.45,
+                        help="fracao das celulas produto x regiao com preco")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ext-antigos', choices=['ods', 'xlsx'], default='ods',
+                        help="formato dos boletins antigos (xlsx grava bem mais rapido)")
+    args = parser.parse_args(argv)
+    if not 4 <= args.regioes <= len(pp.REGIOES):
+        parser.error(f"--regioes deve estar entre 4 e {len(pp.REGIOES)}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    files = generate_corpus(
+        args.output_dir, args.inicio, args.fim, args.produtos, args.regioes,
+        args.preenchimento, args.seed, args.ext_antigos
+    )
+    size = sum(f.stat().st_size for f in files)
+    print(f"{len(files)} boletins gerados em {args.output_dir} ({size / 1e6:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
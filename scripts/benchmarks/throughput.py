@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Mede a vazao de ponta a ponta de process_all_files sobre corpora sinteticos
+em escalas multiplas do acervo real (10x, 100x, 1000x por padrao).
+
+A escala k multiplica o volume de registros: cerca de sqrt(k) vezes mais
+anos (boletins antigos retroagem no tempo, os trimestrais avancam) e k/sqrt(k)
+vezes mais produtos por boletim. Cada corpus gerado fica em
+.cache/synthetic/x<k>/ e e reaproveitado nas proximas execucoes. A escala
+1000x ocupa alguns GB e leva horas, a maior parte na geracao das planilhas.
+
+Uso: python scripts/benchmarks/throughput.py [--scales 10 100 1000] [--jobs 1]
+         [--ext-antigos ods] [--save resultados.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import shutil
+import sys
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import preprocess_data as pp  # noqa: E402
+import synthetic_corpus as sc  # noqa: E402
+
+CORPUS_DIR = pp.BASE_DIR / ".cache" / "synthetic"
+# Acervo real: 1997-2025, ~48 produtos por boletim
+BASE_START, BASE_END, BASE_PRODUCTS = 1997, 2025, 48
+
+
+def corpus_params(scale):
+    """(inicio, fim, produtos) para a escala pedida"""
+    year_factor = max(1, round(math.sqrt(scale)))
+    legacy_years = (2018 - BASE_START) * year_factor
+    modern_years = (BASE_END - 2018 + 1) * year_factor
+    products = max(1, round(BASE_PRODUCTS * scale / year_factor))
+    return 2018 - legacy_years, 2018 + modern_years - 1, products
+
+
+def ensure_corpus(scale, legacy_ext, seed):
+    """Gera o corpus da escala se ainda nao existir; retorna (diretorio, segundos de geracao)"""
+    start, end, products = corpus_params(scale)
+    corpus = CORPUS_DIR / f"x{scale}"
+    marker = corpus / '.completo'
+    params = {'inicio': start, 'fim': end, 'produtos': products,
+              'ext_antigos': legacy_ext, 'seed': seed}
+    if marker.exists() and json.loads(marker.read_text(encoding='utf-8')) == params:
+        return corpus, 0.0
+
+    shutil.rmtree(corpus, ignore_errors=True)
+    print(f"  gerando x{scale}: anos {start}-{end}, {products} produtos por boletim...")
+    gen_start = time.perf_counter()
+    sc.generate_corpus(corpus, start, end, products, seed=seed, legacy_ext=legacy_ext)
+    marker.write_text(json.dumps(params), encoding='utf-8')
+    return corpus, time.perf_counter() - gen_start
+
+
+def run_scale(scale, jobs, legacy_ext, seed):
+    corpus, gen_seconds = ensure_corpus(scale, legacy_ext, seed)
+    files = [f for f in corpus.iterdir() if f.suffix in ('.ods', '.xlsx')]
+    size_mb = sum(f.stat().st_size for f in files) / 1e6
+
+    # Sem cache: mede a leitura de todos os arquivos, nao o reaproveitamento
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        records = pp.process_all_files(jobs=jobs, data_dir=corpus, use_cache=False)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'escala': scale,
+        'arquivos': len(files),
+        'mb': round(size_mb, 2),
+        'registros': len(records),
+        'segundos': round(elapsed, 3),
+        'registros_s': round(len(records) / elapsed, 1),
+        'mb_s': round(size_mb / elapsed, 3),
+        'geracao_s': round(gen_seconds, 1),
+        'pico_rss_mb': pp.peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="processos para a leitura dos arquivos (0 = todos os nucleos)")
+    parser.add_argument('--ext-antigos', choices=['ods', 'xlsx'], default='ods',
+                        help="formato dos boletins antigos no corpus")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', type=Path, help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    header = (f"{'escala':>7}{'arquivos':>10}{'MB':>9}{'registros':>12}{'s':>9}"
+              f"{'reg/s':>11}{'MB/s':>8}{'RSS MB':>9}")
+    results = []
+    for scale in args.scales:
+        result = run_scale(scale, args.jobs, args.ext_antigos, args.seed)
+        results.append(result)
+        if len(results) == 1:
+            print(header)
+        rss = result['pico_rss_mb']
+        print(f"{'x' + str(scale):>7}{result['arquivos']:>10}{result['mb']:>9.1f}"
+              f"{result['registros']:>12}{result['segundos']:>9.1f}{result['registros_s']:>11.0f}"
+              f"{result['mb_s']:>8.2f}{(f'{rss:.0f}' if rss is not None else '-'):>9}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'jobs': args.jobs, 'resultados': results}, f, indent=2)
+        print(f"\nResultados gravados em {args.save}")
+
+
+if __name__ == '__main__':
+    main()
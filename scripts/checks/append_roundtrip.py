@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Verifica que reincorporar com --append um boletim ja publicado nao altera
+detailed.json, aggregated.json e cube.json. Por padrao usa boletins que
+dividem o periodo com outros arquivos (1999-09, 2008-09 e 2009-04), onde uma
+substituicao por periodo perderia registros. Requer as saidas de um
+processamento completo; elas sao restauradas ao final. Termina com codigo 1
+se alguma saida mudar.
+
+Uso: python scripts/checks/append_roundtrip.py [ARQUIVO ...]
+"""
+
+import argparse
+import contextlib
+import io
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import preprocess_data as pp  # noqa: E402
+
+DEFAULT_FILES = ['flor1999set_0.ods', 'flor2009abr.xls', 'flor2009set.xls']
+OUTPUTS = ['detailed.json', 'aggregated.json', 'cube.json']
+
+
+def output_hashes():
+    return {name: pp.file_hash(pp.OUTPUT_DIR / name) for name in OUTPUTS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('files', nargs='*', default=DEFAULT_FILES,
+                        help=f"boletins em {pp.DATA_DIR} (padrao: {', '.join(DEFAULT_FILES)})")
+    args = parser.parse_args()
+
+    missing = [name for name in OUTPUTS if not (pp.OUTPUT_DIR / name).exists()]
+    if missing:
+        sys.exit(f"Saidas ausentes ({', '.join(missing)}) - execute preprocess_data.py primeiro")
+
+    expected = output_hashes()
+    failures = []
+    with tempfile.TemporaryDirectory() as backup_dir:
+        backup = Path(backup_dir)
+        saved = [pp.OUTPUT_DIR / name for name in OUTPUTS]
+        saved += [p for p in (pp.OUTPUT_DIR / 'detailed.arrow', pp.OUTPUT_DIR / 'detailed.parquet',
+                              pp.STATE_PATH) if p.exists()]
+        for path in saved:
+            shutil.copy2(path, backup / path.name)
+        try:
+            for name in args.files:
+                with contextlib.redirect_stdout(io.StringIO()) as log:
+                    pp.main(['--append', str(pp.DATA_DIR / name),
+                             '--stage', 'ingest', '--stage', 'aggregate'])
+                changed = [out for out, digest in output_hashes().items() if expected[out] != digest]
+                print(f"{name}: {'alterou ' + ', '.join(changed) if changed else 'ok'}")
+                if changed:
+                    failures.append(name)
+                    print(log.getvalue())
+        finally:
+            for path in saved:
+                shutil.copy2(backup / path.name, path)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
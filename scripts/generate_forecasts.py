@@ -4,25 +4,93 @@ Generate offline forecasts for all filter combinations and ML models.
 Outputs dashboard/public/data/forecasts.json.
 """
 
+import argparse
+import hashlib
+import importlib.metadata
+import importlib.util
 import json
 import math
+import os
 import warnings
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 
 import numpy as np
-import xgboost as xgb
-import lightgbm as lgb
-from sklearn.ensemble import RandomForestRegressor
+from numpy.lib.stride_tricks import sliding_window_view
+
+# xgboost, lightgbm, scikit-learn and pyarrow are imported where they are used,
+# so startup (argument parsing, naive-only runs) does not pay for them.
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
 
 BASE_DIR = Path.cwd()
 DATA_PATH = BASE_DIR / "dashboard" / "public" / "data" / "detailed.json"
+ARROW_PATH = DATA_PATH.with_name("detailed.arrow")
+SHARDS_MANIFEST_PATH = DATA_PATH.with_name("shards") / "manifest.json"
 OUTPUT_PATH = BASE_DIR / "dashboard" / "public" / "data" / "forecasts.json"
 
 TARGET_PERIOD = "2026-11"
 MAX_HORIZON = 36
 
+# Threads each model may use; None keeps the library defaults (serial runs).
+# Pool workers get cpu_count // jobs so that parallel series do not oversubscribe.
+MODEL_THREADS = None
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+# Rolling-origin backtest: the last 20% of the rows is split into BACKTEST_FOLDS
+# consecutive blocks, each predicted by a model fitted on all rows before it.
+# Out-of-sample residuals give both the metrics and the interval width, and are
+# cached per series/model so unchanged series skip the fold fits.
+BACKTEST_FOLDS = 2
+BACKTEST_WORKERS = 1
+BACKTEST_VERSION = 1
+BACKTEST_CACHE_DIR = BASE_DIR / ".cache" / "forecasts" / "backtest"
+USE_BACKTEST_CACHE = True
+# Backtest cache keys used by the series being forecast (see forecast_task_keys)
+_BACKTEST_KEYS = []
+
+# Incremental runs: fingerprint of every series in the last output, so only
+# series whose history (or the run configuration) changed are retrained.
+FORECAST_INDEX_PATH = BASE_DIR / ".cache" / "forecasts" / "index.json"
+FORECAST_VERSION = 1
+
+MODEL_PARAMS = {
+    "xgboost": {
+        "n_estimators": 80,
+        "max_depth": 3,
+        "learning_rate": 0.08,
+        "subsample": 0.8,
+        "colsample_bytree": 0.8,
+        "objective": "reg:squarederror",
+        "random_state": 42,
+        "verbosity": 0,
+    },
+    "lightgbm": {
+        "n_estimators": 80,
+        "learning_rate": 0.08,
+        "num_leaves": 31,
+        "subsample": 0.8,
+        "colsample_bytree": 0.8,
+        "random_state": 42,
+        "min_data_in_leaf": 1,
+        "min_data_in_bin": 1,
+        "verbosity": -1,
+    },
+    "random_forest": {
+        "n_estimators": 80,
+        "max_depth": 8,
+        "random_state": 42,
+    },
+}
+
+# Global mode: minimum series length per model family (same thresholds as
+# the per-series fits) and the fixed feature layout shared by all series.
+MODEL_MIN_POINTS = {"random_forest": 18, "xgboost": 30, "lightgbm": 30}
+GLOBAL_LAGS = (1, 2, 3, 6, 12)
+GLOBAL_WINDOWS = (3, 6, 12)
+HIERARCHY_FIELDS = ("regiao", "categoria", "subcategoria", "produto")
+
 
 def months_between(start, end):
     sy, sm = [int(x) for x in start.split("-")]
@@ -49,14 +117,16 @@ def build_key(ano, regiao, categoria, subcategoria, produto):
 
 
 def iter_keys(row):
-    regiao = row.get("regiao")
-    categoria = row.get("categoria")
-    subcategoria = row.get("subcategoria")
-    produto = row.get("produto")
+    return iter_series_keys(
+        row.get("regiao"), row.get("categoria"), row.get("subcategoria"), row.get("produto")
+    )
 
+
+def iter_series_keys(regiao, categoria, subcategoria, produto, all_categories=True):
     for reg_val in (regiao, None):
         # all categories
-        yield build_key(None, reg_val, None, None, None)
+        if all_categories:
+            yield build_key(None, reg_val, None, None, None)
         # category level
         yield build_key(None, reg_val, categoria, None, None)
         # subcategory level
@@ -76,74 +146,149 @@ def key_to_filters(key):
     return out
 
 
+SERIES_COLUMNS = ("periodo", "regiao", "categoria", "subcategoria", "produto")
+
+
+# Series levels in the order iter_series_keys yields them: (regional, fields)
+SERIES_LEVELS = [
+    (regional, fields)
+    for regional in (True, False)
+    for fields in ((), ("categoria",), ("categoria", "subcategoria"),
+                   ("categoria", "subcategoria", "produto"))
+]
+
+
+def encode_column(values):
+    # (codes, dictionary): the same layout as a dictionary-encoded Arrow column
+    lookup = {}
+    codes = np.fromiter(
+        (lookup.setdefault(value, len(lookup)) for value in values), dtype=np.intp, count=len(values)
+    )
+    return codes, list(lookup)
+
+
+def rows_to_columns(rows):
+    columns = {name: encode_column([row.get(name) for row in rows]) for name in SERIES_COLUMNS}
+    columns["preco"] = np.array([float(row["preco"]) for row in rows], dtype=float)
+    return columns
+
+
+def load_shard_columns(categorias):
+    # Only the partitions of the requested categories are read.
+    with SHARDS_MANIFEST_PATH.open("r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    rows = []
+    for shard in manifest["shards"]:
+        if shard["categoria"] in categorias:
+            with (SHARDS_MANIFEST_PATH.parent / shard["arquivo"]).open("r", encoding="utf-8") as f:
+                rows.extend(json.load(f))
+    return rows_to_columns(rows)
+
+
+def filter_columns(columns, categorias):
+    codes, dictionary = columns["categoria"]
+    wanted = [code for code, name in enumerate(dictionary) if name in categorias]
+    keep = np.isin(codes, wanted)
+    out = {name: (columns[name][0][keep], columns[name][1]) for name in SERIES_COLUMNS}
+    out["preco"] = columns["preco"][keep]
+    return out
+
+
+def load_price_columns(categorias=None):
+    if categorias:
+        if SHARDS_MANIFEST_PATH.exists():
+            return load_shard_columns(set(categorias))
+        return filter_columns(load_price_columns(), set(categorias))
+
+    # Prefer the memory-mapped Arrow IPC table written by preprocess_data.py:
+    # prices are read straight from the mapped buffers (zero-copy), and each
+    # string column stays dictionary-encoded as a numpy array of codes, so only
+    # the dictionaries become Python objects. build_series groups on the codes.
+    if HAS_PYARROW and ARROW_PATH.exists():
+        import pyarrow as pa
+        import pyarrow.ipc
+
+        with pa.memory_map(str(ARROW_PATH), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        columns = {}
+        for name in SERIES_COLUMNS:
+            encoded = table.column(name).combine_chunks().dictionary_encode()
+            # Trailing None slot for null indices
+            dictionary = encoded.dictionary.to_pylist() + [None]
+            codes = encoded.indices.fill_null(len(dictionary) - 1).to_numpy(zero_copy_only=False)
+            columns[name] = codes.astype(np.intp, copy=False), dictionary
+        columns["preco"] = np.concatenate([
+            chunk.to_numpy(zero_copy_only=True) for chunk in table.column("preco").chunks
+        ]) if table.num_rows else np.empty(0)
+        return columns
+
+    if not DATA_PATH.exists():
+        raise SystemExit(f"Missing data file: {DATA_PATH}")
+
+    with DATA_PATH.open("r", encoding="utf-8") as f:
+        return rows_to_columns(json.load(f))
+
+
 def avg(values):
     return float(sum(values) / len(values)) if values else None
 
 
+# (month, sin, cos) per calendar month, computed with math.sin/cos like the
+# original per-row code so the matrices stay bit-for-bit identical
+SEASONAL_TERMS = np.array([
+    (month, math.sin(2 * math.pi * month / 12), math.cos(2 * math.pi * month / 12))
+    for month in range(1, 13)
+])
+
+
+def period_index(periods):
+    # "YYYY-MM" -> months since year 0, so month terms and steps are integer math
+    return np.array([int(y) * 12 + int(m) - 1 for y, m in (p.split("-") for p in periods)])
+
+
 def build_features(values, periods, lags, windows):
+    values = np.asarray(values, dtype=float)
     max_lag = max(lags)
-    X = []
-    y = []
-    for i in range(max_lag, len(values)):
-        features = []
-        for lag in lags:
-            features.append(values[i - lag])
-        for window in windows:
-            features.append(np.mean(values[i - window:i]))
-        year, month = [int(x) for x in periods[i].split("-")]
-        features.append(month)
-        features.append(math.sin(2 * math.pi * month / 12))
-        features.append(math.cos(2 * math.pi * month / 12))
-        features.append(i)
-        X.append(features)
-        y.append(values[i])
-    return np.array(X, dtype=float), np.array(y, dtype=float)
+    n = len(values)
+    if n <= max_lag:
+        return np.empty((0, len(lags) + len(windows) + 4)), np.empty(0)
+
+    # Row i uses values[i - lag] and the mean of values[i - window:i];
+    # sliding_window_view(values, window)[j] is values[j:j + window].
+    columns = [values[max_lag - lag:n - lag] for lag in lags]
+    for window in windows:
+        means = sliding_window_view(values, window).mean(axis=1)
+        columns.append(means[max_lag - window:n - window])
+    months = period_index(periods[max_lag:]) % 12
+    X = np.column_stack(columns + [SEASONAL_TERMS[months], np.arange(max_lag, n)])
+    return X, values[max_lag:].copy()
 
 
 def build_next_features(history, period, lags, windows):
-    features = []
-    for lag in lags:
-        features.append(history[-lag])
-    for window in windows:
-        features.append(np.mean(history[-window:]))
-    year, month = [int(x) for x in period.split("-")]
-    features.append(month)
-    features.append(math.sin(2 * math.pi * month / 12))
-    features.append(math.cos(2 * math.pi * month / 12))
-    features.append(len(history))
-    return np.array(features, dtype=float).reshape(1, -1)
+    # history: values so far (array view); period: period_index of the step
+    features = np.empty(len(lags) + len(windows) + 4)
+    for k, lag in enumerate(lags):
+        features[k] = history[-lag]
+    for k, window in enumerate(windows, start=len(lags)):
+        features[k] = np.mean(history[-window:])
+    features[-4:-1] = SEASONAL_TERMS[period % 12]
+    features[-1] = len(history)
+    return features.reshape(1, -1)
 
 
 def train_model(model_id, X, y):
     if model_id == "xgboost":
-        model = xgb.XGBRegressor(
-            n_estimators=80,
-            max_depth=3,
-            learning_rate=0.08,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            objective="reg:squarederror",
-            random_state=42,
-            verbosity=0
-        )
+        import xgboost as xgb
+
+        model = xgb.XGBRegressor(**MODEL_PARAMS[model_id], n_jobs=MODEL_THREADS)
     elif model_id == "lightgbm":
-        model = lgb.LGBMRegressor(
-            n_estimators=80,
-            learning_rate=0.08,
-            num_leaves=31,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            random_state=42,
-            min_data_in_leaf=1,
-            min_data_in_bin=1,
-            verbosity=-1
-        )
+        import lightgbm as lgb
+
+        model = lgb.LGBMRegressor(**MODEL_PARAMS[model_id], n_jobs=MODEL_THREADS)
     elif model_id == "random_forest":
-        model = RandomForestRegressor(
-            n_estimators=80,
-            max_depth=8,
-            random_state=42
-        )
+        from sklearn.ensemble import RandomForestRegressor
+
+        model = RandomForestRegressor(**MODEL_PARAMS[model_id], n_jobs=MODEL_THREADS)
     else:
         return None
 
@@ -151,21 +296,114 @@ def train_model(model_id, X, y):
     return model
 
 
-def model_metrics(model, X, y):
-    if len(y) < 4:
-        return {"mae": None, "rmse": None, "mape": None}
+def fold_bounds(n_rows, folds):
+    # [(start, end)] test blocks covering the holdout; empty if too short
+    split = n_rows - holdout_size(n_rows)
+    if n_rows < 4 or split < 2:
+        return []
+    blocks = np.array_split(np.arange(split, n_rows), min(folds, n_rows - split))
+    return [(int(block[0]), int(block[-1]) + 1) for block in blocks]
 
-    test_size = max(int(len(y) * 0.2), 3)
-    split = len(y) - test_size
-    if split < 2:
-        return {"mae": None, "rmse": None, "mape": None}
-    X_train, y_train = X[:split], y[:split]
-    X_test, y_test = X[split:], y[split:]
+
+# Installed distribution behind each model; its version is part of the cache keys
+MODEL_DISTRIBUTIONS = {
+    "xgboost": "xgboost",
+    "lightgbm": "lightgbm",
+    "random_forest": "scikit-learn",
+}
+
+
+@lru_cache(maxsize=None)
+def library_version(model_id):
+    try:
+        return importlib.metadata.version(MODEL_DISTRIBUTIONS[model_id])
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def backtest_key(model_id, X, y, bounds):
+    digest = hashlib.sha256()
+    digest.update(json.dumps(
+        [BACKTEST_VERSION, model_id, library_version(model_id), MODEL_PARAMS[model_id], bounds],
+        sort_keys=True
+    ).encode())
+    digest.update(X.tobytes())
+    digest.update(y.tobytes())
+    return digest.hexdigest()
+
+
+def load_backtest(key):
+    path = BACKTEST_CACHE_DIR / f"{key}.json"
+    if not USE_BACKTEST_CACHE or not path.exists():
+        return None
     try:
-        model.fit(X_train, y_train)
-        preds = model.predict(X_test)
+        with path.open("r", encoding="utf-8") as f:
+            return np.array(json.load(f)["predicted"], dtype=float)
     except Exception:
-        return {"mae": None, "rmse": None, "mape": None}
+        return None
+
+
+def save_backtest(key, predicted):
+    if not USE_BACKTEST_CACHE:
+        return
+    BACKTEST_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = BACKTEST_CACHE_DIR / f"{key}.json"
+    # Per-process temp name: pool workers may write the same key concurrently
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump({"predicted": predicted.tolist()}, f)
+    os.replace(tmp_path, path)
+
+
+def fit_fold(model_id, X, y, start, end):
+    return train_model(model_id, X[:start], y[:start]).predict(X[start:end])
+
+
+def run_fits(calls):
+    # Fold fits and the final fit are independent; the model libraries
+    # release the GIL while fitting, so threads run them in parallel.
+    if BACKTEST_WORKERS <= 1 or len(calls) == 1:
+        results = []
+        for fn, *args in calls:
+            try:
+                results.append(fn(*args))
+            except Exception as e:
+                results.append(e)
+        return results
+    with ThreadPoolExecutor(max_workers=min(BACKTEST_WORKERS, len(calls))) as executor:
+        futures = [executor.submit(fn, *args) for fn, *args in calls]
+        return [future.exception() or future.result() for future in futures]
+
+
+def backtest_and_fit(model_id, X, y):
+    # Returns (final model, out-of-sample predictions for y[holdout:] or None)
+    bounds = fold_bounds(len(y), BACKTEST_FOLDS)
+    key = backtest_key(model_id, X, y, bounds) if bounds else None
+    if key:
+        _BACKTEST_KEYS.append(key)
+    cached = load_backtest(key) if key else None
+
+    calls = [(train_model, model_id, X, y)]
+    if bounds and cached is None:
+        calls += [(fit_fold, model_id, X, y, start, end) for start, end in bounds]
+    model, *fold_preds = run_fits(calls)
+    if isinstance(model, Exception):
+        return None, None
+
+    if cached is not None or not bounds:
+        return model, cached
+    if any(isinstance(preds, Exception) for preds in fold_preds):
+        return model, None
+    predicted = np.concatenate(fold_preds)
+    save_backtest(key, predicted)
+    return model, predicted
+
+
+def holdout_size(n):
+    return max(int(n * 0.2), 3)
+
+
+def error_metrics(y_test, preds):
     mae = float(np.mean(np.abs(y_test - preds)))
     rmse = float(np.sqrt(np.mean((y_test - preds) ** 2)))
     mape_vals = []
@@ -176,17 +414,6 @@ def model_metrics(model, X, y):
     return {"mae": mae, "rmse": rmse, "mape": mape}
 
 
-def residual_sigma(model, X, y):
-    if len(y) < 4:
-        return 0.0
-    try:
-        preds = model.predict(X)
-        residuals = y - preds
-        return float(np.sqrt(np.mean(residuals ** 2)))
-    except Exception:
-        return 0.0
-
-
 def forecast_series(values, periods, model_id, horizon):
     if len(values) < 8:
         return None
@@ -201,26 +428,34 @@ def forecast_series(values, periods, model_id, horizon):
     if len(y) < 6:
         return None
 
-    model = train_model(model_id, X, y)
+    if model_id not in MODEL_PARAMS:
+        return None
+    model, predicted = backtest_and_fit(model_id, X, y)
     if model is None:
         return None
 
-    metrics = model_metrics(model, X, y)
-    try:
-        model.fit(X, y)
-    except Exception:
-        return None
-    sigma = residual_sigma(model, X, y)
-    ci = 1.96 * sigma
+    if predicted is None:
+        metrics = {"mae": None, "rmse": None, "mape": None}
+        ci = 0.0
+    else:
+        metrics = error_metrics(y[len(y) - len(predicted):], predicted)
+        ci = 1.96 * metrics["rmse"]
 
-    history = list(values)
+    # Predictions are written into a preallocated buffer; each step reads
+    # its lags and windows from the view of the values seen so far.
+    history = np.empty(len(values) + horizon)
+    history[:len(values)] = values
     forecast = []
     last_period = periods[-1]
+    last_index = period_index([last_period])[0]
     for step in range(1, horizon + 1):
         next_period = add_months(last_period, step)
-        X_next = build_next_features(history, next_period, available_lags, windows)
+        size = len(values) + step - 1
+        X_next = build_next_features(
+            history[:size], last_index + step, available_lags, windows
+        )
         pred = float(model.predict(X_next)[0])
-        history.append(pred)
+        history[size] = pred
         forecast.append({
             "period": next_period,
             "value": pred,
@@ -243,31 +478,441 @@ def naive_forecast(values, periods, horizon):
     return {"forecast": forecast, "metrics": {"mae": None, "rmse": None, "mape": None}}
 
 
-def main():
-    if not DATA_PATH.exists():
-        raise SystemExit(f"Missing data file: {DATA_PATH}")
+def build_series(columns, all_categories=True):
+    # Groups the dictionary codes level by level (see SERIES_LEVELS) instead of
+    # walking the rows. bincount adds the prices of each (series, period) in row
+    # order, so the sums match a row-by-row loop exactly.
+    period_codes, period_names = columns["periodo"]
+    keep = np.array([bool(p) for p in period_names], dtype=bool)[period_codes]
+    codes = {name: columns[name][0][keep] for name in SERIES_COLUMNS}
+    names = {name: columns[name][1] for name in SERIES_COLUMNS}
+    prices = columns["preco"][keep]
+    n_periods = len(period_names)
+
+    found = []
+    for position, (regional, fields) in enumerate(SERIES_LEVELS):
+        if not fields and not all_categories:
+            continue
+        fields = ("regiao",) + fields if regional else fields
+        group = np.zeros(len(prices), dtype=np.int64)
+        for field in fields:
+            group = group * len(names[field]) + codes[field]
+        groups, first_rows, group_of_row = np.unique(group, return_index=True, return_inverse=True)
+
+        cells, cell_of_row = np.unique(
+            group_of_row * n_periods + codes["periodo"], return_inverse=True
+        )
+        sums = np.bincount(cell_of_row, weights=prices, minlength=len(cells))
+        counts = np.bincount(cell_of_row, minlength=len(cells))
+        periods = [{} for _ in groups]
+        for cell, total, count in zip(cells.tolist(), sums.tolist(), counts.tolist()):
+            periods[cell // n_periods][period_names[cell % n_periods]] = [total, count]
+
+        for g, first_row in enumerate(first_rows.tolist()):
+            values = {field: names[field][codes[field][first_row]] for field in fields}
+            key = build_key(None, values.get("regiao"), values.get("categoria"),
+                            values.get("subcategoria"), values.get("produto"))
+            found.append((first_row, position, key, periods[g]))
+
+    # Same key order as a row-by-row pass: first row, then level
+    series = {}
+    for _, _, key, key_periods in sorted(found, key=lambda item: item[:2]):
+        entry = series.setdefault(key, {"filters": key_to_filters(key), "periods": {}})
+        for period, (total, count) in key_periods.items():
+            acc = entry["periods"].setdefault(period, [0.0, 0])
+            acc[0] += total
+            acc[1] += count
+    return series
 
-    with DATA_PATH.open("r", encoding="utf-8") as f:
-        data = json.load(f)
 
+def iter_series_tasks(series):
+    # Plain tuples, so pool workers get just what they need
+    for key, entry in series.items():
+        period_items = sorted(entry["periods"].items(), key=lambda x: x[0])
+        periods = [p for p, _ in period_items]
+        values = [v / c for _, (v, c) in period_items if c > 0]
+        if len(values) < 8:
+            continue
+        yield key, entry["filters"], periods, values
+
+
+def forecast_task(task):
+    key, filters, periods, values = task
+    last_period = periods[-1]
+    horizon = series_horizon(last_period)
+    if horizon is None:
+        return key, None
+
+    series_out = {
+        "filters": filters,
+        "last_period": last_period,
+        "forecast_end": add_months(last_period, horizon),
+        "models": {}
+    }
+
+    # naive baseline
+    naive = naive_forecast(values, periods, horizon)
+    if naive:
+        series_out["models"]["naive"] = naive
+
+    if len(values) >= 18:
+        result = forecast_series(values, periods, "random_forest", horizon)
+        if result:
+            series_out["models"]["random_forest"] = result
+
+    if len(values) >= 30:
+        for model_id in ("xgboost", "lightgbm"):
+            result = forecast_series(values, periods, model_id, horizon)
+            if result:
+                series_out["models"][model_id] = result
+
+    return key, series_out if series_out["models"] else None
+
+
+def forecast_task_keys(task):
+    # forecast_task plus the backtest cache keys the series used, so the
+    # index can keep them when the cache is evicted
+    _BACKTEST_KEYS.clear()
+    key, series_out = forecast_task(task)
+    return key, series_out, list(_BACKTEST_KEYS)
+
+
+def series_horizon(last_period):
+    horizon_to_target = months_between(last_period, TARGET_PERIOD)
+    if horizon_to_target < 1:
+        return None
+    return min(horizon_to_target, MAX_HORIZON)
+
+
+def hierarchy_codes(tasks):
+    # Integer code per level value; "*" (aggregated level) is -1
+    codes = {}
+    for field in HIERARCHY_FIELDS:
+        names = sorted({task[1][field] for task in tasks if task[1][field] is not None})
+        codes[field] = {name: i for i, name in enumerate(names)}
+    return codes
+
+
+def global_member(key, filters, periods, values, horizon, codes):
+    values = np.asarray(values, dtype=float)
+    # Series are fitted on values / mean level; log(scale) keeps the level
+    # available to the model.
+    scale = float(np.mean(np.abs(values))) or 1.0
+    X, y = build_features(values / scale, periods, GLOBAL_LAGS, GLOBAL_WINDOWS)
+    # Calendar period of each row's target, for the holdout split
+    targets = period_index(periods[max(GLOBAL_LAGS):])
+    extra = np.array(
+        [codes[field].get(filters[field], -1) for field in HIERARCHY_FIELDS] + [math.log(scale)]
+    )
+    return {
+        "key": key,
+        "values": values,
+        "periods": periods,
+        "horizon": horizon,
+        "scale": scale,
+        "extra": extra,
+        "X": np.column_stack([X, np.tile(extra, (len(X), 1))]),
+        "y": y,
+        "targets": targets,
+    }
+
+
+def holdout_cutoff(members):
+    # First held-out period: the latest ~20% of all rows by target period.
+    # Aggregated series are means of the product series, so holding out the
+    # last rows of each series separately would leak held-out periods into
+    # training through the other series; a calendar cutoff does not.
+    targets = np.sort(np.concatenate([m["targets"] for m in members]))
+    return targets[len(targets) - holdout_size(len(targets))]
+
+
+def fit_global(model_id, members):
+    # One fit on the periods before the cutoff for the metrics and interval
+    # width (out-of-sample residuals, like the local backtest), one fit on all
+    # rows, then one batched predict per horizon step.
+    X_all = np.vstack([m["X"] for m in members])
+    y_all = np.concatenate([m["y"] for m in members])
+    test_mask = np.concatenate([m["targets"] for m in members]) >= holdout_cutoff(members)
+    try:
+        model = train_model(model_id, X_all[~test_mask], y_all[~test_mask])
+        test_preds = np.full(len(y_all), np.nan)
+        test_preds[test_mask] = model.predict(X_all[test_mask])
+        model = train_model(model_id, X_all, y_all)
+    except Exception:
+        return {}
+
+    results = {}
+    offset = 0
+    for m in members:
+        n = len(m["y"])
+        held_out = test_mask[offset:offset + n]
+        if held_out.sum() >= 3:
+            y_test = m["y"][held_out] * m["scale"]
+            preds = test_preds[offset:offset + n][held_out] * m["scale"]
+            metrics = error_metrics(y_test, preds)
+            ci = 1.96 * metrics["rmse"]
+        else:
+            # Series that ended before the cutoff cannot be evaluated
+            metrics = {"mae": None, "rmse": None, "mape": None}
+            ci = 0.0
+        results[m["key"]] = {"forecast": [], "metrics": metrics, "ci": ci}
+        offset += n
+
+    histories = []
+    for m in members:
+        history = np.empty(len(m["values"]) + m["horizon"])
+        history[:len(m["values"])] = m["values"] / m["scale"]
+        histories.append(history)
+    last_indices = [period_index([m["periods"][-1]])[0] for m in members]
+
+    for step in range(1, max(m["horizon"] for m in members) + 1):
+        active = [i for i, m in enumerate(members) if m["horizon"] >= step]
+        sizes = [len(members[i]["values"]) + step - 1 for i in active]
+        X_step = np.vstack([
+            np.concatenate([
+                build_next_features(
+                    histories[i][:size], last_indices[i] + step, GLOBAL_LAGS, GLOBAL_WINDOWS
+                )[0],
+                members[i]["extra"],
+            ])
+            for i, size in zip(active, sizes)
+        ])
+        preds = model.predict(X_step)
+        for i, size, pred in zip(active, sizes, preds):
+            m = members[i]
+            histories[i][size] = pred
+            value = float(pred) * m["scale"]
+            result = results[m["key"]]
+            result["forecast"].append({
+                "period": add_months(m["periods"][-1], step),
+                "value": value,
+                "lower": value - result["ci"],
+                "upper": value + result["ci"]
+            })
+
+    for result in results.values():
+        del result["ci"]
+    return results
+
+
+def forecast_global(tasks):
+    codes = hierarchy_codes(tasks)
+    outputs = {}
+    members = []
+    for key, filters, periods, values in tasks:
+        horizon = series_horizon(periods[-1])
+        if horizon is None:
+            continue
+        outputs[key] = {
+            "filters": filters,
+            "last_period": periods[-1],
+            "forecast_end": add_months(periods[-1], horizon),
+            "models": {}
+        }
+        naive = naive_forecast(values, periods, horizon)
+        if naive:
+            outputs[key]["models"]["naive"] = naive
+        if len(values) >= min(MODEL_MIN_POINTS.values()):
+            members.append(global_member(key, filters, periods, values, horizon, codes))
+
+    for model_id, min_points in MODEL_MIN_POINTS.items():
+        eligible = [m for m in members if len(m["values"]) >= min_points]
+        if not eligible:
+            continue
+        for key, result in fit_global(model_id, eligible).items():
+            outputs[key]["models"][model_id] = result
+
+    return {key: out if out["models"] else None for key, out in outputs.items()}
+
+
+def ignore_feature_name_warnings():
     warnings.filterwarnings(
         "ignore",
         message="X does not have valid feature names*"
     )
 
-    series = {}
-    for row in data:
-        period = row.get("periodo")
-        if not period:
-            continue
-        for key in iter_keys(row):
-            entry = series.setdefault(key, {
-                "filters": key_to_filters(key),
-                "periods": defaultdict(lambda: [0.0, 0])
-            })
-            acc = entry["periods"][period]
-            acc[0] += float(row["preco"])
-            acc[1] += 1
+
+def configure_backtest(folds, use_cache, workers):
+    global BACKTEST_FOLDS, USE_BACKTEST_CACHE, BACKTEST_WORKERS
+    BACKTEST_FOLDS = folds
+    USE_BACKTEST_CACHE = use_cache
+    BACKTEST_WORKERS = workers
+
+
+def configure_serial_run(folds, use_cache):
+    global MODEL_THREADS
+    cpus = os.cpu_count() or 1
+    # Folds and the final fit run side by side, sharing the cores
+    workers = min(folds + 1, cpus)
+    if workers > 1:
+        MODEL_THREADS = max(1, cpus // workers)
+    configure_backtest(folds, use_cache, workers)
+
+
+def init_worker(threads, folds, use_cache):
+    global MODEL_THREADS
+    MODEL_THREADS = threads
+    # The pool already runs one series per core: folds are fitted in sequence
+    configure_backtest(folds, use_cache, 1)
+    # Also caps OpenMP/BLAS pools of libraries not configured through n_jobs
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    ignore_feature_name_warnings()
+
+
+def run_parallel(tasks, jobs, folds, use_cache):
+    workers = jobs if jobs > 0 else (os.cpu_count() or 1)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    # Longest series first: they train the most models on the most rows,
+    # and starting them last would leave one worker running alone at the end.
+    ordered = sorted(tasks, key=lambda task: len(task[3]), reverse=True)
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(threads, folds, use_cache)
+    ) as pool:
+        futures = [pool.submit(forecast_task_keys, task) for task in ordered]
+        return [future.result() for future in futures]
+
+
+def run_config_digest(args):
+    config = {
+        "version": FORECAST_VERSION,
+        "target_period": TARGET_PERIOD,
+        "max_horizon": MAX_HORIZON,
+        "model_params": MODEL_PARAMS,
+        "libraries": {model_id: library_version(model_id) for model_id in MODEL_DISTRIBUTIONS},
+        "mode": args.mode,
+    }
+    if args.mode == "local":
+        config["folds"] = args.folds
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+def series_fingerprint(task, config_digest):
+    key, _, periods, values = task
+    digest = hashlib.sha256(config_digest.encode())
+    digest.update(key.encode())
+    digest.update("\0".join(periods).encode())
+    digest.update(np.asarray(values, dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_index():
+    if not FORECAST_INDEX_PATH.exists():
+        return {}
+    try:
+        with FORECAST_INDEX_PATH.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def load_previous(output_path):
+    # (fingerprints, series, backtest keys) of the last run that wrote
+    # output_path; nothing if the file is gone or was changed since
+    entry = load_index().get(str(output_path.resolve()))
+    if not entry or not output_path.exists() or file_sha256(output_path) != entry["sha256"]:
+        return {}, {}, {}
+    with output_path.open("r", encoding="utf-8") as f:
+        series = json.load(f)["series"]
+    return entry["fingerprints"], series, entry.get("backtest_keys", {})
+
+
+def save_index(output_path, fingerprints, backtest_keys):
+    # Entries of outputs deleted since are dropped along with their cache keys
+    index = {path: entry for path, entry in load_index().items() if Path(path).exists()}
+    index[str(output_path.resolve())] = {
+        "sha256": file_sha256(output_path),
+        "fingerprints": fingerprints,
+        "backtest_keys": backtest_keys,
+    }
+    FORECAST_INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = FORECAST_INDEX_PATH.with_name(FORECAST_INDEX_PATH.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, FORECAST_INDEX_PATH)
+    return index
+
+
+def evict_backtest_cache(index):
+    # Removes backtest entries no series of an indexed output uses any more
+    if not BACKTEST_CACHE_DIR.exists():
+        return 0
+    keep = {
+        key
+        for entry in index.values()
+        for keys in entry.get("backtest_keys", {}).values()
+        for key in keys
+    }
+    removed = 0
+    for path in BACKTEST_CACHE_DIR.glob("*.json"):
+        if path.stem not in keep:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate offline price forecasts.")
+    parser.add_argument(
+        "--categoria", action="append", metavar="NAME",
+        help="only forecast these categories (repeatable); reads just their shards "
+             "when shards/manifest.json exists. All-category series are skipped."
+    )
+    parser.add_argument(
+        "--output", type=Path, default=None,
+        help=f"output path (default: {OUTPUT_PATH})"
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1,
+        help="worker processes, one series at a time each (0 = all cores); "
+             "model threads are split evenly between workers. Local mode only"
+    )
+    parser.add_argument(
+        "--folds", type=int, default=None,
+        help="rolling-origin backtest folds over the last 20%% of each series "
+             f"(default: {BACKTEST_FOLDS}); 1 reproduces a single holdout. Local mode only"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help=f"ignore the backtest cache in {BACKTEST_CACHE_DIR} and the previous "
+             "output: retrain every series"
+    )
+    parser.add_argument(
+        "--mode", choices=("local", "global"), default="local",
+        help="local: one model per series and family; global: one model per family "
+             "trained on all series (scaled, with hierarchy codes as features)"
+    )
+    args = parser.parse_args(argv)
+    if args.mode == "global":
+        # One model per family over all series: nothing to spread over
+        # processes, and the holdout is a single calendar cutoff
+        if args.jobs != 1:
+            parser.error("--jobs is not supported with --mode global")
+        if args.folds is not None:
+            parser.error("--folds is not supported with --mode global")
+    elif args.folds is None:
+        args.folds = BACKTEST_FOLDS
+    elif args.folds < 1:
+        parser.error("--folds must be at least 1")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output_path = args.output or OUTPUT_PATH
+    columns = load_price_columns(args.categoria)
+
+    ignore_feature_name_warnings()
+
+    series = build_series(columns, all_categories=not args.categoria)
 
     output = {
         "meta": {
@@ -284,51 +929,50 @@ def main():
         "series": {}
     }
 
-    for key, entry in series.items():
-        period_items = sorted(entry["periods"].items(), key=lambda x: x[0])
-        periods = [p for p, _ in period_items]
-        values = [v / c for _, (v, c) in period_items if c > 0]
-
-        if len(values) < 8:
-            continue
-
-        last_period = periods[-1]
-        horizon_to_target = months_between(last_period, TARGET_PERIOD)
-        if horizon_to_target < 1:
-            continue
-        horizon = min(horizon_to_target, MAX_HORIZON)
-
-        series_out = {
-            "filters": entry["filters"],
-            "last_period": last_period,
-            "forecast_end": add_months(last_period, horizon),
-            "models": {}
-        }
-
-        # naive baseline
-        naive = naive_forecast(values, periods, horizon)
-        if naive:
-            series_out["models"]["naive"] = naive
-
-        if len(values) >= 18:
-            result = forecast_series(values, periods, "random_forest", horizon)
-            if result:
-                series_out["models"]["random_forest"] = result
-
-        if len(values) >= 30:
-            for model_id in ("xgboost", "lightgbm"):
-                result = forecast_series(values, periods, model_id, horizon)
-                if result:
-                    series_out["models"][model_id] = result
-
-        if series_out["models"]:
-            output["series"][key] = series_out
-
-    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with OUTPUT_PATH.open("w", encoding="utf-8") as f:
+    tasks = list(iter_series_tasks(series))
+    config_digest = run_config_digest(args)
+    fingerprints = {task[0]: series_fingerprint(task, config_digest) for task in tasks}
+    previous_fingerprints, previous_series, previous_keys = (
+        ({}, {}, {}) if args.no_cache else load_previous(output_path)
+    )
+    dirty = [task for task in tasks if previous_fingerprints.get(task[0]) != fingerprints[task[0]]]
+    if args.mode == "global" and (dirty or set(previous_fingerprints) != set(fingerprints)):
+        # One model sees every series: any change retrains all of them
+        dirty = tasks
+    dirty_keys = {task[0] for task in dirty}
+    results = {key: previous_series.get(key) for key in fingerprints if key not in dirty_keys}
+    backtest_keys = {key: previous_keys.get(key, []) for key in results}
+    print(f"{len(dirty)} series to forecast, {len(results)} unchanged since the last run")
+
+    if args.mode == "global":
+        output["meta"]["mode"] = "global"
+        if dirty:
+            results.update(forecast_global(dirty))
+    else:
+        if args.jobs == 1:
+            configure_serial_run(args.folds, not args.no_cache)
+            forecasts = map(forecast_task_keys, dirty)
+        else:
+            forecasts = run_parallel(dirty, args.jobs, args.folds, not args.no_cache)
+        for key, series_out, keys in forecasts:
+            results[key] = series_out
+            backtest_keys[key] = keys
+
+    # Rebuild in series order so the output matches the serial run
+    for key, _, _, _ in tasks:
+        if results.get(key):
+            output["series"][key] = results[key]
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("w", encoding="utf-8") as f:
         json.dump(output, f, ensure_ascii=False)
+    index = save_index(output_path, fingerprints, backtest_keys)
+    if not args.no_cache:
+        removed = evict_backtest_cache(index)
+        if removed:
+            print(f"Removed {removed} unused backtest cache entries")
 
-    print(f"Wrote {OUTPUT_PATH} with {len(output['series'])} series")
+    print(f"Wrote {output_path} with {len(output['series'])} series")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Executa o pipeline de dados como um grafo de etapas com entradas e saidas
+declaradas: ingest -> aggregate, nomenclature e forecast.
+
+Como o make, mas pelo conteudo: uma etapa e pulada quando o hash das suas
+entradas e das suas saidas e o mesmo da ultima execucao bem-sucedida. Uma
+etapa reexecutada que produz saidas identicas nao invalida as seguintes.
+
+Uso: python scripts/pipeline.py [etapas...] [--jobs N] [--force] [--dry-run]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+# Entradas, saidas e estado ficam na raiz do repositorio (herdado pelas etapas)
+os.environ.setdefault('PRECOS_FLORESTAIS_DIR', str(SCRIPTS_DIR.parent))
+
+import preprocess_data as pp  # noqa: E402
+
+STATE_PATH = pp.BASE_DIR / ".cache" / "pipeline.json"
+STAGE_NAMES = ('ingest', 'aggregate', 'nomenclature', 'forecast')
+
+
+class Stage:
+    """
+    Etapa do pipeline: comando, arquivos de entrada e saida, dependencias.
+    Uma saida pode ser uma tupla de alternativas (basta uma existir).
+    """
+
+    def __init__(self, name, command, inputs, outputs, deps=(), cwd=None):
+        self.name = name
+        self.command = command
+        self.inputs = inputs
+        self.outputs = [o if isinstance(o, tuple) else (o,) for o in outputs]
+        self.deps = tuple(deps)
+        self.cwd = cwd
+
+    @property
+    def output_paths(self):
+        return [path for group in self.outputs for path in group]
+
+    def missing_outputs(self):
+        return [' ou '.join(relative(p) for p in group)
+                for group in self.outputs if not any(p.exists() for p in group)]
+
+
+def build_stages(jobs):
+    """Grafo de etapas; cada etapa le as saidas das suas dependencias"""
+    preprocess = SCRIPTS_DIR / 'preprocess_data.py'
+    forecasts = SCRIPTS_DIR / 'generate_forecasts.py'
+    detailed = pp.OUTPUT_DIR / 'detailed.json'
+    records = [detailed]
+    if pp.pa is not None:
+        records += [pp.OUTPUT_DIR / 'detailed.arrow', pp.OUTPUT_DIR / 'detailed.parquet']
+
+    def run_preprocess(stage, *extra):
+        return [sys.executable, str(preprocess), '--stage', stage] + list(extra)
+
+    return [
+        Stage(
+            'ingest', run_preprocess('ingest', '--jobs', str(jobs)),
+            [preprocess] + [filepath for filepath, _, _ in pp.list_input_files()],
+            records,
+        ),
+        Stage(
+            'aggregate', run_preprocess('aggregate'),
+            [preprocess, detailed],
+            [pp.OUTPUT_DIR / 'aggregated.json', pp.OUTPUT_DIR / 'cube.json'],
+            deps=['ingest'],
+        ),
+        Stage(
+            'nomenclature', run_preprocess('nomenclature'),
+            [preprocess, detailed],
+            # xlsx, ou csv quando o Excel falha
+            [pp.NOMENCLATURE_OUTPUTS],
+            deps=['ingest'],
+        ),
+        Stage(
+            'forecast', [sys.executable, str(forecasts), '--jobs', str(jobs)],
+            [forecasts, detailed],
+            [pp.OUTPUT_DIR / 'forecasts.json'],
+            deps=['ingest'],
+            # generate_forecasts.py resolve os caminhos a partir do diretorio atual
+            cwd=pp.BASE_DIR.resolve(),
+        ),
+    ]
+
+
+def select_stages(stages, targets):
+    """Etapas pedidas e suas dependencias, em ordem topologica"""
+    by_name = {stage.name: stage for stage in stages}
+    ordered = []
+    visiting = set()
+
+    def visit(name):
+        stage = by_name[name]
+        if stage in ordered:
+            return
+        if name in visiting:
+            raise SystemExit(f"Ciclo no grafo de etapas em '{name}'")
+        visiting.add(name)
+        for dep in stage.deps:
+            visit(dep)
+        visiting.discard(name)
+        ordered.append(stage)
+
+    for name in targets or by_name:
+        visit(name)
+    return ordered
+
+
+def relative(path):
+    try:
+        return path.resolve().relative_to(pp.BASE_DIR.resolve()).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def files_digest(paths):
+    """Hash combinado de caminho + conteudo dos arquivos (ausentes tambem contam)"""
+    digest = hashlib.sha256()
+    for path in sorted(paths, key=relative):
+        content = pp.file_hash(path) if path.exists() else 'ausente'
+        digest.update(f"{relative(path)}\0{content}\n".encode())
+    return digest.hexdigest()
+
+
+def load_state():
+    if not STATE_PATH.exists():
+        return {}
+    try:
+        with open(STATE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_state(state):
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = STATE_PATH.with_name(STATE_PATH.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def stage_status(stage, state):
+    """(atualizada, motivo, hash das entradas)"""
+    inputs = files_digest(stage.inputs)
+    recorded = state.get(stage.name)
+    if not recorded:
+        return False, "nunca executada", inputs
+    if recorded.get('entradas') != inputs:
+        return False, "entradas alteradas", inputs
+    missing = stage.missing_outputs()
+    if missing:
+        return False, f"saida ausente: {', '.join(missing)}", inputs
+    if recorded.get('saidas') != files_digest(stage.output_paths):
+        return False, "saidas alteradas fora do pipeline", inputs
+    return True, "atualizada", inputs
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        'targets', nargs='*', metavar='etapa',
+        help=f"etapas a executar, com suas dependencias ({', '.join(STAGE_NAMES)}; padrao: todas)"
+    )
+    parser.add_argument(
+        '--jobs', '-j', type=int, default=1,
+        help="processos nas etapas ingest (leitura dos arquivos) e forecast (series) (0 = todos os nucleos)"
+    )
+    parser.add_argument('--force', action='store_true', help="executa as etapas mesmo se atualizadas")
+    parser.add_argument('--dry-run', action='store_true', help="apenas mostra o que seria executado")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.targets if name not in STAGE_NAMES]
+    if unknown:
+        parser.error(f"etapa desconhecida: {', '.join(unknown)}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = select_stages(build_stages(args.jobs), args.targets)
+    state = load_state()
+    stale = set()
+    started = time.perf_counter()
+
+    for stage in stages:
+        up_to_date, reason, inputs = stage_status(stage, state)
+        if args.force:
+            up_to_date, reason = False, "forcada"
+        elif args.dry_run and up_to_date and stale.intersection(stage.deps):
+            # Sem executar a dependencia nao da para saber se as entradas mudam
+            up_to_date, reason = False, "dependencia sera executada"
+
+        if up_to_date:
+            print(f"[{stage.name}] atualizada - pulando")
+            continue
+
+        print(f"[{stage.name}] executando ({reason})")
+        stale.add(stage.name)
+        if args.dry_run:
+            continue
+
+        stage_start = time.perf_counter()
+        result = subprocess.run(stage.command, cwd=stage.cwd)
+        if result.returncode != 0:
+            print(f"[{stage.name}] falhou (codigo {result.returncode})")
+            sys.exit(result.returncode)
+        missing = stage.missing_outputs()
+        if missing:
+            print(f"[{stage.name}] nao gerou {', '.join(missing)}")
+            sys.exit(1)
+
+        state[stage.name] = {'entradas': inputs, 'saidas': files_digest(stage.output_paths)}
+        save_state(state)
+        print(f"[{stage.name}] concluida em {time.perf_counter() - stage_start:.1f}s")
+
+    print(f"\nPipeline concluido em {time.perf_counter() - started:.1f}s "
+          f"({len(stale)} de {len(stages)} etapas executadas)")
+
+
+if __name__ == '__main__':
+    main()
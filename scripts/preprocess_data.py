@@ -6,21 +6,65 @@ Consolida todos os arquivos Excel em formato JSON para o dashboard
 Versao 2025 - Mapeamento integrado e padronizado
 """
 
-import pandas as pd
-import numpy as np
+import argparse
+import hashlib
+import importlib.util
 import json
+import math
+import os
 import re
+import shutil
+import sys
+import time
 import unicodedata
+from abc import ABC, abstractmethod
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache, wraps
 from pathlib import Path
 
 try:
-    import pdfplumber
-except Exception:
-    pdfplumber = None
+    import resource
+except ImportError:
+    resource = None
 
-BASE_DIR = Path("E:/Preços Florestais")
+
+def _lazy_import(name):
+    """
+    Modulo carregado apenas no primeiro acesso a um atributo (None se ausente).
+    Mantem a inicializacao rapida para comandos que nao leem planilhas.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return None
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+pd = _lazy_import('pandas')
+np = _lazy_import('numpy')
+pdfplumber = _lazy_import('pdfplumber')
+pa = _lazy_import('pyarrow')
+
+# Raiz do projeto; PRECOS_FLORESTAIS_DIR aponta para outra copia (pipeline.py
+# usa a raiz do repositorio, como no CI)
+BASE_DIR = Path(os.environ.get('PRECOS_FLORESTAIS_DIR', "E:/Preços Florestais"))
 DATA_DIR = BASE_DIR / "data"
 OUTPUT_DIR = BASE_DIR / "dashboard" / "public" / "data"
+CACHE_DIR = BASE_DIR / ".cache" / "preprocess"
+STATE_PATH = BASE_DIR / ".cache" / "aggregation_state.json"
+PROFILES_DIR = BASE_DIR / ".cache" / "profiles"
+PDF_TABLES_DIR = BASE_DIR / ".cache" / "pdf_tables"
+
+# Incrementar quando o formato dos registros em cache mudar
+CACHE_VERSION = 3
 
 # =============================================================================
 # REGIOES PADRONIZADAS
@@ -183,14 +227,275 @@ CATEGORIAS_PADRAO = {
 }
 
 
+# =============================================================================
+# MEMOIZACAO DAS FUNCOES DE NORMALIZACAO E CLASSIFICACAO
+# Os mesmos rotulos de produto e regiao se repetem em todos os boletins
+# =============================================================================
+
+MEMO_MAXSIZE = 65536
+_MEMOIZED = {}
+_WORKER_MEMO_STATS = {}
+
+
+def memoized(func):
+    """Cache limitado (LRU) com contadores de acerto/erro para funcoes puras"""
+    cached = lru_cache(maxsize=MEMO_MAXSIZE, typed=True)(func)
+
+    @wraps(func)
+    def wrapper(value):
+        try:
+            return cached(value)
+        except TypeError:
+            # Valor nao hashable: calcula sem cache
+            return func(value)
+
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    _MEMOIZED[func.__name__] = wrapper
+    return wrapper
+
+
+def memo_counters():
+    """Retorna {funcao: (acertos, erros)} do processo atual"""
+    return {name: fn.cache_info()[:2] for name, fn in _MEMOIZED.items()}
+
+
+def merge_memo_counters(before, after):
+    """Acumula o trabalho feito em um worker (diferenca entre dois snapshots)"""
+    for name, (hits, misses) in after.items():
+        prev_hits, prev_misses = before.get(name, (0, 0))
+        acc = _WORKER_MEMO_STATS.setdefault(name, [0, 0])
+        acc[0] += hits - prev_hits
+        acc[1] += misses - prev_misses
+
+
+def memo_stats():
+    """Estatisticas de cache somando o processo principal e os workers"""
+    stats = {}
+    for name, fn in _MEMOIZED.items():
+        info = fn.cache_info()
+        worker_hits, worker_misses = _WORKER_MEMO_STATS.get(name, (0, 0))
+        hits = info.hits + worker_hits
+        misses = info.misses + worker_misses
+        total = hits + misses
+        stats[name] = {
+            'acertos': hits,
+            'erros': misses,
+            'taxa_acerto': hits / total if total else 0.0,
+            'tamanho': info.currsize,
+            'limite': info.maxsize,
+        }
+    return stats
+
+
+def print_memo_stats():
+    print("\nESTATISTICAS DE CACHE (memoizacao):")
+    for name, st in memo_stats().items():
+        print(f"  {name}: {st['acertos']} acertos, {st['erros']} erros "
+              f"({st['taxa_acerto']:.1%}), {st['tamanho']}/{st['limite']} entradas")
+
+
+# =============================================================================
+# PERFIL DE EXECUCAO (--profile)
+# Tempos por arquivo (leitura por engine, cabecalho, classificacao) e por etapa
+# =============================================================================
+
+PROFILE_ENABLED = False
+_FILE_TIMINGS = {}
+_FILE_PROFILES = []
+_STAGE_TIMINGS = {}
+
+
+def configure_profiling(enabled):
+    global PROFILE_ENABLED
+    PROFILE_ENABLED = enabled
+
+
+def add_time(bucket, seconds, timings=None):
+    """Acumula o tempo em bucket (por padrao, nos tempos do arquivo atual)"""
+    timings = _FILE_TIMINGS if timings is None else timings
+    timings[bucket] = timings.get(bucket, 0.0) + seconds
+
+
+@contextmanager
+def profiled(bucket, timings=None):
+    """Mede o bloco em bucket quando o perfil esta ativo"""
+    if not PROFILE_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(bucket, time.perf_counter() - start, timings)
+
+
+def stage_timer(stage):
+    """Mede o bloco como parte de uma etapa da execucao"""
+    return profiled(stage, _STAGE_TIMINGS)
+
+
+def timed(bucket):
+    """Decorador: acumula em bucket o tempo das chamadas quando o perfil esta ativo"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILE_ENABLED:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add_time(bucket, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+# Maior pico de memoria residente (KB) visto antes de cada reset_peak_rss
+_RSS_PEAK_BEFORE_RESET_KB = 0
+# RSS (KB) no inicio do arquivo atual, ou None se o pico nao pode ser zerado
+_FILE_RSS_START_KB = None
+
+
+def _proc_status_kb(field):
+    """Campo de /proc/self/status em KB (None fora do Linux)"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+def reset_peak_rss():
+    """
+    Zera o pico de memoria residente do processo (VmHWM) escrevendo 5 em
+    /proc/self/clear_refs. Retorna False se o sistema nao permite.
+    """
+    global _RSS_PEAK_BEFORE_RESET_KB
+    peak = _proc_status_kb('VmHWM')
+    if peak is None:
+        return False
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return False
+    _RSS_PEAK_BEFORE_RESET_KB = max(_RSS_PEAK_BEFORE_RESET_KB, peak)
+    return True
+
+
+def peak_rss_mb():
+    """Pico de memoria residente do processo em MB (None sem o modulo resource)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss e informado em KB no Linux e em bytes no macOS
+    peak_kb = peak / 1024 if sys.platform == 'darwin' else peak
+    # reset_peak_rss tambem zera ru_maxrss: os picos anteriores continuam valendo
+    return round(max(peak_kb, _RSS_PEAK_BEFORE_RESET_KB) / 1024, 1)
+
+
+def begin_file_profile():
+    global _FILE_RSS_START_KB
+    _FILE_TIMINGS.clear()
+    _FILE_RSS_START_KB = None
+    if PROFILE_ENABLED and reset_peak_rss():
+        _FILE_RSS_START_KB = _proc_status_kb('VmRSS')
+    return time.perf_counter()
+
+
+def end_file_profile(filepath, year, records, start, origem='parser'):
+    """Registra o perfil do arquivo processado desde begin_file_profile"""
+    if not PROFILE_ENABLED:
+        return
+    elapsed = time.perf_counter() - start
+    # Pico desde begin_file_profile (o reset isola o arquivo); None fora do Linux
+    peak_kb = _proc_status_kb('VmHWM') if _FILE_RSS_START_KB is not None else None
+    _FILE_PROFILES.append({
+        'arquivo': filepath.name,
+        'layout': select_parser(filepath, year).__name__,
+        'origem': origem,
+        'bytes': filepath.stat().st_size,
+        'registros': len(records),
+        'tempo_total': round(elapsed, 6),
+        'leitura': {
+            bucket[len('leitura_'):]: round(seconds, 6)
+            for bucket, seconds in _FILE_TIMINGS.items() if bucket.startswith('leitura_')
+        },
+        'cabecalho': round(_FILE_TIMINGS.get('cabecalho', 0.0), 6),
+        'classificacao': round(_FILE_TIMINGS.get('classificacao', 0.0), 6),
+        'registros_por_s': round(len(records) / elapsed, 1) if elapsed else None,
+        'pico_rss_arquivo_mb': round(peak_kb / 1024, 1) if peak_kb is not None else None,
+        'acrescimo_rss_mb': (
+            round((peak_kb - _FILE_RSS_START_KB) / 1024, 1) if peak_kb is not None else None
+        ),
+        'pid': os.getpid(),
+    })
+
+
+def take_file_profiles():
+    """Remove e retorna os perfis registrados no processo (usado pelos workers)"""
+    profiles = list(_FILE_PROFILES)
+    _FILE_PROFILES.clear()
+    return profiles
+
+
+def build_profile_report(args, elapsed):
+    """Relatorio da execucao: parametros, etapas, resumo por layout e arquivos"""
+    layouts = {}
+    for profile in _FILE_PROFILES:
+        summary = layouts.setdefault(profile['layout'], {
+            'arquivos': 0, 'registros': 0, 'tempo_total': 0.0, 'leitura': {},
+            'cabecalho': 0.0, 'classificacao': 0.0,
+        })
+        summary['arquivos'] += 1
+        summary['registros'] += profile['registros']
+        for field in ('tempo_total', 'cabecalho', 'classificacao'):
+            summary[field] = round(summary[field] + profile[field], 6)
+        for engine, seconds in profile['leitura'].items():
+            summary['leitura'][engine] = round(summary['leitura'].get(engine, 0.0) + seconds, 6)
+
+    return {
+        'gerado_em': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'parametros': {
+            'jobs': args.jobs,
+            'pdf_jobs': args.pdf_jobs,
+            'cache': not args.no_cache,
+            'rebuild': args.rebuild,
+            'etapas': sorted(args.stages),
+            'append': args.append,
+        },
+        'tempo_total': round(elapsed, 6),
+        'pico_rss_mb': peak_rss_mb(),
+        'etapas': {stage: round(seconds, 6) for stage, seconds in _STAGE_TIMINGS.items()},
+        'layouts': layouts,
+        'arquivos': list(_FILE_PROFILES),
+    }
+
+
+def write_profile_report(report, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nPerfil de execucao: {path}")
+    slowest = sorted(report['arquivos'], key=lambda p: p['tempo_total'], reverse=True)[:5]
+    for profile in slowest:
+        print(f"  {profile['arquivo']}: {profile['tempo_total']:.3f}s "
+              f"({profile['layout']}, {profile['origem']}, {profile['registros']} registros)")
+
+
 # =============================================================================
 # MAPEAMENTO DE PRODUTOS - INFALIVEL E COMPLETO
 # O mapeamento usa chaves normalizadas (sem acentos, uppercase, sem espacos)
 # =============================================================================
 
+@memoized
 def normalize_key(text):
     """Normaliza texto para chave de comparacao"""
-    if pd.isna(text):
+    if not isinstance(text, str) and pd.isna(text):
         return ''
     text = str(text)
     text = unicodedata.normalize('NFD', text)
@@ -200,8 +505,9 @@ def normalize_key(text):
 
 
 # Mapeamento completo: (categoria, subcategoria, produto, unidade)
-# Cada entrada mapeia um padrao normalizado para os valores padronizados
-PRODUCT_MAPPING = {}
+# Cada entrada mapeia um padrao normalizado para os valores padronizados.
+# Preenchido no primeiro uso; fora do modulo e lido como PRODUCT_MAPPING
+_PRODUCT_MAPPING = {}
 
 def _add_mapping(patterns, categoria, subcategoria, produto, unidade=None):
     """Adiciona mapeamento para lista de padroes"""
@@ -210,686 +516,702 @@ def _add_mapping(patterns, categoria, subcategoria, produto, unidade=None):
     for p in patterns:
         key = normalize_key(p)
         if key:
-            PRODUCT_MAPPING[key] = (categoria, subcategoria, produto, unidade)
-
-
-# -----------------------------------------------------------------------------
-# MUDAS DE ARAUCARIA
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Araucaria', 'ARAUCARIA', 'ARAUCARIA - Angustifolia',
-    'Araucaria - Araucaria angustifolia', 'Araucaria angustifolia',
-    'Pinheiro Brasileiro - Araucaria angustifolia', 'Pinheiro-brasileiro',
-    'MUDA ARAUCARIA', 'MUDAS ARAUCARIA', 'Mudas de Araucaria',
-    'MUDAS DE ARAUCARIA - Araucaria angustifolia',
-], 'Mudas', 'Araucaria', 'Araucaria', 'R$/unid')
-
-# -----------------------------------------------------------------------------
-# MUDAS DE BRACATINGA
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Bracatinga', 'BRACATINGA', 'Bracatinga - Variedade comum',
-    'Bracatinga-comum', 'Bracatinga - Mimosa scabrella',
-    'BRACATINGADE C.MOURAO', 'BRACATINGA DE C MOURAO',
-    'Mudas de Bracatinga',
-    'MUDAS DE BRACATINGA COMUM - Mimosa scabrella',
-], 'Mudas', 'Bracatinga', 'Bracatinga', 'R$/unid')
-
-_add_mapping([
-    'Bracatinga-Argentina', 'Variedade Argentina',
-    'BRACATINGADE C.MOURAO - Mimosa flocculosa',
-    'Bracatinga Argentina', 'Mudas de Bracatinga Argentina',
-], 'Mudas', 'Bracatinga', 'Bracatinga Argentina', 'R$/unid')
-
-# -----------------------------------------------------------------------------
-# MUDAS DE ERVA-MATE
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Erva-mate', 'ERVA-MATE', 'ERVA-MATE - llex paraguariensis',
-    'Erva-mate - Ilex paraguariensis', 'MUDA ERVA-MATE',
-    'Mudas de Erva-mate', 'ERVA MATE',
-], 'Mudas', 'Erva-mate', 'Erva-mate', 'R$/unid')
-
-# -----------------------------------------------------------------------------
-# MUDAS DE EUCALIPTO CLONAL
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'AEC 144 e 224', 'AEC144', 'AEC224',
-    'Eucalyptus grancan', 'Eucalyptus grancam',
-    'Eucalyptus urograndis', 'Eucalyptus urograndis 144',
-    'Eucalyptus uroxgrandis', 'Eucalyptus urograndis - 1528',
-    'Eucalyptus urograndis - H13', 'H 144 H 13', 'H 144; H 13',
-    'H 144; H 13 e 158', 'I 144; H 13 e 158', 'H144', 'H13', 'I144',
-    'UROPHILA GRANDIS', 'EUCA 105 H13', 'URO GRANDIS',
-    'UROPHILA GRANDIS â€“ EUCA 105 H13 (URO GRANDIS)',
-    'Eucalyptus urophylla', 'Eucalyptus urophylla 1528, 2070',
-    'Eucalyptus urophylla GG100, GG157, 2361',
-    'Eucalyptus urophylla GG100, GG157, 2361, 2070',
-    'GG100', 'GG157', '2361', '2070', '1528',
-    'Eucalyptus saligna, E. dunnii',
-    'Mudas de Eucalipto Clonal', 'EUCALIPTO CLONAL',
-    'MUDAS DE EUCALIPTO - Eucalyptus urograndis',
-], 'Mudas', 'Eucalipto Clonal', 'Eucalipto Clonal', 'R$/unid')
-
-# -----------------------------------------------------------------------------
-# MUDAS DE EUCALIPTO SEMINAL (propagacao por sementes)
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Eucalipto benthamii', 'E. benthamii', 'Eucalyptus benthamii',
-    'Mudas de Eucalyptus benthamii',
-    'MUDAS DE EUCALIPTO - Eucalyptus benthamii',
-], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus benthamii', 'R$/unid')
-
-_add_mapping([
-    'Eucalipto camaldulensis', 'E. camaldulensis', 'Eucalyptus camaldulensis',
-    'Mudas de Eucalyptus camaldulensis',
-], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus camaldulensis', 'R$/unid')
-
-_add_mapping([
-    'Eucalipto citriodora', 'E. citriodora', 'Eucalyptus citriodora',
-    'Corymbia citriodora', 'Mudas de Corymbia citriodora',
-    'MUDAS DE EUCALIPTO - Corymbia citriodora',
-], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus citriodora', 'R$/unid')
-
-_add_mapping([
-    'Eucalipto dunnii', 'E. dunnii', 'Eucalyptus dunnii',
-    'Eucalipto - E. dunnii', 'Mudas de Eucalyptus dunnii',
-    'MUDAS DE EUCALIPTO - Eucalyptus dunnii',
-], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus dunnii', 'R$/unid')
-
-_add_mapping([
-    'Eucalipto grandis', 'E. grandis', 'Eucalyptus grandis',
-    'Mudas de Eucalyptus grandis',
-    'MUDAS DE EUCALIPTO - Eucalyptus grandis',
-], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus grandis', 'R$/unid')
-
-_add_mapping([
-    'Eucalipto saligna', 'E. saligna', 'Eucalyptus saligna',
-    'EUCALIPTO - E. saligna', 'Mudas de Eucalyptus saligna',
-    'MUDAS DE EUCALIPTO - Eucalyptus saligna',
-], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus saligna', 'R$/unid')
-
-_add_mapping([
-    'Eucalipto viminalis', 'E. viminalis', 'Eucalyptus viminalis',
-    'Mudas de Eucalyptus viminalis',
-    'MUDAS DE EUCALIPTO - Eucalyptus viminalis',
-], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus viminalis', 'R$/unid')
-
-_add_mapping([
-    'Eucalyptus urophylla', 'Mudas de Eucalyptus urophylla',
-], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus urophylla', 'R$/unid')
-
-# -----------------------------------------------------------------------------
-# MUDAS DE PINUS SEMINAL
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Pinus elliottii', 'P. elliottii', 'Pinus - P. elliottii',
-    'Mudas de Pinus elliottii',
-    'MUDAS DE PINUS - Pinus elliottii',
-], 'Mudas', 'Pinus Seminal', 'Pinus elliottii', 'R$/unid')
-
-_add_mapping([
-    'Pinus taeda', 'P. taeda', 'Mudas de Pinus taeda',
-    'MUDAS DE PINUS - Pinus taeda',
-], 'Mudas', 'Pinus Seminal', 'Pinus taeda', 'R$/unid')
-
-_add_mapping([
-    'Pinus tropicais', 'Tropicais', 'Mudas de Pinus tropicais',
-    'MUDAS DE PINUS - Tropicais',
-], 'Mudas', 'Pinus Seminal', 'Pinus tropicais', 'R$/unid')
-
-# -----------------------------------------------------------------------------
-# MUDAS DE PALMITO
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Palmito Jucara', 'Palmito JuÃ§ara', 'Palmito JuÃ§ara - Euterpe edulis',
-    'Euterpe edulis', 'Jucara', 'Mudas de Palmito Jucara',
-    'MUDAS DE PALMITO-JUCARA - Euterpe edulis',
-], 'Mudas', 'Palmito', 'Palmito Jucara', 'R$/unid')
-
-_add_mapping([
-    'Palmito Pupunha', 'Palmito Pupunha - Euterpe oleracea',
-    'Euterpe oleracea', 'Pupunha', 'Mudas de Palmito Pupunha',
-    'Bactris gasipaes',
-    'MUDAS DE PALMITO-PUPUNHA - Bactris gasipaes',
-], 'Mudas', 'Palmito', 'Palmito Pupunha', 'R$/unid')
-
-# -----------------------------------------------------------------------------
-# MUDAS DE NATIVAS
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Angico', 'ANGICO-BRANCO', 'ANGICO BRANCO',
-    'Angico branco - Anadenanthera colubrina',
-    'MUDAS DE ANGICO-BRANCO - Anadenanthera colubrina',
-    'MUDAS DE ANGICO-BRANCO - Anadenanthera colubrina - R$/unid.',
-    'MUDAS DE ANGICO-BRANCO - Anadenanthera colubrina - R$/unidade',
-    'Anadenanthera colubrina', 'Mudas de Angico',
-], 'Mudas', 'Nativas', 'Angico', 'R$/unid')
-
-_add_mapping([
-    'Aroeira', 'AROEIRA VERMELHA', 'AROEIRA-VERMELHA',
-    'AROEIRA VERMELHA - Schinus terebinthifolius',
-    'MUDAS DE AROEIRA VERMELHA - Schinus terebinthifolius',
-    'MUDAS DE AROEIRA VERMELHA - Schinus terebinthifolius - R$/unid.',
-    'MUDAS DE AROEIRA VERMELHA - Schinus terebinthifolius - R$/unidade',
-    'MUDAS ENERGIA E REVEGETACAO AROEIRA VERMELHA (Schinus terebinthifolius) muda/saquinho',
-    'Schinus terebinthifolius', 'Mudas de Aroeira',
-], 'Mudas', 'Nativas', 'Aroeira', 'R$/unid')
-
-_add_mapping([
-    'Canafistula', 'CANAFISTOLA', 'CANAFISTULA',
-    'CANAFISTOLA - Peltophorum dubium', 'CANAFISTULA - Peltophorum dubium',
-    'MUDAS DE CANAFISTULA - Peltophorum dubium',
-    'MUDAS DE CANAFISTULA - Peltophorum dubium - R$/unid.',
-    'MUDAS DE CANAFISTULA - Peltophorum dubium - R$/unidade',
-    'Peltophorum dubium', 'Mudas de Canafistula',
-], 'Mudas', 'Nativas', 'Canafistula', 'R$/unid')
-
-_add_mapping([
-    'Canela', 'CANELA-GUAICA', 'CANELA GUAICA',
-    'Canela-guaica - Ocotea puberula',
-    'MUDAS DE CANELA-GUAICA - Ocotea puberula',
-    'MUDAS DE CANELA-GUAICA - Ocotea puberula - R$/unid.',
-    'MUDAS DE CANELA-GUAICA - Ocotea puberula - R$/unidade',
-    'Ocotea puberula', 'Mudas de Canela',
-], 'Mudas', 'Nativas', 'Canela', 'R$/unid')
-
-_add_mapping([
-    'Caroba', 'CAROBA', 'CAROBA - Jacaranda micrantha',
-    'MUDAS DE CAROBA - Jacaranda micrantha',
-    'MUDAS DE CAROBA - Jacaranda micrantha - R$/unid.',
-    'MUDAS DE CAROBA - Jacaranda micrantha - R$/unidade',
-    'MUDAS REFLORESTAMENTO AMBIENTAL CAROBA (Jacaranda micrantha) muda/saquinho',
-    'Jacaranda micrantha', 'Mudas de Caroba',
-], 'Mudas', 'Nativas', 'Caroba', 'R$/unid')
-
-_add_mapping([
-    'Cassia', 'CASSIA', 'CASSIA - Cassia leptophylla',
-    'MUDAS DE CASSIA - Cassia leptophylla',
-    'MUDAS DE CASSIA - Cassia leptophylla - R$/unidade',
-    'Cassia leptophylla', 'Mudas de Cassia',
-], 'Mudas', 'Nativas', 'Cassia', 'R$/unid')
-
-_add_mapping([
-    'Cedro', 'CEDRO', 'CEDRO - Cedrela fissilis',
-    'MUDAS DE CEDRO - Cedrela fissilis',
-    'MUDAS DE CEDRO - Cedrela fissilis - R$/unid.',
-    'MUDAS DE CEDRO - Cedrela fissilis - R$/unidade',
-    'Cedrela fissilis', 'Mudas de Cedro',
-], 'Mudas', 'Nativas', 'Cedro', 'R$/unid')
-
-_add_mapping([
-    'Extremosa', 'EXTREMOSA', 'EXTREMOSA - Lagerstroemia indica',
-    'MUDAS DE EXTREMOSA - Lagerstroemia indica',
-    'MUDAS DE EXTREMOSA - Lagerstroemia indica - R$/unidade',
-    'MUDAS ORNAMENTAIS EXOTICAS EXTREMOSA (Lagerstroemia indica) muda/saquinho',
-    'Lagerstroemia indica', 'Mudas de Extremosa',
-], 'Mudas', 'Nativas', 'Extremosa', 'R$/unid')
-
-_add_mapping([
-    'Flamboyant', 'FLAMBOYANT', 'FLAMBOYANT - Delonix regia',
-    'MUDAS DE FLAMBOYANT - Delonix regia',
-    'MUDAS DE FLAMBOYANT - Delonix regia - R$/unidade',
-    'MUDAS ORNAMENTAIS EXOTICAS FLAMBOYANT (Delonix regia) muda/saquinho',
-    'Delonix regia', 'Mudas de Flamboyant',
-], 'Mudas', 'Nativas', 'Flamboyant', 'R$/unid')
-
-_add_mapping([
-    'Imbuia', 'IMBUIA', 'IMBUIA - Ocotea porosa',
-    'MUDAS DE IMBUIA - Ocotea porosa',
-    'MUDAS DE IMBUIA - Ocotea porosa - R$/unid.',
-    'MUDAS DE IMBUIA - Ocotea porosa - R$/unidade',
-    'Ocotea porosa', 'Mudas de Imbuia',
-], 'Mudas', 'Nativas', 'Imbuia', 'R$/unid')
-
-_add_mapping([
-    'Ipe', 'IPE AMARELO', 'IPE ROXO', 'IPE-AMARELO', 'IPE-ROXO',
-    'IPE AMARELO - Tabebuia alba', 'IPE ROXO - Tabebuia heptaphylla',
-    'MUDAS DE IPE AMARELO - Tabebuia alba',
-    'MUDAS DE IPE AMARELO - Tabebuia alba - R$/unidade',
-    'MUDAS DE IPE ROXO - Tabebuia heptaphylla',
-    'MUDAS DE IPE ROXO - Tabebuia heptaphylla - R$/unidade',
-    'Tabebuia alba', 'Tabebuia heptaphylla', 'Mudas de Ipe',
-], 'Mudas', 'Nativas', 'Ipe', 'R$/unid')
-
-_add_mapping([
-    'Jacaranda', 'JACARANDA', 'Jacaranda mimoso',
-    'Jacaranda mimosifolia', 'Mudas de Jacaranda',
-], 'Mudas', 'Nativas', 'Jacaranda', 'R$/unid')
-
-_add_mapping([
-    'Manduirana', 'MANDUIRANA', 'MANDUIRANA - Senna macranthera',
-    'MUDAS DE MANDUIRANA - Senna macranthera',
-    'MUDAS DE MANDUIRANA - Senna macranthera - R$/unidade',
-    'Senna macranthera', 'Mudas de Manduirana',
-], 'Mudas', 'Nativas', 'Manduirana', 'R$/unid')
-
-_add_mapping([
-    'Paineira', 'PAINEIRA', 'PAINEIRA - Chorisia speciosa',
-    'PAINEIRA - Ceiba speciosa',
-    'MUDAS DE PAINEIRA - Ceiba speciosa',
-    'MUDAS DE PAINEIRA - Ceiba speciosa - R$/unid.',
-    'MUDAS DE PAINEIRA - Ceiba speciosa - R$/unidade',
-    'MUDAS REFLORESTAMENTO AMBIENTAL PAINEIRA (Ceiba speciosa) muda/saquinho',
-    'Ceiba speciosa', 'Chorisia speciosa', 'Mudas de Paineira',
-], 'Mudas', 'Nativas', 'Paineira', 'R$/unid')
-
-_add_mapping([
-    'Peroba', 'PEROBA', 'PEROBA - Aspidosperma polyneuron',
-    'Peroba - Aspidosperma polyneuron',
-    'MUDAS DE PEROBA - Aspidosperma polyneuron',
-    'MUDAS DE PEROBA - Aspidosperma polyneuron - R$/unid.',
-    'MUDAS DE PEROBA - Aspidosperma polyneuron - R$/unidade',
-    'Aspidosperma polyneuron', 'Mudas de Peroba',
-], 'Mudas', 'Nativas', 'Peroba', 'R$/unid')
-
-_add_mapping([
-    'Tipuana', 'TIPUANA', 'TIPUANA - Tipuana tipu',
-    'Tipuana - Tipuana tipu',
-    'MUDAS DE TIPUANA - Tipuana tipu',
-    'MUDAS DE TIPUANA - Tipuana tipu - R$/unidade',
-    'MUDAS ORNAMENTAIS EXOTICAS TIPUANA (Tipuana tipu) muda/saquinho',
-    'Tipuana tipu', 'Mudas de Tipuana',
-], 'Mudas', 'Nativas', 'Tipuana', 'R$/unid')
-
-_add_mapping([
-    'Grevilha', 'GREVILHA', 'GREVILEA', 'Grevillea robusta',
-    'Grevilha - Grevillea robusta', 'Mudas de Grevilha',
-], 'Mudas', 'Nativas', 'Grevilha', 'R$/unid')
-
-_add_mapping([
-    'Mogno', 'MOGNO', 'Swietenia macrophylla', 'Mudas de Mogno',
-], 'Mudas', 'Nativas', 'Mogno', 'R$/unid')
-
-_add_mapping([
-    'Cerejeira', 'CEREJEIRA', 'Eugenia involucrata', 'Mudas de Cerejeira',
-], 'Mudas', 'Nativas', 'Cerejeira', 'R$/unid')
-
-_add_mapping([
-    'Nativas Diversas', 'NATIVAS DIVERSAS', 'EXOTICAS',
-    'Outras Especies Nativas', 'Essencias florestais diversas',
-    'Mudas de essencias florestais nativas diversas',
-], 'Mudas', 'Nativas', 'Nativas Diversas', 'R$/unid')
-
-# -----------------------------------------------------------------------------
-# SEMENTES
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'SEMENTES EUCALIPTO (Eucalyptus dunnii) kg',
-    'SEMENTES DE EUCALIPTO Eucalyptus dunnii',
-    'SEMENTES  EUCALIPTO (Eucalyptus dunnii) kg',
-    'Sementes de Eucalyptus dunnii', 'Sementes Eucalyptus dunnii',
-], 'Sementes', 'Eucalipto', 'Sementes Eucalyptus dunnii', 'R$/kg')
-
-_add_mapping([
-    'SEMENTES EUCALIPTO (Eucalyptus grandis) kg',
-    'SEMENTES DE EUCALIPTO Eucalyptus grandis',
-    'SEMENTES  EUCALIPTO (Eucalyptus grandis) kg',
-    'Sementes de Eucalyptus grandis', 'Sementes Eucalyptus grandis',
-], 'Sementes', 'Eucalipto', 'Sementes Eucalyptus grandis', 'R$/kg')
-
-_add_mapping([
-    'SEMENTES EUCALIPTO (Eucalyptus saligna) kg',
-    'SEMENTES DE EUCALIPTO Eucalyptus saligna',
-    'SEMENTES  EUCALIPTO (Eucalyptus saligna) kg',
-    'Sementes de Eucalyptus saligna', 'Sementes Eucalyptus saligna',
-], 'Sementes', 'Eucalipto', 'Sementes Eucalyptus saligna', 'R$/kg')
-
-_add_mapping([
-    'SEMENTES EUCALIPTO (Eucalyptus viminalis) kg',
-    'SEMENTES DE EUCALIPTO Eucalyptus viminalis',
-    'SEMENTES  EUCALIPTO (Eucalyptus viminalis) kg',
-    'Sementes de Eucalyptus viminalis', 'Sementes Eucalyptus viminalis',
-], 'Sementes', 'Eucalipto', 'Sementes Eucalyptus viminalis', 'R$/kg')
-
-# -----------------------------------------------------------------------------
-# TORAS DE ARAUCARIA
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Tora Araucaria', 'Toras Araucaria', 'TORA ARAUCARIA',
-    'Araucaria > 40 cm', 'ARAUCARIA > 40', 'Toras de Araucaria',
-    'TORAS DE ARAUCARIA EM PE',
-], 'Toras', 'Araucaria', 'Toras Araucaria', 'R$/m3')
-
-# -----------------------------------------------------------------------------
-# TORAS DE EUCALIPTO
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'TORAS DE EUCALIPTO EM PE - DIAMETRO < 14 cm',
-    'Toras Eucalipto < 14 cm',
-], 'Toras', 'Eucalipto', 'Toras Eucalipto < 14 cm', 'R$/m3')
-
-_add_mapping([
-    'Eucalipto 14 - 18 cm', 'Eucalipto 14-18 cm', 'EUCALIPTO 14-18',
-    'Toras Eucalipto 14-18 cm',
-    'TORAS DE EUCALIPTO EM PE - DIAMETRO 14 - 18 cm',
-], 'Toras', 'Eucalipto', 'Toras Eucalipto 14-18 cm', 'R$/m3')
-
-_add_mapping([
-    'Eucalipto 18 - 25 cm', 'Eucalipto 18-25 cm', 'EUCALIPTO 18-25',
-    'Eucalipto 20 - 30 cm', 'Eucalipto 20-30 cm',
-    'Toras Eucalipto 18-25 cm',
-    'TORAS DE EUCALIPTO EM PE - DIAMETRO 18 - 25 cm',
-], 'Toras', 'Eucalipto', 'Toras Eucalipto 18-25 cm', 'R$/m3')
-
-_add_mapping([
-    'Eucalipto 25 - 35 cm', 'Eucalipto 25-35 cm', 'EUCALIPTO 25-35',
-    'Eucalipto 30 - 40 cm', 'Eucalipto 30-40 cm',
-    'Toras Eucalipto 25-35 cm',
-    'TORAS DE EUCALIPTO EM PE - DIAMETRO 25 - 35 cm',
-], 'Toras', 'Eucalipto', 'Toras Eucalipto 25-35 cm', 'R$/m3')
-
-_add_mapping([
-    'Eucalipto > 35 cm', 'Eucalipto > 30 cm', 'Eucalipto > 40 cm',
-    'EUCALIPTO > 35', 'EUCALIPTO > 40',
-    'Toras Eucalipto > 35 cm',
-    'TORAS DE EUCALIPTO EM PE - DIAMETRO > 35 cm',
-], 'Toras', 'Eucalipto', 'Toras Eucalipto > 35 cm', 'R$/m3')
-
-_add_mapping([
-    'Eucalipto Geral', 'EUCALIPTO GERAL', 'Toras Eucalipto Geral',
-    'TORA EUCALIPTO',
-], 'Toras', 'Eucalipto', 'Toras Eucalipto Geral', 'R$/m3')
-
-_add_mapping([
-    'Eucalipto Media Estado', 'Eucalipto MÃ©dia Estado',
-    'EUCALIPTO MEDIA ESTADO', 'Toras Eucalipto Media Estado',
-    'TORAS DE EUCALIPTO EM PE - media sortimentos Estado',
-], 'Toras', 'Eucalipto', 'Toras Eucalipto Media Estado', 'R$/m3')
-
-# -----------------------------------------------------------------------------
-# TORAS DE PINUS
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Pinus 10 - 20 cm', 'Pinus 10-20 cm', 'PINUS < 14',
-    'Toras Pinus < 14 cm',
-    'TORAS DE PINUS EM PE - DIAMETRO < 14 cm',
-], 'Toras', 'Pinus', 'Toras Pinus < 14 cm', 'R$/m3')
-
-_add_mapping([
-    'Pinus 14 - 18 cm', 'Pinus 14-18 cm', 'PINUS 14-18',
-    'Toras Pinus 14-18 cm',
-    'TORAS DE PINUS EM PE - DIAMETRO 14 - 18 cm',
-], 'Toras', 'Pinus', 'Toras Pinus 14-18 cm', 'R$/m3')
-
-_add_mapping([
-    'Pinus 18 - 25 cm', 'Pinus 18-25 cm', 'PINUS 18-25',
-    'Pinus 20 - 30 cm', 'Pinus 20-30 cm',
-    'Toras Pinus 18-25 cm',
-    'TORAS DE PINUS EM PE - DIAMETRO 18 - 25 cm',
-], 'Toras', 'Pinus', 'Toras Pinus 18-25 cm', 'R$/m3')
-
-_add_mapping([
-    'Pinus 25 - 35 cm', 'Pinus 25-35 cm', 'PINUS 25-35',
-    'Pinus 30 - 40 cm', 'Pinus 30-40 cm',
-    'Toras Pinus 25-35 cm',
-    'TORAS DE PINUS EM PE - DIAMETRO 25 - 35 cm',
-], 'Toras', 'Pinus', 'Toras Pinus 25-35 cm', 'R$/m3')
-
-_add_mapping([
-    'Pinus > 35 cm', 'Pinus > 40 cm', 'PINUS > 35', 'PINUS > 40',
-    'Toras Pinus > 35 cm',
-    'TORAS DE PINUS EM PE - DIAMETRO > 35 cm',
-], 'Toras', 'Pinus', 'Toras Pinus > 35 cm', 'R$/m3')
-
-_add_mapping([
-    'Pinus Geral', 'PINUS GERAL', 'Toras Pinus Geral',
-    'TORA PINUS',
-], 'Toras', 'Pinus', 'Toras Pinus Geral', 'R$/m3')
-
-_add_mapping([
-    'Pinus Media Estado', 'Pinus MÃ©dia Estado',
-    'PINUS MEDIA ESTADO', 'Toras Pinus Media Estado',
-    'TORAS DE PINUS EM PE - media sortimentos Estado',
-], 'Toras', 'Pinus', 'Toras Pinus Media Estado', 'R$/m3')
-
-# -----------------------------------------------------------------------------
-# TORAS DE NATIVAS
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'TORAS DE CANELA EM PE - DIAMETRO > 30 cm',
-    'TORAS DE CANELA NA LAMINADORA - DIAMETRO > 40 cm',
-    'TORAS DE CANELA NA SERRARIA - DIAMETRO > 30 cm',
-    'TORAS EM PE CANELA > 30 CM m3', 'TORAS POSTO LAMINADORA CANELA > 40 CM m3',
-    'TORAS POSTO NA SERRARIA CANELA > 30 cm m3',
-    'Canela > 30 cm', 'Canela > 40 cm', 'Toras Canela',
-], 'Toras', 'Nativas', 'Toras Canela', 'R$/m3')
-
-_add_mapping([
-    'TORAS DE CEDRO EM PE - DIAMETRO > 30 cm',
-    'TORAS EM PE CEDRO > 30 CM m3', 'Cedro > 30 cm', 'Toras Cedro',
-], 'Toras', 'Nativas', 'Toras Cedro', 'R$/m3')
-
-_add_mapping([
-    'TORAS DE CEREJEIRA NA LAMINADORA - DIAMETRO > 70 cm',
-    'TORAS POSTO LAMINADORA CEREJEIRA > 70 CM m3',
-    'Cerejeira > 70 cm', 'Toras Cerejeira',
-], 'Toras', 'Nativas', 'Toras Cerejeira', 'R$/m3')
-
-_add_mapping([
-    'TORAS DE GREVILEA EM PE - DIAMETRO > 30 cm',
-    'TORAS EM PE GREVILEA > 30 CM m3', 'Grevilha > 30 cm', 'Toras Grevilha',
-], 'Toras', 'Nativas', 'Toras Grevilha', 'R$/m3')
-
-_add_mapping([
-    'TORAS DE IMBUIA NA SERRARIA - DIAMETRO > 45 cm',
-    'TORAS POSTO NA SERRARIA IMBUIA > 45 cm m3',
-    'TORAS POSTO NA SERRARIA IMBUIA 30 - 40 cm m3',
-    'TORAS POSTO NA SERRARIA IMBUIA 30 cm m3',
-    'TORAS POSTO LAMINADORA IMBUIA (01 FILE) m3',
-    'TORAS POSTO LAMINADORA IMBUIA (02 FILES) m3',
-    'TORAS EM PE IMBUIA > 30 CM m3',
-    'Imbuia > 30 cm', 'Imbuia 30 - 40 cm', 'Toras Imbuia',
-], 'Toras', 'Nativas', 'Toras Imbuia', 'R$/m3')
-
-_add_mapping([
-    'TORAS DE MOGNO NA LAMINADORA - DIAMETRO > 70 cm',
-    'Mogno > 70 cm', 'Toras Mogno',
-], 'Toras', 'Nativas', 'Toras Mogno', 'R$/m3')
-
-_add_mapping([
-    'Angico > 30 cm', 'Toras Angico',
-], 'Toras', 'Nativas', 'Toras Angico', 'R$/m3')
-
-_add_mapping([
-    'Peroba > 30 cm', 'Toras Peroba',
-], 'Toras', 'Nativas', 'Toras Peroba', 'R$/m3')
-
-_add_mapping([
-    'TORAS DE ALAMO EM PE', 'Alamo', 'Toras Alamo',
-], 'Toras', 'Nativas', 'Toras Alamo', 'R$/m3')
-
-_add_mapping([
-    'TORAS DE MADEIRA DE LEI NA LAMINADORA',
-    'TORAS POSTO LAMINADORA MADEIRA DE LEI m3',
-    'Toras Madeira de Lei',
-], 'Toras', 'Nativas', 'Toras Madeira de Lei', 'R$/m3')
-
-_add_mapping([
-    'Outras Especies', 'OUTRAS ESPECIES', 'Toras Outras Especies',
-    'TORAS DE OUTRAS ESPECIES EM PE',
-], 'Toras', 'Nativas', 'Toras Outras Especies', 'R$/m3')
-
-# -----------------------------------------------------------------------------
-# TORAS PARA PROCESSO
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Tora para Processo', 'TORA PROCESSO', 'Toras Processo',
-    'Tora para processo',
-    'TORA PARA PROCESSO (Inclui madeira para papel e celulose)',
-    'TORA PARA PROCESSO',
-], 'Toras', 'Processo', 'Toras Processo', 'R$/m3')
-
-_add_mapping([
-    'Escoras/Outras', 'ESCORAS', 'Escoras', 'Outras finalidades',
-    'TORA PARA OUTRAS FINALIDADES',
-    'TORA PARA OUTRAS FINALIDADES (Por exemplo escoras)',
-], 'Toras', 'Processo', 'Escoras', 'R$/m3')
-
-# -----------------------------------------------------------------------------
-# LENHA
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Lenha', 'LENHA', 'Lenha metro estereo',
-    'LENHA POSTA NO CONSUMIDOR',
-], 'Energia', 'Lenha', 'Lenha', 'R$/m3')
-
-# -----------------------------------------------------------------------------
-# CAVACOS
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Cavaco Limpo', 'CAVACO LIMPO', 'Cavaco', 'CAVACO',
-    'CAVACO LIMPO ONDE FOI PRODUZIDO',
-    'CAVACO LIMPO ONDE FOI PRODUZIDO (cavaco para processo)',
-], 'Cavacos', 'Limpo', 'Cavaco Limpo', 'R$/t')
-
-_add_mapping([
-    'Cavaco Sujo', 'CAVACO SUJO', 'Cavaco Sujo (Energia)',
-    'Cavaco para energia',
-    'CAVACO SUJO ONDE FOI PRODUZIDO',
-    'CAVACO SUJO ONDE FOI PRODUZIDO (cavaco para energia)',
-], 'Cavacos', 'Sujo', 'Cavaco Sujo', 'R$/t')
-
-# -----------------------------------------------------------------------------
-# PFNM - ERVA-MATE FOLHA (producao primaria)
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Erva-mate Industria', 'Erva-mate IndÃºstria',
-    'FOLHA NA INDUSTRIA', 'FOLHA NA INDÃšSTRIA',
-    'Erva-mate Folha Industria',
-    'FOLHA DE ERVA-MATE NA INDUSTRIA',
-], 'PFNM', 'Erva-mate Folha', 'Erva-mate Folha Industria', 'R$/kg')
-
-_add_mapping([
-    'Erva-mate no Pe', 'Erva-mate no PÃ©',
-    'FOLHA NO PE', 'FOLHA NO PÃ‰',
-    'Erva-mate Folha Pe',
-    'FOLHA DE ERVA-MATE NO PE',
-], 'PFNM', 'Erva-mate Folha', 'Erva-mate Folha Pe', 'R$/kg')
-
-_add_mapping([
-    'FOLHA NO BARRANCO', 'Erva-mate Folha Barranco',
-], 'PFNM', 'Erva-mate Folha', 'Erva-mate Folha Barranco', 'R$/kg')
-
-# -----------------------------------------------------------------------------
-# PRODUTOS BENEFICIADOS - ERVA-MATE PROCESSADA
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'ERVA - MATE CANCHEADA', 'Erva-mate Cancheada', 'Cancheada',
-], 'Produtos Beneficiados', 'Erva-mate', 'Erva-mate Cancheada', 'R$/kg')
-
-_add_mapping([
-    'E - ERVA - MATE BENEFICIADA', 'Erva-mate Beneficiada', 'Beneficiada',
-], 'Produtos Beneficiados', 'Erva-mate', 'Erva-mate Beneficiada', 'R$/kg')
-
-_add_mapping([
-    'INDUSTRIAL - (Kg)', 'INDÃšSTRIAL - (Kg)', 'Erva-mate Industrial',
-], 'Produtos Beneficiados', 'Erva-mate', 'Erva-mate Industrial', 'R$/kg')
-
-_add_mapping([
-    'MERCADO - ERVA-MATE TIPO PN 1', 'Goma/po/palitos',
-    'VAREJISTA - (Kg)', 'Erva-mate Mercado', 'Erva-mate Varejista',
-], 'Produtos Beneficiados', 'Erva-mate', 'Erva-mate Mercado', 'R$/kg')
-
-# -----------------------------------------------------------------------------
-# PFNM - OUTROS
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Palmito (cabeca)', 'Palmito (cabeÃ§a)', 'Palmito Cabeca',
-    'PALMITO CABECA',
-], 'PFNM', 'Palmito', 'Palmito Cabeca', 'R$/cabeca')
-
-_add_mapping([
-    'Latex de Seringueira', 'LÃ¡tex de Seringueira',
-    'LATEX SERINGUEIRA', 'SERINGUEIRA',
-    'SERINGUEIRA (LATEX)',
-], 'PFNM', 'Latex', 'Latex Seringueira', 'R$/kg')
-
-_add_mapping([
-    'Pinhao', 'PinhÃ£o', 'PINHAO',
-], 'PFNM', 'Pinhao', 'Pinhao', 'R$/kg')
-
-_add_mapping([
-    'Resina', 'RESINA', 'Resina de Pinus', 'Resina Pinus',
-], 'PFNM', 'Resina', 'Resina Pinus', 'R$/kg')
-
-# -----------------------------------------------------------------------------
-# ENERGIA - CARVAO
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Carvao', 'CarvÃ£o', 'CARVAO', 'Carvao Vegetal',
-], 'Energia', 'Carvao', 'Carvao Vegetal', 'R$/kg')
-
-# -----------------------------------------------------------------------------
-# CUSTOS OPERACIONAIS
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'Custos de Colheita e Carregamento', 'CUSTOS COLHEITA',
-    'Custos Colheita e Carregamento', 'CUSTO COLHEITA',
-    'Custos de Colheita',
-], 'Custos Operacionais', 'Colheita', 'Custos Colheita e Carregamento', 'R$/m3')
-
-# -----------------------------------------------------------------------------
-# MADEIRA SERRADA
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'PINUS (1" x 4" x 2,40m)', 'Madeira Serrada Pinus',
-    'Madeira Serrada de Pinus',
-], 'Madeira Serrada', 'Pinus', 'Madeira Serrada Pinus', 'R$/m3')
-
-_add_mapping([
-    'EUCALIPTO (1"x 4" x 2,40m)', 'Madeira Serrada Eucalipto',
-    'Madeira Serrada de Eucalipto',
-], 'Madeira Serrada', 'Eucalipto', 'Madeira Serrada Eucalipto', 'R$/m3')
-
-_add_mapping([
-    'ARAUCARIA( 1" x 4" x 2,40m)', 'Madeira Serrada Araucaria',
-    'Madeira Serrada de Araucaria',
-], 'Madeira Serrada', 'Araucaria', 'Madeira Serrada Araucaria', 'R$/m3')
-
-_add_mapping([
-    'CEDRO ( 1" x 4" x 2,40m)', 'Madeira Serrada Cedro',
-    'Madeira Serrada de Cedro',
-], 'Madeira Serrada', 'Nativas', 'Madeira Serrada Cedro', 'R$/m3')
-
-_add_mapping([
-    'IMBUIA (1,5" x 5" x 2,20m)', 'IMBUIA (1,5" x 9" x 2,20m)',
-    'Madeira Serrada Imbuia', 'Madeira Serrada de Imbuia',
-], 'Madeira Serrada', 'Nativas', 'Madeira Serrada Imbuia', 'R$/m3')
-
-_add_mapping([
-    'CEREJEIRA ( 1,5" x 5" x 2,20m)', 'Madeira Serrada Cerejeira',
-    'Madeira Serrada de Cerejeira',
-], 'Madeira Serrada', 'Nativas', 'Madeira Serrada Cerejeira', 'R$/m3')
-
-_add_mapping([
-    'MOGNO (1,5" x 5" x 2,20m)', 'Madeira Serrada Mogno',
-    'Madeira Serrada de Mogno',
-], 'Madeira Serrada', 'Nativas', 'Madeira Serrada Mogno', 'R$/m3')
-
-_add_mapping([
-    'GREVILEA (1"x 4" x 2,40m)', 'Madeira Serrada Grevilha',
-    'Madeira Serrada de Grevilha',
-], 'Madeira Serrada', 'Nativas', 'Madeira Serrada Grevilha', 'R$/m3')
-
-# -----------------------------------------------------------------------------
-# RESIDUOS
-# -----------------------------------------------------------------------------
-_add_mapping([
-    'COSTANEIRAS (DZ)', 'Costaneiras',
-], 'Residuos', 'Geral', 'Costaneiras', 'R$/dz')
-
-_add_mapping([
-    'DESTOPO (m3)', 'Destopo',
-], 'Residuos', 'Geral', 'Destopo', 'R$/m3')
-
-_add_mapping([
-    'REFIO ( M/ESTEREO)', 'REFIO (st)', 'Refilo',
-], 'Residuos', 'Geral', 'Refilo', 'R$/st')
-
-_add_mapping([
-    'SEPILHO / PO DE SERRA (M3)', 'SERRAGEM (M3)', 'Serragem',
-], 'Residuos', 'Geral', 'Serragem', 'R$/m3')
+            _PRODUCT_MAPPING[key] = (categoria, subcategoria, produto, unidade)
+
+
+def _register_product_mappings():
+    """Preenche PRODUCT_MAPPING (executado no primeiro uso, via product_mapping)"""
+    # -------------------------------------------------------------------------
+    # MUDAS DE ARAUCARIA
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Araucaria', 'ARAUCARIA', 'ARAUCARIA - Angustifolia',
+        'Araucaria - Araucaria angustifolia', 'Araucaria angustifolia',
+        'Pinheiro Brasileiro - Araucaria angustifolia', 'Pinheiro-brasileiro',
+        'MUDA ARAUCARIA', 'MUDAS ARAUCARIA', 'Mudas de Araucaria',
+        'MUDAS DE ARAUCARIA - Araucaria angustifolia',
+    ], 'Mudas', 'Araucaria', 'Araucaria', 'R$/unid')
+
+    # -------------------------------------------------------------------------
+    # MUDAS DE BRACATINGA
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Bracatinga', 'BRACATINGA', 'Bracatinga - Variedade comum',
+        'Bracatinga-comum', 'Bracatinga - Mimosa scabrella',
+        'BRACATINGADE C.MOURAO', 'BRACATINGA DE C MOURAO',
+        'Mudas de Bracatinga',
+        'MUDAS DE BRACATINGA COMUM - Mimosa scabrella',
+    ], 'Mudas', 'Bracatinga', 'Bracatinga', 'R$/unid')
+
+    _add_mapping([
+        'Bracatinga-Argentina', 'Variedade Argentina',
+        'BRACATINGADE C.MOURAO - Mimosa flocculosa',
+        'Bracatinga Argentina', 'Mudas de Bracatinga Argentina',
+    ], 'Mudas', 'Bracatinga', 'Bracatinga Argentina', 'R$/unid')
+
+    # -------------------------------------------------------------------------
+    # MUDAS DE ERVA-MATE
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Erva-mate', 'ERVA-MATE', 'ERVA-MATE - llex paraguariensis',
+        'Erva-mate - Ilex paraguariensis', 'MUDA ERVA-MATE',
+        'Mudas de Erva-mate', 'ERVA MATE',
+    ], 'Mudas', 'Erva-mate', 'Erva-mate', 'R$/unid')
+
+    # -------------------------------------------------------------------------
+    # MUDAS DE EUCALIPTO CLONAL
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'AEC 144 e 224', 'AEC144', 'AEC224',
+        'Eucalyptus grancan', 'Eucalyptus grancam',
+        'Eucalyptus urograndis', 'Eucalyptus urograndis 144',
+        'Eucalyptus uroxgrandis', 'Eucalyptus urograndis - 1528',
+        'Eucalyptus urograndis - H13', 'H 144 H 13', 'H 144; H 13',
+        'H 144; H 13 e 158', 'I 144; H 13 e 158', 'H144', 'H13', 'I144',
+        'UROPHILA GRANDIS', 'EUCA 105 H13', 'URO GRANDIS',
+        'UROPHILA GRANDIS â€“ EUCA 105 H13 (URO GRANDIS)',
+        'Eucalyptus urophylla', 'Eucalyptus urophylla 1528, 2070',
+        'Eucalyptus urophylla GG100, GG157, 2361',
+        'Eucalyptus urophylla GG100, GG157, 2361, 2070',
+        'GG100', 'GG157', '2361', '2070', '1528',
+        'Eucalyptus saligna, E. dunnii',
+        'Mudas de Eucalipto Clonal', 'EUCALIPTO CLONAL',
+        'MUDAS DE EUCALIPTO - Eucalyptus urograndis',
+    ], 'Mudas', 'Eucalipto Clonal', 'Eucalipto Clonal', 'R$/unid')
+
+    # -------------------------------------------------------------------------
+    # MUDAS DE EUCALIPTO SEMINAL (propagacao por sementes)
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Eucalipto benthamii', 'E. benthamii', 'Eucalyptus benthamii',
+        'Mudas de Eucalyptus benthamii',
+        'MUDAS DE EUCALIPTO - Eucalyptus benthamii',
+    ], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus benthamii', 'R$/unid')
+
+    _add_mapping([
+        'Eucalipto camaldulensis', 'E. camaldulensis', 'Eucalyptus camaldulensis',
+        'Mudas de Eucalyptus camaldulensis',
+    ], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus camaldulensis', 'R$/unid')
+
+    _add_mapping([
+        'Eucalipto citriodora', 'E. citriodora', 'Eucalyptus citriodora',
+        'Corymbia citriodora', 'Mudas de Corymbia citriodora',
+        'MUDAS DE EUCALIPTO - Corymbia citriodora',
+    ], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus citriodora', 'R$/unid')
+
+    _add_mapping([
+        'Eucalipto dunnii', 'E. dunnii', 'Eucalyptus dunnii',
+        'Eucalipto - E. dunnii', 'Mudas de Eucalyptus dunnii',
+        'MUDAS DE EUCALIPTO - Eucalyptus dunnii',
+    ], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus dunnii', 'R$/unid')
+
+    _add_mapping([
+        'Eucalipto grandis', 'E. grandis', 'Eucalyptus grandis',
+        'Mudas de Eucalyptus grandis',
+        'MUDAS DE EUCALIPTO - Eucalyptus grandis',
+    ], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus grandis', 'R$/unid')
+
+    _add_mapping([
+        'Eucalipto saligna', 'E. saligna', 'Eucalyptus saligna',
+        'EUCALIPTO - E. saligna', 'Mudas de Eucalyptus saligna',
+        'MUDAS DE EUCALIPTO - Eucalyptus saligna',
+    ], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus saligna', 'R$/unid')
+
+    _add_mapping([
+        'Eucalipto viminalis', 'E. viminalis', 'Eucalyptus viminalis',
+        'Mudas de Eucalyptus viminalis',
+        'MUDAS DE EUCALIPTO - Eucalyptus viminalis',
+    ], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus viminalis', 'R$/unid')
+
+    _add_mapping([
+        'Eucalyptus urophylla', 'Mudas de Eucalyptus urophylla',
+    ], 'Mudas', 'Eucalipto Seminal', 'Eucalyptus urophylla', 'R$/unid')
+
+    # -------------------------------------------------------------------------
+    # MUDAS DE PINUS SEMINAL
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Pinus elliottii', 'P. elliottii', 'Pinus - P. elliottii',
+        'Mudas de Pinus elliottii',
+        'MUDAS DE PINUS - Pinus elliottii',
+    ], 'Mudas', 'Pinus Seminal', 'Pinus elliottii', 'R$/unid')
+
+    _add_mapping([
+        'Pinus taeda', 'P. taeda', 'Mudas de Pinus taeda',
+        'MUDAS DE PINUS - Pinus taeda',
+    ], 'Mudas', 'Pinus Seminal', 'Pinus taeda', 'R$/unid')
+
+    _add_mapping([
+        'Pinus tropicais', 'Tropicais', 'Mudas de Pinus tropicais',
+        'MUDAS DE PINUS - Tropicais',
+    ], 'Mudas', 'Pinus Seminal', 'Pinus tropicais', 'R$/unid')
+
+    # -------------------------------------------------------------------------
+    # MUDAS DE PALMITO
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Palmito Jucara', 'Palmito JuÃ§ara', 'Palmito JuÃ§ara - Euterpe edulis',
+        'Euterpe edulis', 'Jucara', 'Mudas de Palmito Jucara',
+        'MUDAS DE PALMITO-JUCARA - Euterpe edulis',
+    ], 'Mudas', 'Palmito', 'Palmito Jucara', 'R$/unid')
+
+    _add_mapping([
+        'Palmito Pupunha', 'Palmito Pupunha - Euterpe oleracea',
+        'Euterpe oleracea', 'Pupunha', 'Mudas de Palmito Pupunha',
+        'Bactris gasipaes',
+        'MUDAS DE PALMITO-PUPUNHA - Bactris gasipaes',
+    ], 'Mudas', 'Palmito', 'Palmito Pupunha', 'R$/unid')
+
+    # -------------------------------------------------------------------------
+    # MUDAS DE NATIVAS
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Angico', 'ANGICO-BRANCO', 'ANGICO BRANCO',
+        'Angico branco - Anadenanthera colubrina',
+        'MUDAS DE ANGICO-BRANCO - Anadenanthera colubrina',
+        'MUDAS DE ANGICO-BRANCO - Anadenanthera colubrina - R$/unid.',
+        'MUDAS DE ANGICO-BRANCO - Anadenanthera colubrina - R$/unidade',
+        'Anadenanthera colubrina', 'Mudas de Angico',
+    ], 'Mudas', 'Nativas', 'Angico', 'R$/unid')
+
+    _add_mapping([
+        'Aroeira', 'AROEIRA VERMELHA', 'AROEIRA-VERMELHA',
+        'AROEIRA VERMELHA - Schinus terebinthifolius',
+        'MUDAS DE AROEIRA VERMELHA - Schinus terebinthifolius',
+        'MUDAS DE AROEIRA VERMELHA - Schinus terebinthifolius - R$/unid.',
+        'MUDAS DE AROEIRA VERMELHA - Schinus terebinthifolius - R$/unidade',
+        'MUDAS ENERGIA E REVEGETACAO AROEIRA VERMELHA (Schinus terebinthifolius) muda/saquinho',
+        'Schinus terebinthifolius', 'Mudas de Aroeira',
+    ], 'Mudas', 'Nativas', 'Aroeira', 'R$/unid')
+
+    _add_mapping([
+        'Canafistula', 'CANAFISTOLA', 'CANAFISTULA',
+        'CANAFISTOLA - Peltophorum dubium', 'CANAFISTULA - Peltophorum dubium',
+        'MUDAS DE CANAFISTULA - Peltophorum dubium',
+        'MUDAS DE CANAFISTULA - Peltophorum dubium - R$/unid.',
+        'MUDAS DE CANAFISTULA - Peltophorum dubium - R$/unidade',
+        'Peltophorum dubium', 'Mudas de Canafistula',
+    ], 'Mudas', 'Nativas', 'Canafistula', 'R$/unid')
+
+    _add_mapping([
+        'Canela', 'CANELA-GUAICA', 'CANELA GUAICA',
+        'Canela-guaica - Ocotea puberula',
+        'MUDAS DE CANELA-GUAICA - Ocotea puberula',
+        'MUDAS DE CANELA-GUAICA - Ocotea puberula - R$/unid.',
+        'MUDAS DE CANELA-GUAICA - Ocotea puberula - R$/unidade',
+        'Ocotea puberula', 'Mudas de Canela',
+    ], 'Mudas', 'Nativas', 'Canela', 'R$/unid')
+
+    _add_mapping([
+        'Caroba', 'CAROBA', 'CAROBA - Jacaranda micrantha',
+        'MUDAS DE CAROBA - Jacaranda micrantha',
+        'MUDAS DE CAROBA - Jacaranda micrantha - R$/unid.',
+        'MUDAS DE CAROBA - Jacaranda micrantha - R$/unidade',
+        'MUDAS REFLORESTAMENTO AMBIENTAL CAROBA (Jacaranda micrantha) muda/saquinho',
+        'Jacaranda micrantha', 'Mudas de Caroba',
+    ], 'Mudas', 'Nativas', 'Caroba', 'R$/unid')
+
+    _add_mapping([
+        'Cassia', 'CASSIA', 'CASSIA - Cassia leptophylla',
+        'MUDAS DE CASSIA - Cassia leptophylla',
+        'MUDAS DE CASSIA - Cassia leptophylla - R$/unidade',
+        'Cassia leptophylla', 'Mudas de Cassia',
+    ], 'Mudas', 'Nativas', 'Cassia', 'R$/unid')
+
+    _add_mapping([
+        'Cedro', 'CEDRO', 'CEDRO - Cedrela fissilis',
+        'MUDAS DE CEDRO - Cedrela fissilis',
+        'MUDAS DE CEDRO - Cedrela fissilis - R$/unid.',
+        'MUDAS DE CEDRO - Cedrela fissilis - R$/unidade',
+        'Cedrela fissilis', 'Mudas de Cedro',
+    ], 'Mudas', 'Nativas', 'Cedro', 'R$/unid')
+
+    _add_mapping([
+        'Extremosa', 'EXTREMOSA', 'EXTREMOSA - Lagerstroemia indica',
+        'MUDAS DE EXTREMOSA - Lagerstroemia indica',
+        'MUDAS DE EXTREMOSA - Lagerstroemia indica - R$/unidade',
+        'MUDAS ORNAMENTAIS EXOTICAS EXTREMOSA (Lagerstroemia indica) muda/saquinho',
+        'Lagerstroemia indica', 'Mudas de Extremosa',
+    ], 'Mudas', 'Nativas', 'Extremosa', 'R$/unid')
+
+    _add_mapping([
+        'Flamboyant', 'FLAMBOYANT', 'FLAMBOYANT - Delonix regia',
+        'MUDAS DE FLAMBOYANT - Delonix regia',
+        'MUDAS DE FLAMBOYANT - Delonix regia - R$/unidade',
+        'MUDAS ORNAMENTAIS EXOTICAS FLAMBOYANT (Delonix regia) muda/saquinho',
+        'Delonix regia', 'Mudas de Flamboyant',
+    ], 'Mudas', 'Nativas', 'Flamboyant', 'R$/unid')
+
+    _add_mapping([
+        'Imbuia', 'IMBUIA', 'IMBUIA - Ocotea porosa',
+        'MUDAS DE IMBUIA - Ocotea porosa',
+        'MUDAS DE IMBUIA - Ocotea porosa - R$/unid.',
+        'MUDAS DE IMBUIA - Ocotea porosa - R$/unidade',
+        'Ocotea porosa', 'Mudas de Imbuia',
+    ], 'Mudas', 'Nativas', 'Imbuia', 'R$/unid')
+
+    _add_mapping([
+        'Ipe', 'IPE AMARELO', 'IPE ROXO', 'IPE-AMARELO', 'IPE-ROXO',
+        'IPE AMARELO - Tabebuia alba', 'IPE ROXO - Tabebuia heptaphylla',
+        'MUDAS DE IPE AMARELO - Tabebuia alba',
+        'MUDAS DE IPE AMARELO - Tabebuia alba - R$/unidade',
+        'MUDAS DE IPE ROXO - Tabebuia heptaphylla',
+        'MUDAS DE IPE ROXO - Tabebuia heptaphylla - R$/unidade',
+        'Tabebuia alba', 'Tabebuia heptaphylla', 'Mudas de Ipe',
+    ], 'Mudas', 'Nativas', 'Ipe', 'R$/unid')
+
+    _add_mapping([
+        'Jacaranda', 'JACARANDA', 'Jacaranda mimoso',
+        'Jacaranda mimosifolia', 'Mudas de Jacaranda',
+    ], 'Mudas', 'Nativas', 'Jacaranda', 'R$/unid')
+
+    _add_mapping([
+        'Manduirana', 'MANDUIRANA', 'MANDUIRANA - Senna macranthera',
+        'MUDAS DE MANDUIRANA - Senna macranthera',
+        'MUDAS DE MANDUIRANA - Senna macranthera - R$/unidade',
+        'Senna macranthera', 'Mudas de Manduirana',
+    ], 'Mudas', 'Nativas', 'Manduirana', 'R$/unid')
+
+    _add_mapping([
+        'Paineira', 'PAINEIRA', 'PAINEIRA - Chorisia speciosa',
+        'PAINEIRA - Ceiba speciosa',
+        'MUDAS DE PAINEIRA - Ceiba speciosa',
+        'MUDAS DE PAINEIRA - Ceiba speciosa - R$/unid.',
+        'MUDAS DE PAINEIRA - Ceiba speciosa - R$/unidade',
+        'MUDAS REFLORESTAMENTO AMBIENTAL PAINEIRA (Ceiba speciosa) muda/saquinho',
+        'Ceiba speciosa', 'Chorisia speciosa', 'Mudas de Paineira',
+    ], 'Mudas', 'Nativas', 'Paineira', 'R$/unid')
+
+    _add_mapping([
+        'Peroba', 'PEROBA', 'PEROBA - Aspidosperma polyneuron',
+        'Peroba - Aspidosperma polyneuron',
+        'MUDAS DE PEROBA - Aspidosperma polyneuron',
+        'MUDAS DE PEROBA - Aspidosperma polyneuron - R$/unid.',
+        'MUDAS DE PEROBA - Aspidosperma polyneuron - R$/unidade',
+        'Aspidosperma polyneuron', 'Mudas de Peroba',
+    ], 'Mudas', 'Nativas', 'Peroba', 'R$/unid')
+
+    _add_mapping([
+        'Tipuana', 'TIPUANA', 'TIPUANA - Tipuana tipu',
+        'Tipuana - Tipuana tipu',
+        'MUDAS DE TIPUANA - Tipuana tipu',
+        'MUDAS DE TIPUANA - Tipuana tipu - R$/unidade',
+        'MUDAS ORNAMENTAIS EXOTICAS TIPUANA (Tipuana tipu) muda/saquinho',
+        'Tipuana tipu', 'Mudas de Tipuana',
+    ], 'Mudas', 'Nativas', 'Tipuana', 'R$/unid')
+
+    _add_mapping([
+        'Grevilha', 'GREVILHA', 'GREVILEA', 'Grevillea robusta',
+        'Grevilha - Grevillea robusta', 'Mudas de Grevilha',
+    ], 'Mudas', 'Nativas', 'Grevilha', 'R$/unid')
+
+    _add_mapping([
+        'Mogno', 'MOGNO', 'Swietenia macrophylla', 'Mudas de Mogno',
+    ], 'Mudas', 'Nativas', 'Mogno', 'R$/unid')
+
+    _add_mapping([
+        'Cerejeira', 'CEREJEIRA', 'Eugenia involucrata', 'Mudas de Cerejeira',
+    ], 'Mudas', 'Nativas', 'Cerejeira', 'R$/unid')
+
+    _add_mapping([
+        'Nativas Diversas', 'NATIVAS DIVERSAS', 'EXOTICAS',
+        'Outras Especies Nativas', 'Essencias florestais diversas',
+        'Mudas de essencias florestais nativas diversas',
+    ], 'Mudas', 'Nativas', 'Nativas Diversas', 'R$/unid')
+
+    # -------------------------------------------------------------------------
+    # SEMENTES
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'SEMENTES EUCALIPTO (Eucalyptus dunnii) kg',
+        'SEMENTES DE EUCALIPTO Eucalyptus dunnii',
+        'SEMENTES  EUCALIPTO (Eucalyptus dunnii) kg',
+        'Sementes de Eucalyptus dunnii', 'Sementes Eucalyptus dunnii',
+    ], 'Sementes', 'Eucalipto', 'Sementes Eucalyptus dunnii', 'R$/kg')
+
+    _add_mapping([
+        'SEMENTES EUCALIPTO (Eucalyptus grandis) kg',
+        'SEMENTES DE EUCALIPTO Eucalyptus grandis',
+        'SEMENTES  EUCALIPTO (Eucalyptus grandis) kg',
+        'Sementes de Eucalyptus grandis', 'Sementes Eucalyptus grandis',
+    ], 'Sementes', 'Eucalipto', 'Sementes Eucalyptus grandis', 'R$/kg')
+
+    _add_mapping([
+        'SEMENTES EUCALIPTO (Eucalyptus saligna) kg',
+        'SEMENTES DE EUCALIPTO Eucalyptus saligna',
+        'SEMENTES  EUCALIPTO (Eucalyptus saligna) kg',
+        'Sementes de Eucalyptus saligna', 'Sementes Eucalyptus saligna',
+    ], 'Sementes', 'Eucalipto', 'Sementes Eucalyptus saligna', 'R$/kg')
+
+    _add_mapping([
+        'SEMENTES EUCALIPTO (Eucalyptus viminalis) kg',
+        'SEMENTES DE EUCALIPTO Eucalyptus viminalis',
+        'SEMENTES  EUCALIPTO (Eucalyptus viminalis) kg',
+        'Sementes de Eucalyptus viminalis', 'Sementes Eucalyptus viminalis',
+    ], 'Sementes', 'Eucalipto', 'Sementes Eucalyptus viminalis', 'R$/kg')
+
+    # -------------------------------------------------------------------------
+    # TORAS DE ARAUCARIA
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Tora Araucaria', 'Toras Araucaria', 'TORA ARAUCARIA',
+        'Araucaria > 40 cm', 'ARAUCARIA > 40', 'Toras de Araucaria',
+        'TORAS DE ARAUCARIA EM PE',
+    ], 'Toras', 'Araucaria', 'Toras Araucaria', 'R$/m3')
+
+    # -------------------------------------------------------------------------
+    # TORAS DE EUCALIPTO
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'TORAS DE EUCALIPTO EM PE - DIAMETRO < 14 cm',
+        'Toras Eucalipto < 14 cm',
+    ], 'Toras', 'Eucalipto', 'Toras Eucalipto < 14 cm', 'R$/m3')
+
+    _add_mapping([
+        'Eucalipto 14 - 18 cm', 'Eucalipto 14-18 cm', 'EUCALIPTO 14-18',
+        'Toras Eucalipto 14-18 cm',
+        'TORAS DE EUCALIPTO EM PE - DIAMETRO 14 - 18 cm',
+    ], 'Toras', 'Eucalipto', 'Toras Eucalipto 14-18 cm', 'R$/m3')
+
+    _add_mapping([
+        'Eucalipto 18 - 25 cm', 'Eucalipto 18-25 cm', 'EUCALIPTO 18-25',
+        'Eucalipto 20 - 30 cm', 'Eucalipto 20-30 cm',
+        'Toras Eucalipto 18-25 cm',
+        'TORAS DE EUCALIPTO EM PE - DIAMETRO 18 - 25 cm',
+    ], 'Toras', 'Eucalipto', 'Toras Eucalipto 18-25 cm', 'R$/m3')
+
+    _add_mapping([
+        'Eucalipto 25 - 35 cm', 'Eucalipto 25-35 cm', 'EUCALIPTO 25-35',
+        'Eucalipto 30 - 40 cm', 'Eucalipto 30-40 cm',
+        'Toras Eucalipto 25-35 cm',
+        'TORAS DE EUCALIPTO EM PE - DIAMETRO 25 - 35 cm',
+    ], 'Toras', 'Eucalipto', 'Toras Eucalipto 25-35 cm', 'R$/m3')
+
+    _add_mapping([
+        'Eucalipto > 35 cm', 'Eucalipto > 30 cm', 'Eucalipto > 40 cm',
+        'EUCALIPTO > 35', 'EUCALIPTO > 40',
+        'Toras Eucalipto > 35 cm',
+        'TORAS DE EUCALIPTO EM PE - DIAMETRO > 35 cm',
+    ], 'Toras', 'Eucalipto', 'Toras Eucalipto > 35 cm', 'R$/m3')
+
+    _add_mapping([
+        'Eucalipto Geral', 'EUCALIPTO GERAL', 'Toras Eucalipto Geral',
+        'TORA EUCALIPTO',
+    ], 'Toras', 'Eucalipto', 'Toras Eucalipto Geral', 'R$/m3')
+
+    _add_mapping([
+        'Eucalipto Media Estado', 'Eucalipto MÃ©dia Estado',
+        'EUCALIPTO MEDIA ESTADO', 'Toras Eucalipto Media Estado',
+        'TORAS DE EUCALIPTO EM PE - media sortimentos Estado',
+    ], 'Toras', 'Eucalipto', 'Toras Eucalipto Media Estado', 'R$/m3')
+
+    # -------------------------------------------------------------------------
+    # TORAS DE PINUS
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Pinus 10 - 20 cm', 'Pinus 10-20 cm', 'PINUS < 14',
+        'Toras Pinus < 14 cm',
+        'TORAS DE PINUS EM PE - DIAMETRO < 14 cm',
+    ], 'Toras', 'Pinus', 'Toras Pinus < 14 cm', 'R$/m3')
+
+    _add_mapping([
+        'Pinus 14 - 18 cm', 'Pinus 14-18 cm', 'PINUS 14-18',
+        'Toras Pinus 14-18 cm',
+        'TORAS DE PINUS EM PE - DIAMETRO 14 - 18 cm',
+    ], 'Toras', 'Pinus', 'Toras Pinus 14-18 cm', 'R$/m3')
+
+    _add_mapping([
+        'Pinus 18 - 25 cm', 'Pinus 18-25 cm', 'PINUS 18-25',
+        'Pinus 20 - 30 cm', 'Pinus 20-30 cm',
+        'Toras Pinus 18-25 cm',
+        'TORAS DE PINUS EM PE - DIAMETRO 18 - 25 cm',
+    ], 'Toras', 'Pinus', 'Toras Pinus 18-25 cm', 'R$/m3')
+
+    _add_mapping([
+        'Pinus 25 - 35 cm', 'Pinus 25-35 cm', 'PINUS 25-35',
+        'Pinus 30 - 40 cm', 'Pinus 30-40 cm',
+        'Toras Pinus 25-35 cm',
+        'TORAS DE PINUS EM PE - DIAMETRO 25 - 35 cm',
+    ], 'Toras', 'Pinus', 'Toras Pinus 25-35 cm', 'R$/m3')
+
+    _add_mapping([
+        'Pinus > 35 cm', 'Pinus > 40 cm', 'PINUS > 35', 'PINUS > 40',
+        'Toras Pinus > 35 cm',
+        'TORAS DE PINUS EM PE - DIAMETRO > 35 cm',
+    ], 'Toras', 'Pinus', 'Toras Pinus > 35 cm', 'R$/m3')
+
+    _add_mapping([
+        'Pinus Geral', 'PINUS GERAL', 'Toras Pinus Geral',
+        'TORA PINUS',
+    ], 'Toras', 'Pinus', 'Toras Pinus Geral', 'R$/m3')
+
+    _add_mapping([
+        'Pinus Media Estado', 'Pinus MÃ©dia Estado',
+        'PINUS MEDIA ESTADO', 'Toras Pinus Media Estado',
+        'TORAS DE PINUS EM PE - media sortimentos Estado',
+    ], 'Toras', 'Pinus', 'Toras Pinus Media Estado', 'R$/m3')
+
+    # -------------------------------------------------------------------------
+    # TORAS DE NATIVAS
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'TORAS DE CANELA EM PE - DIAMETRO > 30 cm',
+        'TORAS DE CANELA NA LAMINADORA - DIAMETRO > 40 cm',
+        'TORAS DE CANELA NA SERRARIA - DIAMETRO > 30 cm',
+        'TORAS EM PE CANELA > 30 CM m3', 'TORAS POSTO LAMINADORA CANELA > 40 CM m3',
+        'TORAS POSTO NA SERRARIA CANELA > 30 cm m3',
+        'Canela > 30 cm', 'Canela > 40 cm', 'Toras Canela',
+    ], 'Toras', 'Nativas', 'Toras Canela', 'R$/m3')
+
+    _add_mapping([
+        'TORAS DE CEDRO EM PE - DIAMETRO > 30 cm',
+        'TORAS EM PE CEDRO > 30 CM m3', 'Cedro > 30 cm', 'Toras Cedro',
+    ], 'Toras', 'Nativas', 'Toras Cedro', 'R$/m3')
+
+    _add_mapping([
+        'TORAS DE CEREJEIRA NA LAMINADORA - DIAMETRO > 70 cm',
+        'TORAS POSTO LAMINADORA CEREJEIRA > 70 CM m3',
+        'Cerejeira > 70 cm', 'Toras Cerejeira',
+    ], 'Toras', 'Nativas', 'Toras Cerejeira', 'R$/m3')
+
+    _add_mapping([
+        'TORAS DE GREVILEA EM PE - DIAMETRO > 30 cm',
+        'TORAS EM PE GREVILEA > 30 CM m3', 'Grevilha > 30 cm', 'Toras Grevilha',
+    ], 'Toras', 'Nativas', 'Toras Grevilha', 'R$/m3')
+
+    _add_mapping([
+        'TORAS DE IMBUIA NA SERRARIA - DIAMETRO > 45 cm',
+        'TORAS POSTO NA SERRARIA IMBUIA > 45 cm m3',
+        'TORAS POSTO NA SERRARIA IMBUIA 30 - 40 cm m3',
+        'TORAS POSTO NA SERRARIA IMBUIA 30 cm m3',
+        'TORAS POSTO LAMINADORA IMBUIA (01 FILE) m3',
+        'TORAS POSTO LAMINADORA IMBUIA (02 FILES) m3',
+        'TORAS EM PE IMBUIA > 30 CM m3',
+        'Imbuia > 30 cm', 'Imbuia 30 - 40 cm', 'Toras Imbuia',
+    ], 'Toras', 'Nativas', 'Toras Imbuia', 'R$/m3')
+
+    _add_mapping([
+        'TORAS DE MOGNO NA LAMINADORA - DIAMETRO > 70 cm',
+        'Mogno > 70 cm', 'Toras Mogno',
+    ], 'Toras', 'Nativas', 'Toras Mogno', 'R$/m3')
+
+    _add_mapping([
+        'Angico > 30 cm', 'Toras Angico',
+    ], 'Toras', 'Nativas', 'Toras Angico', 'R$/m3')
+
+    _add_mapping([
+        'Peroba > 30 cm', 'Toras Peroba',
+    ], 'Toras', 'Nativas', 'Toras Peroba', 'R$/m3')
+
+    _add_mapping([
+        'TORAS DE ALAMO EM PE', 'Alamo', 'Toras Alamo',
+    ], 'Toras', 'Nativas', 'Toras Alamo', 'R$/m3')
+
+    _add_mapping([
+        'TORAS DE MADEIRA DE LEI NA LAMINADORA',
+        'TORAS POSTO LAMINADORA MADEIRA DE LEI m3',
+        'Toras Madeira de Lei',
+    ], 'Toras', 'Nativas', 'Toras Madeira de Lei', 'R$/m3')
+
+    _add_mapping([
+        'Outras Especies', 'OUTRAS ESPECIES', 'Toras Outras Especies',
+        'TORAS DE OUTRAS ESPECIES EM PE',
+    ], 'Toras', 'Nativas', 'Toras Outras Especies', 'R$/m3')
+
+    # -------------------------------------------------------------------------
+    # TORAS PARA PROCESSO
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Tora para Processo', 'TORA PROCESSO', 'Toras Processo',
+        'Tora para processo',
+        'TORA PARA PROCESSO (Inclui madeira para papel e celulose)',
+        'TORA PARA PROCESSO',
+    ], 'Toras', 'Processo', 'Toras Processo', 'R$/m3')
+
+    _add_mapping([
+        'Escoras/Outras', 'ESCORAS', 'Escoras', 'Outras finalidades',
+        'TORA PARA OUTRAS FINALIDADES',
+        'TORA PARA OUTRAS FINALIDADES (Por exemplo escoras)',
+    ], 'Toras', 'Processo', 'Escoras', 'R$/m3')
+
+    # -------------------------------------------------------------------------
+    # LENHA
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Lenha', 'LENHA', 'Lenha metro estereo',
+        'LENHA POSTA NO CONSUMIDOR',
+    ], 'Energia', 'Lenha', 'Lenha', 'R$/m3')
+
+    # -------------------------------------------------------------------------
+    # CAVACOS
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Cavaco Limpo', 'CAVACO LIMPO', 'Cavaco', 'CAVACO',
+        'CAVACO LIMPO ONDE FOI PRODUZIDO',
+        'CAVACO LIMPO ONDE FOI PRODUZIDO (cavaco para processo)',
+    ], 'Cavacos', 'Limpo', 'Cavaco Limpo', 'R$/t')
+
+    _add_mapping([
+        'Cavaco Sujo', 'CAVACO SUJO', 'Cavaco Sujo (Energia)',
+        'Cavaco para energia',
+        'CAVACO SUJO ONDE FOI PRODUZIDO',
+        'CAVACO SUJO ONDE FOI PRODUZIDO (cavaco para energia)',
+    ], 'Cavacos', 'Sujo', 'Cavaco Sujo', 'R$/t')
+
+    # -------------------------------------------------------------------------
+    # PFNM - ERVA-MATE FOLHA (producao primaria)
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Erva-mate Industria', 'Erva-mate IndÃºstria',
+        'FOLHA NA INDUSTRIA', 'FOLHA NA INDÃšSTRIA',
+        'Erva-mate Folha Industria',
+        'FOLHA DE ERVA-MATE NA INDUSTRIA',
+    ], 'PFNM', 'Erva-mate Folha', 'Erva-mate Folha Industria', 'R$/kg')
+
+    _add_mapping([
+        'Erva-mate no Pe', 'Erva-mate no PÃ©',
+        'FOLHA NO PE', 'FOLHA NO PÃ‰',
+        'Erva-mate Folha Pe',
+        'FOLHA DE ERVA-MATE NO PE',
+    ], 'PFNM', 'Erva-mate Folha', 'Erva-mate Folha Pe', 'R$/kg')
+
+    _add_mapping([
+        'FOLHA NO BARRANCO', 'Erva-mate Folha Barranco',
+    ], 'PFNM', 'Erva-mate Folha', 'Erva-mate Folha Barranco', 'R$/kg')
+
+    # -------------------------------------------------------------------------
+    # PRODUTOS BENEFICIADOS - ERVA-MATE PROCESSADA
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'ERVA - MATE CANCHEADA', 'Erva-mate Cancheada', 'Cancheada',
+    ], 'Produtos Beneficiados', 'Erva-mate', 'Erva-mate Cancheada', 'R$/kg')
+
+    _add_mapping([
+        'E - ERVA - MATE BENEFICIADA', 'Erva-mate Beneficiada', 'Beneficiada',
+    ], 'Produtos Beneficiados', 'Erva-mate', 'Erva-mate Beneficiada', 'R$/kg')
+
+    _add_mapping([
+        'INDUSTRIAL - (Kg)', 'INDÃšSTRIAL - (Kg)', 'Erva-mate Industrial',
+    ], 'Produtos Beneficiados', 'Erva-mate', 'Erva-mate Industrial', 'R$/kg')
+
+    _add_mapping([
+        'MERCADO - ERVA-MATE TIPO PN 1', 'Goma/po/palitos',
+        'VAREJISTA - (Kg)', 'Erva-mate Mercado', 'Erva-mate Varejista',
+    ], 'Produtos Beneficiados', 'Erva-mate', 'Erva-mate Mercado', 'R$/kg')
+
+    # -------------------------------------------------------------------------
+    # PFNM - OUTROS
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Palmito (cabeca)', 'Palmito (cabeÃ§a)', 'Palmito Cabeca',
+        'PALMITO CABECA',
+    ], 'PFNM', 'Palmito', 'Palmito Cabeca', 'R$/cabeca')
+
+    _add_mapping([
+        'Latex de Seringueira', 'LÃ¡tex de Seringueira',
+        'LATEX SERINGUEIRA', 'SERINGUEIRA',
+        'SERINGUEIRA (LATEX)',
+    ], 'PFNM', 'Latex', 'Latex Seringueira', 'R$/kg')
+
+    _add_mapping([
+        'Pinhao', 'PinhÃ£o', 'PINHAO',
+    ], 'PFNM', 'Pinhao', 'Pinhao', 'R$/kg')
+
+    _add_mapping([
+        'Resina', 'RESINA', 'Resina de Pinus', 'Resina Pinus',
+    ], 'PFNM', 'Resina', 'Resina Pinus', 'R$/kg')
+
+    # -------------------------------------------------------------------------
+    # ENERGIA - CARVAO
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Carvao', 'CarvÃ£o', 'CARVAO', 'Carvao Vegetal',
+    ], 'Energia', 'Carvao', 'Carvao Vegetal', 'R$/kg')
+
+    # -------------------------------------------------------------------------
+    # CUSTOS OPERACIONAIS
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'Custos de Colheita e Carregamento', 'CUSTOS COLHEITA',
+        'Custos Colheita e Carregamento', 'CUSTO COLHEITA',
+        'Custos de Colheita',
+    ], 'Custos Operacionais', 'Colheita', 'Custos Colheita e Carregamento', 'R$/m3')
+
+    # -------------------------------------------------------------------------
+    # MADEIRA SERRADA
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'PINUS (1" x 4" x 2,40m)', 'Madeira Serrada Pinus',
+        'Madeira Serrada de Pinus',
+    ], 'Madeira Serrada', 'Pinus', 'Madeira Serrada Pinus', 'R$/m3')
+
+    _add_mapping([
+        'EUCALIPTO (1"x 4" x 2,40m)', 'Madeira Serrada Eucalipto',
+        'Madeira Serrada de Eucalipto',
+    ], 'Madeira Serrada', 'Eucalipto', 'Madeira Serrada Eucalipto', 'R$/m3')
+
+    _add_mapping([
+        'ARAUCARIA( 1" x 4" x 2,40m)', 'Madeira Serrada Araucaria',
+        'Madeira Serrada de Araucaria',
+    ], 'Madeira Serrada', 'Araucaria', 'Madeira Serrada Araucaria', 'R$/m3')
+
+    _add_mapping([
+        'CEDRO ( 1" x 4" x 2,40m)', 'Madeira Serrada Cedro',
+        'Madeira Serrada de Cedro',
+    ], 'Madeira Serrada', 'Nativas', 'Madeira Serrada Cedro', 'R$/m3')
+
+    _add_mapping([
+        'IMBUIA (1,5" x 5" x 2,20m)', 'IMBUIA (1,5" x 9" x 2,20m)',
+        'Madeira Serrada Imbuia', 'Madeira Serrada de Imbuia',
+    ], 'Madeira Serrada', 'Nativas', 'Madeira Serrada Imbuia', 'R$/m3')
+
+    _add_mapping([
+        'CEREJEIRA ( 1,5" x 5" x 2,20m)', 'Madeira Serrada Cerejeira',
+        'Madeira Serrada de Cerejeira',
+    ], 'Madeira Serrada', 'Nativas', 'Madeira Serrada Cerejeira', 'R$/m3')
+
+    _add_mapping([
+        'MOGNO (1,5" x 5" x 2,20m)', 'Madeira Serrada Mogno',
+        'Madeira Serrada de Mogno',
+    ], 'Madeira Serrada', 'Nativas', 'Madeira Serrada Mogno', 'R$/m3')
+
+    _add_mapping([
+        'GREVILEA (1"x 4" x 2,40m)', 'Madeira Serrada Grevilha',
+        'Madeira Serrada de Grevilha',
+    ], 'Madeira Serrada', 'Nativas', 'Madeira Serrada Grevilha', 'R$/m3')
+
+    # -------------------------------------------------------------------------
+    # RESIDUOS
+    # -------------------------------------------------------------------------
+    _add_mapping([
+        'COSTANEIRAS (DZ)', 'Costaneiras',
+    ], 'Residuos', 'Geral', 'Costaneiras', 'R$/dz')
+
+    _add_mapping([
+        'DESTOPO (m3)', 'Destopo',
+    ], 'Residuos', 'Geral', 'Destopo', 'R$/m3')
+
+    _add_mapping([
+        'REFIO ( M/ESTEREO)', 'REFIO (st)', 'Refilo',
+    ], 'Residuos', 'Geral', 'Refilo', 'R$/st')
+
+    _add_mapping([
+        'SEPILHO / PO DE SERRA (M3)', 'SERRAGEM (M3)', 'Serragem',
+    ], 'Residuos', 'Geral', 'Serragem', 'R$/m3')
+
+
+def product_mapping():
+    """Mapeamento de produtos, construido na primeira chamada"""
+    if not _PRODUCT_MAPPING:
+        _register_product_mappings()
+    return _PRODUCT_MAPPING
+
+
+def __getattr__(name):
+    # preprocess_data.PRODUCT_MAPPING continua disponivel, ja preenchido
+    if name == 'PRODUCT_MAPPING':
+        return product_mapping()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # =============================================================================
@@ -958,6 +1280,7 @@ def extract_month_from_text(text, default=6):
     return default
 
 
+@memoized
 def normalize_region_name(name):
     """Normaliza nome da regiao"""
     if pd.isna(name):
@@ -976,18 +1299,132 @@ def normalize_region_name(name):
     if 'PRECO' in key and 'MEDIO' in key:
         return 'Media Estado'
 
-    mapped = REGION_KEY_MAP.get(key)
+    mapped = REGION_TOKENS.get(key)
     if mapped:
         return mapped
 
-    for regiao in REGIOES:
-        reg_key = normalize_key(regiao)
-        if reg_key and (reg_key in key or key in reg_key):
+    for reg_key, regiao in REGION_KEYS:
+        if reg_key in key or key in reg_key:
             return regiao
 
     return None
 
 
+# Chaves normalizadas das regioes, na ordem de REGIOES (usada na busca parcial)
+REGION_KEYS = [(normalize_key(r), r) for r in REGIOES if normalize_key(r)]
+
+# Tokens exatos de regiao: nomes normalizados e abreviacoes de REGION_KEY_MAP
+REGION_TOKENS = {reg_key: regiao for reg_key, regiao in REGION_KEYS}
+REGION_TOKENS.update(REGION_KEY_MAP)
+
+
+@timed('cabecalho')
+def detect_region_header(df, max_rows, min_hits, label_min_hits=None):
+    """
+    Localiza o cabecalho de regioes nas primeiras max_rows linhas.
+    Uma linha e aceita com pelo menos min_hits regioes, ou com label_min_hits
+    regioes e um rotulo ESPECIE/PRODUTO. Todas as celulas sao mapeadas em uma
+    unica passada; retorna (linha, {coluna: regiao}) ou (None, {}).
+    """
+    block = df.iloc[:max_rows].to_numpy(dtype=object)
+    if block.size == 0:
+        return None, {}
+
+    regions = np.frompyfunc(normalize_region_name, 1, 1)(block)
+    found = np.not_equal(regions, None)
+    hits = found.sum(axis=1)
+    threshold = min(min_hits, label_min_hits or min_hits)
+
+    for i in np.flatnonzero(hits >= threshold).tolist():
+        if hits[i] < min_hits:
+            row_vals = [x for x in block[i] if not pd.isna(x)]
+            row_key = normalize_key(' '.join([str(x) for x in row_vals]))
+            if 'ESPECIE' not in row_key and 'PRODUTO' not in row_key:
+                continue
+        cols = np.flatnonzero(found[i]).tolist()
+        return i, {col: regions[i, col] for col in cols}
+
+    return None, {}
+
+
+@timed('cabecalho')
+def header_regions(header):
+    """Mapeia {coluna: regiao} de uma linha de cabecalho"""
+    region_cols = {}
+    for col_idx, val in enumerate(header):
+        region = normalize_region_name(val)
+        if region:
+            region_cols[col_idx] = region
+    return region_cols
+
+
+# Indice Aho-Corasick sobre as chaves de PRODUCT_MAPPING, reconstruido
+# quando o numero de chaves muda
+_PRODUCT_INDEX = None
+
+
+def _build_product_index(patterns):
+    """
+    Compila os padroes em um automato Aho-Corasick.
+    Cada no guarda o melhor padrao que termina nele (ou em seus sufixos):
+    o mais longo e, em caso de empate, o primeiro inserido.
+    """
+    goto = [{}]
+    fail = [0]
+    best = [None]
+    for order, pattern in enumerate(patterns):
+        node = 0
+        for ch in pattern:
+            nxt = goto[node].get(ch)
+            if nxt is None:
+                nxt = len(goto)
+                goto[node][ch] = nxt
+                goto.append({})
+                fail.append(0)
+                best.append(None)
+            node = nxt
+        best[node] = (len(pattern), -order, pattern)
+
+    queue = list(goto[0].values())
+    for node in queue:
+        for ch, child in goto[node].items():
+            state = fail[node]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            fail[child] = goto[state].get(ch, 0)
+            inherited = best[fail[child]]
+            if inherited and (best[child] is None or inherited > best[child]):
+                best[child] = inherited
+            queue.append(child)
+
+    return goto, fail, best
+
+
+def find_longest_mapped_pattern(key):
+    """
+    Retorna a chave mais longa de PRODUCT_MAPPING contida em key
+    (empate resolvido pela ordem de insercao), em uma unica passada.
+    """
+    global _PRODUCT_INDEX
+    mapping = product_mapping()
+    if _PRODUCT_INDEX is None or _PRODUCT_INDEX[0] != len(mapping):
+        _PRODUCT_INDEX = (len(mapping),) + _build_product_index(mapping)
+    _, goto, fail, best = _PRODUCT_INDEX
+
+    state = 0
+    found = None
+    for ch in key:
+        while state and ch not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(ch, 0)
+        candidate = best[state]
+        if candidate and (found is None or candidate > found):
+            found = candidate
+    return found[2] if found else None
+
+
+@timed('classificacao')
+@memoized
 def classify_product(product_name):
     """
     Classifica um produto usando o mapeamento integrado.
@@ -1003,19 +1440,14 @@ def classify_product(product_name):
         return None, None, None, None
 
     # Busca direta no mapeamento
-    if key in PRODUCT_MAPPING:
-        return PRODUCT_MAPPING[key]
+    mapping = product_mapping()
+    if key in mapping:
+        return mapping[key]
 
     # Busca parcial - encontra a chave mais longa que esta contida
-    best_match = None
-    best_len = 0
-    for map_key, value in PRODUCT_MAPPING.items():
-        if map_key in key and len(map_key) > best_len:
-            best_match = value
-            best_len = len(map_key)
-
-    if best_match:
-        return best_match
+    map_key = find_longest_mapped_pattern(key)
+    if map_key:
+        return mapping[map_key]
 
     # Classificacao por heuristica para produtos nao mapeados
     return classify_by_heuristic(key, name)
@@ -1227,62 +1659,345 @@ def parse_price(value):
         return None
 
 
+# =============================================================================
+# REGISTROS EM FORMATO COLUNAR
+# =============================================================================
+
+RECORD_FIELDS = (
+    'ano', 'mes', 'periodo', 'regiao', 'categoria',
+    'subcategoria', 'produto', 'unidade', 'preco'
+)
+CATEGORICAL_FIELDS = ('periodo', 'regiao', 'categoria', 'subcategoria', 'produto', 'unidade')
+
+
+# Esquema das saidas colunares (detailed.arrow / detailed.parquet)
+@lru_cache(maxsize=None)
+def arrow_schema():
+    """Esquema Arrow dos registros (requer pyarrow)"""
+    return pa.schema([
+        ('ano', pa.int16()),
+        ('mes', pa.int8()),
+        ('periodo', pa.string()),
+        ('regiao', pa.string()),
+        ('categoria', pa.string()),
+        ('subcategoria', pa.string()),
+        ('produto', pa.string()),
+        ('unidade', pa.string()),
+        ('preco', pa.float64()),
+    ])
+
+
+def _json_float(value):
+    """Representacao de float identica a do modulo json"""
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return 'Infinity' if value > 0 else '-Infinity'
+    return float.__repr__(value)
+
+
+class RecordStore:
+    """
+    Registros de preco em colunas: os campos categoricos sao codigos inteiros
+    de dicionarios internados, ano/mes/preco ficam em arrays compactos.
+    Substitui a lista de dicts (um dict de 9 chaves por preco).
+    """
+
+    def __init__(self):
+        self.ano = array('H')
+        self.mes = array('B')
+        self.preco = array('d')
+        self.codes = {field: array('i') for field in CATEGORICAL_FIELDS}
+        self.values = {field: [] for field in CATEGORICAL_FIELDS}
+        self._lookup = {field: {} for field in CATEGORICAL_FIELDS}
+        # Parte do arquivo nao pode ser lida (ex.: aba com erro): os registros
+        # sao usados, mas nao vao para o cache
+        self.incomplete = False
+
+    def __len__(self):
+        return len(self.preco)
+
+    def _code(self, field, value):
+        lookup = self._lookup[field]
+        code = lookup.get(value)
+        if code is None:
+            code = len(self.values[field])
+            lookup[value] = code
+            self.values[field].append(value)
+        return code
+
+    def append(self, ano, mes, regiao, categoria, subcategoria, produto, unidade, preco):
+        codes = self.codes
+        self.ano.append(ano)
+        self.mes.append(mes)
+        codes['periodo'].append(self._code('periodo', f"{ano}-{mes:02d}"))
+        codes['regiao'].append(self._code('regiao', regiao))
+        codes['categoria'].append(self._code('categoria', categoria))
+        codes['subcategoria'].append(self._code('subcategoria', subcategoria))
+        codes['produto'].append(self._code('produto', produto))
+        codes['unidade'].append(self._code('unidade', unidade))
+        self.preco.append(preco)
+
+    def extend(self, other):
+        """Anexa os registros de outro RecordStore, remapeando os codigos"""
+        if not len(other):
+            return
+        self.ano.extend(other.ano)
+        self.mes.extend(other.mes)
+        self.preco.extend(other.preco)
+        for field in CATEGORICAL_FIELDS:
+            remap = [self._code(field, v) for v in other.values[field]]
+            self.codes[field].extend(array('i', (remap[c] for c in other.codes[field])))
+
+    def take(self, indices):
+        """Novo RecordStore com os registros nas posicoes indicadas"""
+        part = RecordStore()
+        part.ano = array('H', (self.ano[i] for i in indices))
+        part.mes = array('B', (self.mes[i] for i in indices))
+        part.preco = array('d', (self.preco[i] for i in indices))
+        for field in CATEGORICAL_FIELDS:
+            codes = self.codes[field]
+            for code in {codes[i] for i in indices}:
+                part._code(field, self.values[field][code])
+            lookup = part._lookup[field]
+            values = self.values[field]
+            part.codes[field] = array('i', (lookup[values[codes[i]]] for i in indices))
+        return part
+
+    def column(self, field):
+        """Coluna decodificada como array numpy"""
+        if field in CATEGORICAL_FIELDS:
+            values = np.empty(len(self.values[field]), dtype=object)
+            values[:] = self.values[field]
+            return values[np.frombuffer(self.codes[field], dtype=np.intc)]
+        if field == 'preco':
+            return np.frombuffer(self.preco, dtype=np.float64)
+        return np.frombuffer(getattr(self, field), dtype=self._int_dtype(field)).astype(np.int64)
+
+    @staticmethod
+    def _int_dtype(field):
+        return np.uint16 if field == 'ano' else np.uint8
+
+    def to_dataframe(self):
+        """DataFrame com as mesmas colunas e dtypes de pd.DataFrame(lista de dicts)"""
+        if not len(self):
+            return pd.DataFrame()
+        return pd.DataFrame({field: self.column(field) for field in RECORD_FIELDS})
+
+    def iter_dicts(self):
+        """Gera cada registro como dict (ordem de campos de RECORD_FIELDS)"""
+        values = self.values
+        codes = self.codes
+        for i in range(len(self)):
+            yield {
+                'ano': self.ano[i],
+                'mes': self.mes[i],
+                'periodo': values['periodo'][codes['periodo'][i]],
+                'regiao': values['regiao'][codes['regiao'][i]],
+                'categoria': values['categoria'][codes['categoria'][i]],
+                'subcategoria': values['subcategoria'][codes['subcategoria'][i]],
+                'produto': values['produto'][codes['produto'][i]],
+                'unidade': values['unidade'][codes['unidade'][i]],
+                'preco': self.preco[i]
+            }
+
+    def iter_json(self):
+        """
+        Gera cada registro ja serializado, igual a json.dumps(dict, ensure_ascii=False).
+        Os valores categoricos sao codificados uma unica vez por dicionario.
+        """
+        encoded = {
+            field: [json.dumps(v, ensure_ascii=False) for v in self.values[field]]
+            for field in CATEGORICAL_FIELDS
+        }
+        columns = [self.codes[field] for field in CATEGORICAL_FIELDS]
+        for i in range(len(self)):
+            periodo, regiao, categoria, subcategoria, produto, unidade = (
+                enc[col[i]] for enc, col in zip(encoded.values(), columns)
+            )
+            yield (
+                f'{{"ano": {self.ano[i]}, "mes": {self.mes[i]}, "periodo": {periodo}, '
+                f'"regiao": {regiao}, "categoria": {categoria}, "subcategoria": {subcategoria}, '
+                f'"produto": {produto}, "unidade": {unidade}, "preco": {_json_float(self.preco[i])}}}'
+            )
+
+    def write_json(self, f):
+        """Escreve os registros como array JSON (mesma saida de json.dump(lista))"""
+        f.write('[')
+        for i, rec in enumerate(self.iter_json()):
+            if i:
+                f.write(', ')
+            f.write(rec)
+        f.write(']')
+
+    def to_arrow(self):
+        """RecordBatch tipado (strings decodificadas a partir dos dicionarios)"""
+        arrays = [
+            pa.array(np.frombuffer(self.ano, dtype=np.uint16).astype(np.int16), pa.int16()),
+            pa.array(np.frombuffer(self.mes, dtype=np.uint8).astype(np.int8), pa.int8()),
+        ]
+        for field in CATEGORICAL_FIELDS:
+            dictionary = pa.DictionaryArray.from_arrays(
+                pa.array(np.frombuffer(self.codes[field], dtype=np.intc), pa.int32()),
+                pa.array(self.values[field], pa.string())
+            )
+            arrays.append(dictionary.dictionary_decode())
+        arrays.append(pa.array(np.frombuffer(self.preco, dtype=np.float64), pa.float64()))
+        return pa.RecordBatch.from_arrays(arrays, schema=arrow_schema())
+
+    def to_columns(self):
+        """Representacao serializavel (JSON) das colunas e dicionarios"""
+        return {
+            'ano': self.ano.tolist(),
+            'mes': self.mes.tolist(),
+            'preco': self.preco.tolist(),
+            'codes': {field: self.codes[field].tolist() for field in CATEGORICAL_FIELDS},
+            'values': self.values,
+        }
+
+    @classmethod
+    def from_arrow(cls, batch):
+        """RecordStore a partir de um RecordBatch no esquema arrow_schema()"""
+        store = cls()
+        store.ano = array('H', batch.column('ano').to_numpy().astype(np.uint16).tobytes())
+        store.mes = array('B', batch.column('mes').to_numpy().astype(np.uint8).tobytes())
+        store.preco = array('d', batch.column('preco').to_numpy().tobytes())
+        for field in CATEGORICAL_FIELDS:
+            encoded = batch.column(field).dictionary_encode()
+            values = encoded.dictionary.to_pylist()
+            indices = encoded.indices
+            if encoded.null_count:
+                # Nulos (unidade ausente) viram uma entrada None no dicionario
+                values.append(None)
+                indices = indices.fill_null(len(values) - 1)
+            store.values[field] = values
+            store._lookup[field] = {v: i for i, v in enumerate(values)}
+            store.codes[field] = array('i', indices.to_numpy().astype(np.intc).tobytes())
+        return store
+
+    @classmethod
+    def from_dicts(cls, rows):
+        """RecordStore a partir de uma lista de registros (formato de detailed.json)"""
+        store = cls()
+        for row in rows:
+            store.append(row['ano'], row['mes'], row['regiao'], row['categoria'],
+                         row['subcategoria'], row['produto'], row['unidade'], row['preco'])
+        return store
+
+    @classmethod
+    def from_columns(cls, data):
+        store = cls()
+        store.ano = array('H', data['ano'])
+        store.mes = array('B', data['mes'])
+        store.preco = array('d', data['preco'])
+        for field in CATEGORICAL_FIELDS:
+            store.codes[field] = array('i', data['codes'][field])
+            store.values[field] = list(data['values'][field])
+            store._lookup[field] = {v: i for i, v in enumerate(store.values[field])}
+        return store
+
+
 # =============================================================================
 # PARSING DE ARQUIVOS EXCEL
 # =============================================================================
 
+class ReadError(Exception):
+    """
+    Arquivo que nao pode ser lido (erro de leitura ou dependencia ausente).
+    Vira uma falha do arquivo em vez de um resultado vazio, que iria para o cache.
+    """
+
+def _coerce_price(value):
+    """float(value), ou NaN quando o valor nao e conversivel"""
+    try:
+        return float(value)
+    except Exception:
+        return np.nan
+
+
+def _coerce_numeric_price(value):
+    """Como _coerce_price, mas aceita apenas celulas numericas (sem texto)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    return np.nan
+
+
+def extract_region_prices(df, year, month, row_positions, row_info, columns,
+                          coerce=_coerce_price):
+    """
+    Extrai em bloco os precos das colunas de regiao.
+    row_positions: posicoes das linhas de produto ja classificadas
+    row_info: (categoria, subcategoria, produto, unidade) de cada linha
+    columns: lista de (coluna, regiao)
+    Os registros saem na mesma ordem do percurso linha a linha, coluna a coluna.
+    """
+    records = RecordStore()
+    columns = [(col, regiao) for col, regiao in columns if col < df.shape[1]]
+    if not row_positions or not columns:
+        return records
+
+    block = df.iloc[row_positions, [col for col, _ in columns]].to_numpy(dtype=object)
+    prices = np.frompyfunc(coerce, 1, 1)(block).astype(float)
+    rows_idx, cols_idx = np.nonzero(prices > 0)
+
+    regioes = [regiao for _, regiao in columns]
+    for r, c, preco in zip(rows_idx.tolist(), cols_idx.tolist(), prices[rows_idx, cols_idx].tolist()):
+        records.append(year, month, regioes[c], *row_info[r], preco)
+    return records
+
+
+def _column_values(df, col):
+    """Valores de uma coluna como lista (None se a coluna nao existir)"""
+    if col is None or col >= df.shape[1]:
+        return None
+    return df.iloc[:, col].tolist()
+
+
 def parse_matrix_format(df, year, month, filepath):
     """Processa arquivos no formato matriz (produtos na coluna A, regioes no cabecalho)"""
-    records = []
+    records = RecordStore()
 
     # Encontra a linha de cabecalho com regioes
-    header_row = None
-    product_col = 0  # Coluna padrao para nome do produto
-    for i in range(min(15, len(df))):
-        row_vals = [x for x in df.iloc[i].values if not pd.isna(x)]
-        if not row_vals:
-            continue
-        region_count = sum(1 for v in row_vals if normalize_region_name(v))
-        if region_count >= 4:  # Pelo menos 4 regioes para confirmar que e cabecalho
-            header_row = i
-            # Verifica se ha coluna "Produto" explicita (formato 201905)
-            for col_idx, val in enumerate(df.iloc[i]):
-                if pd.notna(val) and normalize_key(str(val)) == 'PRODUTO':
-                    product_col = col_idx
-                    break
-            break
-
+    # (pelo menos 4 regioes para confirmar que e cabecalho)
+    header_row, region_cols = detect_region_header(df, 15, 4)
     if header_row is None:
         return records
 
     header = df.iloc[header_row]
-    region_cols = {}
+    product_col = None
     unit_col = None
 
     for col_idx, val in enumerate(header):
         if pd.isna(val):
             continue
-        val_str = str(val).strip()
-        val_key = normalize_key(val_str)
+        val_key = normalize_key(str(val).strip())
+
+        # Verifica se ha coluna "Produto" explicita (formato 201905)
+        if val_key == 'PRODUTO' and product_col is None:
+            product_col = col_idx
 
         # Verifica se e coluna de unidade
         if val_key in ('UNIDADE', 'UNID', 'R$UNID', 'R$M3', 'R$ST', 'R$T'):
             unit_col = col_idx
-            continue
-
-        region = normalize_region_name(val_str)
-        if region:
-            region_cols[col_idx] = region
+            region_cols.pop(col_idx, None)
 
     if not region_cols:
         return records
 
+    if product_col is None:
+        product_col = 0  # Coluna padrao para nome do produto
+
     # Processa cada linha de produto
-    for i in range(header_row + 1, len(df)):
-        row = df.iloc[i]
+    products = _column_values(df, product_col)
+    units = _column_values(df, unit_col)
+    if products is None:
+        return records
 
+    row_positions = []
+    row_info = []
+    for i in range(header_row + 1, len(df)):
         # Usa a coluna identificada para o nome do produto
-        product_name = row.iloc[product_col] if product_col < len(row) else None
+        product_name = products[i]
         if pd.isna(product_name):
             continue
 
@@ -1308,54 +2023,41 @@ def parse_matrix_format(df, year, month, filepath):
 
         # Extrai unidade se disponivel
         unidade = None
-        if unit_col is not None and unit_col < len(row):
-            unidade = extract_unit(row.iloc[unit_col])
+        if units is not None:
+            unidade = extract_unit(units[i])
         if not unidade:
             unidade = unidade_padrao
 
-        for col_idx, regiao in region_cols.items():
-            if col_idx < len(row):
-                preco = row.iloc[col_idx]
-                if pd.notna(preco):
-                    try:
-                        preco_float = float(preco)
-                    except:
-                        continue
-                    if preco_float > 0:
-                        records.append({
-                            'ano': year,
-                            'mes': month,
-                            'periodo': f"{year}-{month:02d}",
-                            'regiao': regiao,
-                            'categoria': categoria,
-                            'subcategoria': subcategoria,
-                            'produto': produto,
-                            'unidade': unidade,
-                            'preco': preco_float
-                        })
+        row_positions.append(i)
+        row_info.append((categoria, subcategoria, produto, unidade))
 
+    records.extend(extract_region_prices(
+        df, year, month, row_positions, row_info, list(region_cols.items())
+    ))
     return records
 
 
 def parse_modern_excel(filepath, year, month):
     """Processa arquivos Excel modernos (2018+)"""
-    records = []
+    records = RecordStore()
 
+    engine = {'.ods': 'odf', '.xls': 'xlrd'}.get(filepath.suffix.lower(), 'openpyxl')
     try:
-        if str(filepath).endswith('.ods'):
-            df = pd.read_excel(filepath, sheet_name=0, header=None, engine='odf')
-        else:
-            df = pd.read_excel(filepath, sheet_name=0, header=None)
+        with profiled(f'leitura_{engine}'):
+            if str(filepath).endswith('.ods'):
+                df = pd.read_excel(filepath, sheet_name=0, header=None, engine='odf')
+            else:
+                df = pd.read_excel(filepath, sheet_name=0, header=None)
     except Exception as e:
-        print(f"  Erro ao ler {filepath}: {e}")
-        return records
+        raise ReadError(f"Erro ao ler {filepath.name}: {e}") from e
 
     header_row = None
-    for i in range(min(10, len(df))):
-        row_str = ' '.join([str(x) for x in df.iloc[i].values if not pd.isna(x)])
-        if 'Produto' in row_str and 'Apucarana' in row_str:
-            header_row = i
-            break
+    with profiled('cabecalho'):
+        for i in range(min(10, len(df))):
+            row_str = ' '.join([str(x) for x in df.iloc[i].values if not pd.isna(x)])
+            if 'Produto' in row_str and 'Apucarana' in row_str:
+                header_row = i
+                break
 
     if header_row is None:
         # Tenta formato matriz alternativo
@@ -1366,11 +2068,7 @@ def parse_modern_excel(filepath, year, month):
         return records
 
     header = df.iloc[header_row]
-    region_cols = {}
-    for col_idx, val in enumerate(header):
-        region = normalize_region_name(val)
-        if region:
-            region_cols[col_idx] = region
+    region_cols = header_regions(header)
 
     media_atual_col = None
     for col_idx, val in enumerate(header):
@@ -1378,9 +2076,13 @@ def parse_modern_excel(filepath, year, month):
             media_atual_col = col_idx
             break
 
+    products = _column_values(df, 0)
+    units = _column_values(df, 1)
+
+    row_positions = []
+    row_info = []
     for i in range(header_row + 1, len(df)):
-        row = df.iloc[i]
-        product_name = row.iloc[0]
+        product_name = products[i]
 
         if pd.isna(product_name):
             continue
@@ -1395,89 +2097,57 @@ def parse_modern_excel(filepath, year, month):
             continue
 
         # Extrai unidade do texto ou usa o padrao
-        unidade = extract_unit(row.iloc[1]) if len(row) > 1 else None
+        unidade = extract_unit(units[i]) if units is not None else None
         if not unidade:
             unidade = unidade_padrao
 
-        for col_idx, regiao in region_cols.items():
-            if col_idx < len(row):
-                preco = row.iloc[col_idx]
-                if pd.notna(preco) and isinstance(preco, (int, float)) and preco > 0:
-                    records.append({
-                        'ano': year,
-                        'mes': month,
-                        'periodo': f"{year}-{month:02d}",
-                        'regiao': regiao,
-                        'categoria': categoria,
-                        'subcategoria': subcategoria,
-                        'produto': produto,
-                        'unidade': unidade,
-                        'preco': float(preco)
-                    })
-
-        if media_atual_col is not None and media_atual_col < len(row):
-            media = row.iloc[media_atual_col]
-            if pd.notna(media) and isinstance(media, (int, float)) and media > 0:
-                records.append({
-                    'ano': year,
-                    'mes': month,
-                    'periodo': f"{year}-{month:02d}",
-                    'regiao': 'Media Estado',
-                    'categoria': categoria,
-                    'subcategoria': subcategoria,
-                    'produto': produto,
-                    'unidade': unidade,
-                    'preco': float(media)
-                })
+        row_positions.append(i)
+        row_info.append((categoria, subcategoria, produto, unidade))
+
+    # A coluna "Media Atual" vira a regiao 'Media Estado', apos as regioes de cada linha
+    columns = list(region_cols.items())
+    if media_atual_col is not None:
+        columns.append((media_atual_col, 'Media Estado'))
 
+    records.extend(extract_region_prices(
+        df, year, month, row_positions, row_info, columns, coerce=_coerce_numeric_price
+    ))
     return records
 
 
 def find_old_header_row(df):
-    """Encontra a linha de cabecalho em arquivos antigos"""
-    for i in range(min(40, len(df))):
-        row_vals = [x for x in df.iloc[i].values if not pd.isna(x)]
-        if not row_vals:
-            continue
-        row_str = ' '.join([str(x) for x in row_vals])
-        row_key = normalize_key(row_str)
-        region_hits = 0
-        for val in row_vals:
-            if normalize_region_name(val):
-                region_hits += 1
-        has_label = 'ESPECIE' in row_key or 'PRODUTO' in row_key
-        if region_hits >= 3 and (has_label or region_hits >= 4):
-            return i
-    return None
+    """Encontra a linha de cabecalho em arquivos antigos e suas colunas de regiao"""
+    return detect_region_header(df, 40, 4, label_min_hits=3)
 
 
 def parse_long_format_sheet(df, sheet_name, filename):
     """Processa planilhas no formato longo (com datas como colunas)"""
     if df is None or df.empty:
-        return []
-    header = df.iloc[0]
-    date_cols = {}
-    for col_idx, val in enumerate(header):
-        dt = pd.to_datetime(val, errors='coerce')
-        if pd.notna(dt):
-            date_cols[col_idx] = dt
-
-    if not date_cols:
-        return []
-
-    region_col = None
-    product_col = None
-    for col_idx, val in enumerate(header):
-        key = normalize_key(val)
-        if key in ('NR', 'NRE', 'NUCLEOREGIONAL'):
-            region_col = col_idx
-        if key == 'NOMECOMPLETO':
-            product_col = col_idx
+        return RecordStore()
+    with profiled('cabecalho'):
+        header = df.iloc[0]
+        date_cols = {}
+        for col_idx, val in enumerate(header):
+            dt = pd.to_datetime(val, errors='coerce')
+            if pd.notna(dt):
+                date_cols[col_idx] = dt
+
+        if not date_cols:
+            return RecordStore()
+
+        region_col = None
+        product_col = None
+        for col_idx, val in enumerate(header):
+            key = normalize_key(val)
+            if key in ('NR', 'NRE', 'NUCLEOREGIONAL'):
+                region_col = col_idx
+            if key == 'NOMECOMPLETO':
+                product_col = col_idx
 
     if region_col is None or product_col is None:
-        return []
+        return RecordStore()
 
-    records = []
+    records = RecordStore()
     for i in range(1, len(df)):
         row = df.iloc[i]
         region = normalize_region_name(row.iloc[region_col])
@@ -1501,51 +2171,38 @@ def parse_long_format_sheet(df, sheet_name, filename):
                     except:
                         continue
                     if preco_float > 0:
-                        records.append({
-                            'ano': dt.year,
-                            'mes': dt.month,
-                            'periodo': f"{dt.year}-{dt.month:02d}",
-                            'regiao': region,
-                            'categoria': categoria,
-                            'subcategoria': subcategoria,
-                            'produto': produto,
-                            'unidade': unidade,
-                            'preco': preco_float
-                        })
+                        records.append(dt.year, dt.month, region, categoria,
+                                       subcategoria, produto, unidade, preco_float)
 
     return records
 
 
 def parse_old_sheet(df, year, month, sheet_name, filename):
     """Processa planilhas antigas"""
-    records = []
+    records = RecordStore()
 
     long_records = parse_long_format_sheet(df, sheet_name, filename)
     if long_records:
         return long_records
 
-    header_row = find_old_header_row(df)
+    header_row, region_cols = find_old_header_row(df)
     if header_row is None:
         print(f"  Cabecalho nao encontrado em {filename} ({sheet_name})")
         return records
 
-    header = df.iloc[header_row]
-    region_cols = {}
-    for col_idx, val in enumerate(header):
-        region = normalize_region_name(val)
-        if region:
-            region_cols[col_idx] = region
-
     if not region_cols:
         print(f"  Nenhuma regiao encontrada em {filename} ({sheet_name})")
         return records
 
+    first_cols = [_column_values(df, j) for j in range(min(2, df.shape[1]))]
+
+    row_positions = []
+    row_info = []
     for i in range(header_row + 1, len(df)):
-        row = df.iloc[i]
         product_cells = []
-        for j in range(min(2, len(row))):
-            if pd.notna(row.iloc[j]) and str(row.iloc[j]).strip():
-                product_cells.append(str(row.iloc[j]).strip())
+        for values in first_cols:
+            if pd.notna(values[i]) and str(values[i]).strip():
+                product_cells.append(str(values[i]).strip())
         if not product_cells:
             continue
 
@@ -1562,54 +2219,71 @@ def parse_old_sheet(df, year, month, sheet_name, filename):
         if not categoria:
             continue
 
-        for col_idx, regiao in region_cols.items():
-            if col_idx < len(row):
-                preco = row.iloc[col_idx]
-                if pd.notna(preco):
-                    try:
-                        preco_float = float(preco)
-                    except:
-                        continue
-                    if preco_float > 0:
-                        records.append({
-                            'ano': year,
-                            'mes': month,
-                            'periodo': f"{year}-{month:02d}",
-                            'regiao': regiao,
-                            'categoria': categoria,
-                            'subcategoria': subcategoria,
-                            'produto': produto,
-                            'unidade': unidade,
-                            'preco': preco_float
-                        })
+        row_positions.append(i)
+        row_info.append((categoria, subcategoria, produto, unidade))
 
+    records.extend(extract_region_prices(
+        df, year, month, row_positions, row_info, list(region_cols.items())
+    ))
     return records
 
 
+def open_workbook(filepath):
+    """Abre a pasta de trabalho, recorrendo ao xlrd se o engine padrao falhar"""
+    start = time.perf_counter()
+    try:
+        xl = pd.ExcelFile(filepath)
+    except:
+        xl = pd.ExcelFile(filepath, engine='xlrd')
+    if PROFILE_ENABLED:
+        add_time(f'leitura_{xl.engine}', time.perf_counter() - start)
+    return xl
+
+
+def iter_workbook_sheets(xl, filepath, failed=None):
+    """
+    Gera (aba, DataFrame) para cada aba a partir de uma pasta ja aberta,
+    sem decodificar o arquivo novamente. Abas que falham no engine padrao
+    sao relidas de uma segunda pasta aberta com xlrd (tambem uma unica vez);
+    as que falham nos dois sao puladas e anotadas em failed.
+    """
+    fallback = None
+    try:
+        for sheet_name in xl.sheet_names:
+            try:
+                try:
+                    with profiled(f'leitura_{xl.engine}'):
+                        df = xl.parse(sheet_name, header=None)
+                except:
+                    with profiled('leitura_xlrd'):
+                        if fallback is None:
+                            fallback = pd.ExcelFile(filepath, engine='xlrd')
+                        df = fallback.parse(sheet_name, header=None)
+            except Exception as e:
+                print(f"  Erro ao ler {filepath} ({sheet_name}): {e}")
+                if failed is not None:
+                    failed.append(sheet_name)
+                continue
+            yield sheet_name, df
+    finally:
+        if fallback is not None:
+            fallback.close()
+
+
 def parse_old_excel(filepath, year, month):
     """Processa arquivos Excel antigos"""
-    records = []
+    records = RecordStore()
 
     try:
-        try:
-            xl = pd.ExcelFile(filepath)
-        except:
-            xl = pd.ExcelFile(filepath, engine='xlrd')
+        xl = open_workbook(filepath)
     except Exception as e:
-        print(f"  Erro ao ler {filepath}: {e}")
-        return records
-
-    for sheet_name in xl.sheet_names:
-        try:
-            try:
-                df = pd.read_excel(filepath, sheet_name=sheet_name, header=None)
-            except:
-                df = pd.read_excel(filepath, sheet_name=sheet_name, header=None, engine='xlrd')
-        except Exception as e:
-            print(f"  Erro ao ler {filepath} ({sheet_name}): {e}")
-            continue
+        raise ReadError(f"Erro ao ler {filepath.name}: {e}") from e
 
-        records.extend(parse_old_sheet(df, year, month, sheet_name, filepath.name))
+    failed = []
+    with xl:
+        for sheet_name, df in iter_workbook_sheets(xl, filepath, failed):
+            records.extend(parse_old_sheet(df, year, month, sheet_name, filepath.name))
+    records.incomplete = bool(failed)
 
     return records
 
@@ -1618,20 +2292,113 @@ def parse_old_excel(filepath, year, month):
 # PROCESSAMENTO DE PDF
 # =============================================================================
 
+# Extracao de tabelas de PDF: processos por pagina (0 = todos os nucleos) e
+# cache das tabelas brutas, independente da versao dos parsers
+PDF_PAGE_JOBS = 1
+PDF_TABLE_CACHE = True
+
+
+def configure_pdf_extraction(jobs=None, use_cache=None):
+    """Ajusta o paralelismo por pagina e o uso do cache de tabelas de PDF"""
+    global PDF_PAGE_JOBS, PDF_TABLE_CACHE
+    if jobs is not None:
+        PDF_PAGE_JOBS = jobs
+    if use_cache is not None:
+        PDF_TABLE_CACHE = use_cache
+
+
+def pdf_table_cache_path(digest, page_number):
+    """
+    Entrada de cache das tabelas brutas de uma pagina.
+    A chave e o hash do arquivo + numero da pagina: mudancas em classify_product
+    ou nos mapeamentos nao exigem nova extracao.
+    """
+    return PDF_TABLES_DIR / digest / f"{page_number:04d}.json"
+
+
+def load_cached_pdf_tables(digest, page_number):
+    """Retorna as tabelas em cache da pagina ou None"""
+    path = pdf_table_cache_path(digest, page_number)
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except Exception:
+        return None
+    if entry.get('pdfplumber') != pdfplumber.__version__:
+        return None
+    return entry['tables']
+
+
+def save_cached_pdf_tables(digest, page_number, tables):
+    path = pdf_table_cache_path(digest, page_number)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'pdfplumber': pdfplumber.__version__, 'tables': tables}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _extract_pdf_pages(filepath, page_numbers):
+    """Extrai as tabelas das paginas indicadas (executado nos workers)"""
+    with pdfplumber.open(filepath) as pdf:
+        return [(n, pdf.pages[n].extract_tables() or []) for n in page_numbers]
+
+
+def extract_pdf_tables(filepath):
+    """
+    Tabelas brutas do PDF em ordem de pagina.
+    Paginas ausentes do cache sao extraidas em paralelo (PDF_PAGE_JOBS processos),
+    cada processo com um bloco contiguo de paginas.
+    """
+    digest = file_hash(filepath) if PDF_TABLE_CACHE else None
+    with profiled('leitura_pdfplumber'):
+        with pdfplumber.open(filepath) as pdf:
+            n_pages = len(pdf.pages)
+
+    pages = {}
+    if digest:
+        with profiled('leitura_cache_pdf'):
+            for n in range(n_pages):
+                tables = load_cached_pdf_tables(digest, n)
+                if tables is not None:
+                    pages[n] = tables
+
+    missing = [n for n in range(n_pages) if n not in pages]
+    jobs = min(PDF_PAGE_JOBS or os.cpu_count() or 1, len(missing))
+    with profiled('leitura_pdfplumber'):
+        if jobs <= 1:
+            extracted = _extract_pdf_pages(filepath, missing) if missing else []
+        else:
+            size = -(-len(missing) // jobs)
+            chunks = [missing[i:i + size] for i in range(0, len(missing), size)]
+            with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+                extracted = [item for result in executor.map(
+                    _extract_pdf_pages, [filepath] * len(chunks), chunks
+                ) for item in result]
+
+    for n, tables in extracted:
+        pages[n] = tables
+        if digest:
+            save_cached_pdf_tables(digest, n, tables)
+
+    return [table for n in range(n_pages) for table in pages[n]]
+
+
 def parse_pdf(filepath, year, month):
     """Processa arquivos PDF com tabelas"""
-    records = []
+    records = RecordStore()
 
     if pdfplumber is None:
-        print(f"  pdfplumber nao instalado - ignorando {filepath.name}")
-        return records
+        raise ReadError(f"pdfplumber nao instalado - {filepath.name} nao pode ser lido")
 
     def parse_pdf_table(table):
         if not table or len(table) < 2:
-            return []
+            return RecordStore()
 
         regions = [r for r in REGIOES if r != 'Pitanga'] + ['Media Estado']
-        out = []
+        out = RecordStore()
         for row in table[1:]:
             if not row or len(row) < 2:
                 continue
@@ -1653,189 +2420,1141 @@ def parse_pdf(filepath, year, month):
                 preco = parse_price(row[i + 2])
                 if preco is None or preco <= 0:
                     continue
-                out.append({
-                    'ano': year,
-                    'mes': month,
-                    'periodo': f"{year}-{month:02d}",
-                    'regiao': regions[i],
-                    'categoria': categoria,
-                    'subcategoria': subcategoria,
-                    'produto': produto,
-                    'unidade': unidade,
-                    'preco': preco
-                })
+                out.append(year, month, regions[i], categoria,
+                           subcategoria, produto, unidade, preco)
         return out
 
     try:
-        with pdfplumber.open(filepath) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables() or []
-                for table in tables:
-                    records.extend(parse_pdf_table(table))
+        tables = extract_pdf_tables(filepath)
     except Exception as e:
-        print(f"  Erro ao ler {filepath}: {e}")
+        raise ReadError(f"Erro ao ler {filepath.name}: {e}") from e
+    for table in tables:
+        records.extend(parse_pdf_table(table))
 
     return records
 
 
 # =============================================================================
-# PROCESSAMENTO PRINCIPAL
+# CACHE DE PARSING POR ARQUIVO
 # =============================================================================
 
-def process_all_files():
-    """Processa todos os arquivos de entrada"""
-    all_records = []
+_PARSER_FINGERPRINT = None
+
+
+# Distribuicoes dos engines de leitura: uma versao diferente (ou a instalacao
+# de um ausente) pode mudar o que e extraido de um arquivo
+READER_DISTRIBUTIONS = ('pandas', 'pdfplumber', 'xlrd', 'openpyxl', 'odfpy')
+
+
+def reader_versions():
+    """{distribuicao: versao instalada ou None}"""
+    from importlib import metadata
+    versions = {}
+    for name in READER_DISTRIBUTIONS:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def parser_fingerprint():
+    """
+    Identifica a versao dos parsers, mapeamentos e engines de leitura.
+    Usa o hash do proprio codigo-fonte: qualquer alteracao em parsers,
+    PRODUCT_MAPPING ou regioes invalida as entradas de cache, assim como
+    instalar ou atualizar pdfplumber/xlrd/openpyxl/odfpy.
+    """
+    global _PARSER_FINGERPRINT
+    if _PARSER_FINGERPRINT is None:
+        digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+        digest.update(Path(__file__).read_bytes())
+        digest.update(json.dumps(reader_versions(), sort_keys=True).encode())
+        _PARSER_FINGERPRINT = digest.hexdigest()
+    return _PARSER_FINGERPRINT
+
+
+def file_hash(filepath):
+    """Hash sha256 do conteudo do arquivo"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(filepath, year, month):
+    """Chave de cache: conteudo do arquivo + data do boletim + versao dos parsers"""
+    raw = f"{parser_fingerprint()}:{file_hash(filepath)}:{year}:{month}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def load_cached_records(key):
+    """Retorna os registros em cache ou None"""
+    path = CACHE_DIR / f"{key}.json"
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return RecordStore.from_columns(json.load(f)['records'])
+    except Exception:
+        return None
 
+
+def save_cached_records(key, filepath, records):
+    """Grava os registros extraidos de um arquivo no cache"""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = CACHE_DIR / f"{key}.json"
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'arquivo': filepath.name, 'records': records.to_columns()}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def evict_stale_cache(keep_keys):
+    """Remove entradas de cache que nao correspondem aos arquivos atuais"""
+    if not CACHE_DIR.exists():
+        return 0
+    removed = 0
+    for path in CACHE_DIR.glob('*.json'):
+        if path.stem not in keep_keys:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def evict_stale_pdf_tables(keep_digests):
+    """Remove as tabelas de PDF em cache de arquivos que nao estao mais na entrada"""
+    if not PDF_TABLES_DIR.exists():
+        return 0
+    removed = 0
+    for path in PDF_TABLES_DIR.iterdir():
+        if path.is_dir() and path.name not in keep_digests:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+# =============================================================================
+# PROCESSAMENTO PRINCIPAL
+# =============================================================================
+
+def list_input_files(data_dir=None):
+    """Lista os arquivos de entrada em ordem, com ano e mes extraidos do nome"""
+    data_dir = data_dir or DATA_DIR
     extensions = ['.xlsx', '.xls', '.ods', '.pdf']
     files = []
     for ext in extensions:
-        files.extend(DATA_DIR.glob(f'*{ext}'))
+        files.extend(data_dir.glob(f'*{ext}'))
 
     # Exclui o arquivo de produtos
     files = [f for f in files if 'products_all_years' not in f.name.lower()]
 
     print(f"Encontrados {len(files)} arquivos para processar")
 
+    entries = []
     for filepath in sorted(files):
-        filename = filepath.name
-        year, month = extract_date_from_filename(filename)
-
+        year, month = extract_date_from_filename(filepath.name)
         if not year:
-            print(f"  Ignorando {filename} - nao foi possivel extrair data")
+            print(f"  Ignorando {filepath.name} - nao foi possivel extrair data")
             continue
+        entries.append((filepath, year, month))
+    return entries
+
+
+def select_parser(filepath, year):
+    """Parser correspondente ao layout do arquivo"""
+    filename = filepath.name.lower()
+    if filepath.suffix.lower() == '.pdf':
+        return parse_pdf
+    if year >= 2018 or 'compilacao' in filename or 'compilação' in filename:
+        return parse_modern_excel
+    return parse_old_excel
+
+
+def parse_file(filepath, year, month):
+    """Despacha o arquivo para o parser correspondente ao seu layout"""
+    return select_parser(filepath, year)(filepath, year, month)
+
+
+def _parse_file_job(filepath, year, month):
+    """Processa um arquivo sem propagar excecoes (executado nos workers)"""
+    start = begin_file_profile()
+    try:
+        result = parse_file(filepath, year, month), None
+    except Exception as e:
+        result = RecordStore(), f"{type(e).__name__}: {e}"
+    end_file_profile(filepath, year, result[0], start)
+    return result
+
+
+def _parse_file_worker(filepath, year, month):
+    """
+    Como _parse_file_job, devolvendo tambem o trabalho de memoizacao e o
+    perfil do arquivo registrados no worker
+    """
+    before = memo_counters()
+    records, error = _parse_file_job(filepath, year, month)
+    return records, error, (before, memo_counters()), take_file_profiles()
+
 
-        print(f"Processando {filename} ({year}-{month:02d})...")
+def _init_parse_worker(pdf_table_cache, profile):
+    # Os arquivos ja ocupam os processos: paginas de PDF sao lidas em sequencia
+    configure_pdf_extraction(1, pdf_table_cache)
+    configure_profiling(profile)
+
+
+def iter_parsed_files(entries, jobs=1):
+    """
+    Gera (filepath, year, month, records, erro) na mesma ordem de entries.
+    Com jobs > 1 os arquivos sao processados em um pool de processos.
+    """
+    if jobs <= 1 or len(entries) <= 1:
+        for filepath, year, month in entries:
+            yield (filepath, year, month) + _parse_file_job(filepath, year, month)
+        return
 
-        if filepath.suffix.lower() == '.pdf':
-            records = parse_pdf(filepath, year, month)
-        elif year >= 2018 or 'compilacao' in filename.lower() or 'compilação' in filename.lower():
-            records = parse_modern_excel(filepath, year, month)
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_parse_worker,
+        initargs=(PDF_TABLE_CACHE, PROFILE_ENABLED)
+    ) as executor:
+        results = executor.map(
+            _parse_file_worker,
+            [e[0] for e in entries], [e[1] for e in entries], [e[2] for e in entries]
+        )
+        for (filepath, year, month), (records, error, counters, profiles) in zip(entries, results):
+            merge_memo_counters(*counters)
+            _FILE_PROFILES.extend(profiles)
+            yield filepath, year, month, records, error
+
+
+def iter_processed_files(jobs=1, data_dir=None, use_cache=True, rebuild_cache=False):
+    """
+    Processa os arquivos de entrada gerando (filepath, records) em ordem.
+    Com use_cache, arquivos ja processados sao lidos do cache; rebuild_cache
+    ignora as entradas existentes e reprocessa tudo.
+    """
+    failures = []
+
+    entries = list_input_files(data_dir)
+
+    keys = {}
+    cached = set()
+    if use_cache:
+        for filepath, year, month in entries:
+            key = cache_key(filepath, year, month)
+            keys[filepath] = key
+            if not rebuild_cache and (CACHE_DIR / f"{key}.json").exists():
+                cached.add(filepath)
+
+    # Entradas em cache so sao carregadas quando consumidas
+    pending = [e for e in entries if e[0] not in cached]
+    parsed = iter_parsed_files(pending, jobs)
+
+    for filepath, year, month in entries:
+        print(f"Processando {filepath.name} ({year}-{month:02d})...")
+        if filepath in cached:
+            start = begin_file_profile()
+            records = load_cached_records(keys[filepath])
+            if records is not None:
+                end_file_profile(filepath, year, records, start, origem='cache')
+                print(f"  -> {len(records)} registros extraidos (cache)")
+                yield filepath, records
+                continue
+            records, error = _parse_file_job(filepath, year, month)
         else:
-            records = parse_old_excel(filepath, year, month)
+            _, _, _, records, error = next(parsed)
 
+        if error:
+            print(f"  Erro ao processar {filepath.name}: {error}")
+            failures.append((filepath.name, error))
+            continue
         print(f"  -> {len(records)} registros extraidos")
+        if use_cache:
+            if records.incomplete:
+                print("  Leitura parcial - resultado nao gravado no cache")
+            else:
+                save_cached_records(keys[filepath], filepath, records)
+        yield filepath, records
+
+    if use_cache:
+        removed = evict_stale_cache(set(keys.values()))
+        if removed:
+            print(f"  {removed} entrada(s) de cache obsoleta(s) removida(s)")
+    if use_cache and PDF_TABLE_CACHE:
+        removed = evict_stale_pdf_tables(
+            {file_hash(filepath) for filepath, _, _ in entries if filepath.suffix.lower() == '.pdf'}
+        )
+        if removed:
+            print(f"  tabelas de {removed} PDF(s) fora da entrada removidas do cache")
+
+    if failures:
+        print(f"\n{len(failures)} arquivo(s) com falha:")
+        for filename, error in failures:
+            print(f"  {filename}: {error}")
+
+
+def process_all_files(jobs=1, data_dir=None, use_cache=True, rebuild_cache=False):
+    """Processa todos os arquivos de entrada em um unico RecordStore"""
+    all_records = RecordStore()
+    for _, records in iter_processed_files(jobs, data_dir, use_cache, rebuild_cache):
         all_records.extend(records)
-
     return all_records
 
 
-def generate_aggregations(records):
-    """Gera agregacoes dos dados"""
-    df = pd.DataFrame(records)
-
-    if df.empty:
-        return {}
-
-    periodos = sorted(df['periodo'].unique().tolist())
-    anos = sorted(df['ano'].unique().tolist())
-    regioes = sorted(df['regiao'].unique().tolist())
-    categorias = sorted(df['categoria'].unique().tolist())
+def build_dimension_tree(cells):
+    """
+    Monta {categoria: [subcategorias]} e {categoria: {subcategoria: [produtos]}}
+    em uma unica passada pelas chaves das celulas do cubo (linear no numero de celulas).
+    """
+    tree = {}
+    for _, _, categoria, subcategoria, produto in cells:
+        tree.setdefault(categoria, {}).setdefault(subcategoria, set()).add(produto)
 
     subcategorias = {}
-    for cat in categorias:
-        subcategorias[cat] = sorted(df[df['categoria'] == cat]['subcategoria'].unique().tolist())
-
     produtos = {}
-    for cat in categorias:
-        produtos[cat] = {}
-        for subcat in subcategorias.get(cat, []):
-            produtos[cat][subcat] = sorted(
-                df[(df['categoria'] == cat) & (df['subcategoria'] == subcat)]['produto'].unique().tolist()
-            )
+    for cat in sorted(tree):
+        subcategorias[cat] = sorted(tree[cat])
+        produtos[cat] = {subcat: sorted(tree[cat][subcat]) for subcat in subcategorias[cat]}
+    return subcategorias, produtos
 
-    stats = {
-        'total_registros': len(df),
-        'periodo_inicio': periodos[0] if periodos else f"{min(anos)}-01",
-        'periodo_fim': periodos[-1] if periodos else f"{max(anos)}-12",
-        'total_anos': len(anos),
-        'total_regioes': len([r for r in regioes if r != 'Media Estado']),
-        'total_categorias': len(categorias),
-        'total_produtos': df['produto'].nunique()
-    }
 
-    ultimo_periodo = df['periodo'].max()
-    df_ultimo = df[df['periodo'] == ultimo_periodo]
-    precos_medios = df_ultimo.groupby('categoria')['preco'].mean().to_dict()
+# =============================================================================
+# CUBO DE AGREGACAO
+# =============================================================================
+
+CUBE_DIMENSIONS = ('periodo', 'regiao', 'categoria', 'subcategoria', 'produto')
+CUBE_MEASURES = ('soma', 'contagem', 'minimo', 'maximo')
+
+# Niveis materializados: com e sem regiao, em cada nivel da hierarquia de produtos
+CUBE_LEVELS = [
+    ('periodo', 'regiao', 'categoria', 'subcategoria', 'produto'),
+    ('periodo', 'regiao', 'categoria', 'subcategoria'),
+    ('periodo', 'regiao', 'categoria'),
+    ('periodo', 'regiao'),
+    ('periodo', 'categoria', 'subcategoria', 'produto'),
+    ('periodo', 'categoria', 'subcategoria'),
+    ('periodo', 'categoria'),
+    ('periodo',),
+]
+
 
+def build_cube(cells):
+    """
+    Materializa os niveis de CUBE_LEVELS a partir das celulas do nivel mais fino.
+    Cada celula traz estatisticas combinaveis (soma, contagem, minimo, maximo):
+    a media e soma/contagem, e celulas de niveis diferentes podem ser somadas.
+    """
+    levels = {}
+    for dims in CUBE_LEVELS:
+        grouped = cells.groupby(list(dims), sort=True).agg(
+            soma=('soma', 'sum'),
+            contagem=('contagem', 'sum'),
+            minimo=('minimo', 'min'),
+            maximo=('maximo', 'max'),
+        ).reset_index()
+        levels['|'.join(dims)] = {
+            'colunas': list(dims) + list(CUBE_MEASURES),
+            'linhas': grouped[list(dims) + list(CUBE_MEASURES)].values.tolist(),
+        }
     return {
-        'anos': anos,
-        'regioes': regioes,
-        'categorias': categorias,
-        'subcategorias': subcategorias,
-        'produtos': produtos,
-        'stats': stats,
-        'precos_medios_ultimo': precos_medios,
-        'ultimo_periodo': ultimo_periodo
+        'dimensoes': list(CUBE_DIMENSIONS),
+        'medidas': list(CUBE_MEASURES),
+        'niveis': levels,
     }
 
 
-def generate_nomenclature_review(records):
-    """Gera planilha de combinacoes para padronizacao manual"""
-    df = pd.DataFrame(records)
-    if df.empty:
-        return
+NOMENCLATURE_COLUMNS = ['ano', 'categoria', 'subcategoria', 'produto', 'unidade']
+
+
+NOMENCLATURE_OUTPUTS = (BASE_DIR / "nomenclatura_revisao.xlsx", BASE_DIR / "nomenclatura_revisao.csv")
 
-    cols = ['ano', 'categoria', 'subcategoria', 'produto', 'unidade']
-    review = df[cols].drop_duplicates().sort_values(cols)
-    output_path = BASE_DIR / "nomenclatura_revisao.xlsx"
+
+def write_nomenclature_review(review):
+    """
+    Grava a planilha de revisao (xlsx, ou csv se o Excel falhar). Remove a
+    versao no outro formato, para que so exista a da execucao atual.
+    """
+    output_path, fallback = NOMENCLATURE_OUTPUTS
 
     try:
         review.to_excel(output_path, index=False)
+        fallback.unlink(missing_ok=True)
         print(f"  -> nomenclatura_revisao.xlsx ({len(review)} linhas)")
     except Exception as e:
-        fallback = BASE_DIR / "nomenclatura_revisao.csv"
         review.to_csv(fallback, index=False, encoding='utf-8')
+        output_path.unlink(missing_ok=True)
         print(f"  -> nomenclatura_revisao.csv ({len(review)} linhas) - {e}")
 
 
-def main():
-    print("=" * 60)
-    print("Preprocessamento de Precos Florestais - DERAL/SEAB PR")
-    print("Versao 2025 - Mapeamento Integrado")
-    print("=" * 60)
+# =============================================================================
+# SAIDA INCREMENTAL
+# Os registros sao gravados e agregados a medida que cada arquivo e processado
+# =============================================================================
 
-    records = process_all_files()
+class OutputWriter(ABC):
+    """
+    Base dos escritores incrementais: gravam em arquivos temporarios que so
+    substituem os finais quando a escrita termina sem erro.
+    """
+    closed = False
+    # Nome da etapa no perfil de execucao
+    stage = 'escrita'
+
+    @abstractmethod
+    def close(self):
+        """Finaliza a escrita e substitui o arquivo final"""
+
+    @abstractmethod
+    def abort(self):
+        """Descarta os arquivos temporarios"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.closed:
+            return
+        if exc_type is None:
+            with stage_timer(self.stage):
+                self.close()
+        else:
+            self.abort()
 
-    if not records:
-        print("Nenhum registro encontrado!")
+
+class DetailedJsonWriter(OutputWriter):
+    """
+    Escreve detailed.json como array JSON, um RecordStore por vez.
+    Mantem a contagem de registros e o sha256 do conteudo gravado.
+    """
+    stage = 'escrita_detailed_json'
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.count = 0
+        self._digest = hashlib.sha256()
+        self._tmp_path = self.path.with_name(self.path.name + '.tmp')
+        self._f = open(self._tmp_path, 'wb')
+        self._write('[')
+
+    def _write(self, text):
+        data = text.encode('utf-8')
+        self._digest.update(data)
+        self._f.write(data)
+
+    def write(self, records):
+        for rec in records.iter_json():
+            if self.count:
+                self._write(', ')
+            self._write(rec)
+            self.count += 1
+
+    @property
+    def sha256(self):
+        return self._digest.hexdigest()
+
+    def close(self):
+        self._write(']')
+        self._f.close()
+        os.replace(self._tmp_path, self.path)
+        self.closed = True
+
+    def abort(self):
+        self._f.close()
+        self._tmp_path.unlink(missing_ok=True)
+        self.closed = True
+
+
+def _slug(text):
+    """Nome de arquivo seguro a partir de um rotulo ('Madeira Serrada' -> 'madeira-serrada')"""
+    text = unicodedata.normalize('NFD', str(text))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-') or 'sem-nome'
+
+
+class ShardedJsonWriter(OutputWriter):
+    """
+    Exporta os registros particionados por categoria (e opcionalmente por ano)
+    em OUTPUT_DIR/shards, com um manifest.json contendo, para cada particao,
+    numero de registros, intervalo de periodos e sha256 do conteudo.
+    """
+    stage = 'escrita_shards'
+
+    def __init__(self, output_dir, by_ano=False):
+        self.path = Path(output_dir) / 'shards'
+        self.by_ano = by_ano
+        self._tmp_dir = self.path.with_name('shards.tmp')
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+        self._tmp_dir.mkdir(parents=True)
+        self._shards = {}
+
+    def _shard_path(self, categoria, ano):
+        if ano is None:
+            return f"{_slug(categoria)}.json"
+        return f"{_slug(categoria)}/{ano}.json"
+
+    def write(self, records):
+        groups = {}
+        codes = records.codes
+        if self.by_ano:
+            keys = zip(codes['categoria'], records.ano)
+        else:
+            keys = ((c, None) for c in codes['categoria'])
+        for i, key in enumerate(keys):
+            groups.setdefault(key, []).append(i)
+
+        categorias = records.values['categoria']
+        for (cat_code, ano), indices in groups.items():
+            part = records.take(indices)
+            key = (categorias[cat_code], ano)
+            shard = self._shards.get(key)
+            if shard is None:
+                rel_path = self._shard_path(*key)
+                (self._tmp_dir / rel_path).parent.mkdir(parents=True, exist_ok=True)
+                shard = self._shards[key] = {
+                    'writer': DetailedJsonWriter(self._tmp_dir / rel_path),
+                    'arquivo': rel_path,
+                    'periodos': set(),
+                }
+            shard['writer'].write(part)
+            shard['periodos'].update(part.values['periodo'])
+
+    def manifest(self):
+        shards = []
+        for (categoria, ano), shard in sorted(self._shards.items(), key=lambda x: x[1]['arquivo']):
+            periodos = sorted(shard['periodos'])
+            shards.append({
+                'arquivo': shard['arquivo'],
+                'categoria': categoria,
+                'ano': ano,
+                'registros': shard['writer'].count,
+                'periodo_inicio': periodos[0],
+                'periodo_fim': periodos[-1],
+                'sha256': shard['writer'].sha256,
+            })
+        return {
+            'particoes': ['categoria', 'ano'] if self.by_ano else ['categoria'],
+            'total_registros': sum(s['registros'] for s in shards),
+            'shards': shards,
+        }
+
+    def close(self):
+        for shard in self._shards.values():
+            shard['writer'].close()
+        with open(self._tmp_dir / 'manifest.json', 'w', encoding='utf-8') as f:
+            json.dump(self.manifest(), f, ensure_ascii=False, indent=2)
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self._tmp_dir, self.path)
+        self.closed = True
+
+    def abort(self):
+        for shard in self._shards.values():
+            shard['writer'].abort()
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+        self.closed = True
+
+
+class DetailedArrowWriter(OutputWriter):
+    """
+    Escreve a tabela de precos em Arrow IPC (detailed.arrow, mapeavel em memoria)
+    e Parquet (detailed.parquet), um lote por RecordStore.
+    """
+    stage = 'escrita_arrow'
+
+    def __init__(self, output_dir):
+        self.paths = [Path(output_dir) / 'detailed.arrow', Path(output_dir) / 'detailed.parquet']
+        self._tmp_paths = [p.with_name(p.name + '.tmp') for p in self.paths]
+        import pyarrow.ipc
+        import pyarrow.parquet as pq
+        self._ipc = pa.ipc.new_file(str(self._tmp_paths[0]), arrow_schema())
+        self._parquet = pq.ParquetWriter(str(self._tmp_paths[1]), arrow_schema())
+
+    def write(self, records):
+        if not len(records):
+            return
+        batch = records.to_arrow()
+        self._ipc.write_batch(batch)
+        self._parquet.write_batch(batch)
+
+    def close(self):
+        self._ipc.close()
+        self._parquet.close()
+        for tmp_path, path in zip(self._tmp_paths, self.paths):
+            os.replace(tmp_path, path)
+        self.closed = True
+
+    def abort(self):
+        self._ipc.close()
+        self._parquet.close()
+        for tmp_path in self._tmp_paths:
+            tmp_path.unlink(missing_ok=True)
+        self.closed = True
+
+
+class AggregationAccumulator:
+    """
+    Contadores atualizados arquivo a arquivo que geram aggregated.json, cube.json
+    e a planilha de nomenclatura sem manter os registros em memoria.
+
+    Guarda tambem a contribuicao de cada arquivo de origem (na ordem das linhas
+    de detailed.json), para que --append substitua apenas o boletim reprocessado.
+    """
+
+    def __init__(self):
+        self.total = 0
+        # (periodo, regiao, categoria, subcategoria, produto) -> [soma, contagem, minimo, maximo];
+        # tambem fornecem os precos medios do ultimo periodo por categoria
+        self.cells = {}
+        self.anos_periodo = {}
+        # (periodo, categoria, subcategoria, produto, unidade)
+        self.nomenclature = set()
+        # nome do arquivo -> AggregationAccumulator so com os registros dele;
+        # None para registros de origem desconhecida (lidos de detailed.json)
+        self.sources = {}
+
+    def update(self, records, source=None):
+        """Acumula um RecordStore vindo do arquivo source"""
+        partial = AggregationAccumulator()
+        partial._add(records)
+        contribution = self.sources.get(source)
+        if contribution is None:
+            contribution = self.sources[source] = AggregationAccumulator()
+        contribution.merge(partial)
+        self.merge(partial)
+
+    def _add(self, records):
+        if not len(records):
+            return
+        self.total += len(records)
+        values = records.values
+        codes = records.codes
+
+        periodos = values['periodo']
+        partial = pd.DataFrame(
+            {field: np.frombuffer(codes[field], dtype=np.intc) for field in CUBE_DIMENSIONS}
+        )
+        partial['preco'] = np.frombuffer(records.preco, dtype=np.float64)
+        partial = partial.groupby(list(CUBE_DIMENSIONS), sort=False)['preco'].agg(
+            ['sum', 'count', 'min', 'max']
+        )
+        for (p, r, c, s, pr), soma, contagem, minimo, maximo in zip(
+            partial.index, partial['sum'].tolist(), partial['count'].tolist(),
+            partial['min'].tolist(), partial['max'].tolist()
+        ):
+            key = (periodos[p], values['regiao'][r], values['categoria'][c],
+                   values['subcategoria'][s], values['produto'][pr])
+            self.cells[key] = [soma, contagem, minimo, maximo]
+
+        for p, ano in zip(codes['periodo'], records.ano):
+            self.anos_periodo.setdefault(periodos[p], ano)
+
+        for p, c, s, pr, u in set(zip(codes['periodo'], codes['categoria'], codes['subcategoria'],
+                                      codes['produto'], codes['unidade'])):
+            self.nomenclature.add((periodos[p], values['categoria'][c], values['subcategoria'][s],
+                                   values['produto'][pr], values['unidade'][u]))
+
+    def merge(self, other):
+        """Soma os contadores de other (registros lidos depois dos ja acumulados)"""
+        if not other.total:
+            return
+        self.total += other.total
+        for key, (soma, contagem, minimo, maximo) in other.cells.items():
+            cell = self.cells.get(key)
+            if cell is None:
+                self.cells[key] = [soma, contagem, minimo, maximo]
+            else:
+                cell[0] += soma
+                cell[1] += contagem
+                cell[2] = min(cell[2], minimo)
+                cell[3] = max(cell[3], maximo)
+        for periodo, ano in other.anos_periodo.items():
+            self.anos_periodo.setdefault(periodo, ano)
+        self.nomenclature |= other.nomenclature
+
+    @classmethod
+    def from_sources(cls, sources):
+        """Contadores totais a partir das contribuicoes por arquivo, na ordem dada"""
+        acc = cls()
+        for source, contribution in sources.items():
+            acc.merge(contribution)
+            acc.sources[source] = contribution
+        return acc
+
+    def source_rows(self):
+        """[(arquivo, linha inicial, registros)] na ordem de detailed.json"""
+        rows = []
+        start = 0
+        for source, contribution in self.sources.items():
+            rows.append((source, start, contribution.total))
+            start += contribution.total
+        return rows
+
+    def replace_source(self, source, records, before=None):
+        """
+        Novo acumulador em que a contribuicao de source passa a ser records.
+        Um arquivo ja conhecido mantem sua posicao; um novo entra antes de before
+        (ou no fim). Os totais sao refeitos na ordem dos arquivos, como no
+        processamento completo.
+        """
+        contribution = AggregationAccumulator()
+        contribution._add(records)
+        sources = {}
+        for name, existing in self.sources.items():
+            if name == before and source not in self.sources:
+                sources[source] = contribution
+            sources[name] = contribution if name == source else existing
+        sources.setdefault(source, contribution)
+        return AggregationAccumulator.from_sources(sources)
+
+    def result(self):
+        """Dicionario de aggregated.json"""
+        if not self.total:
+            return {}
+
+        periodos = sorted({cell[0] for cell in self.cells})
+        anos = sorted(set(self.anos_periodo.values()))
+        regioes = sorted({cell[1] for cell in self.cells})
+        subcategorias, produtos = build_dimension_tree(self.cells)
+        categorias = list(subcategorias)
+
+        stats = {
+            'total_registros': self.total,
+            'periodo_inicio': periodos[0] if periodos else f"{min(anos)}-01",
+            'periodo_fim': periodos[-1] if periodos else f"{max(anos)}-12",
+            'total_anos': len(anos),
+            'total_regioes': len([r for r in regioes if r != 'Media Estado']),
+            'total_categorias': len(categorias),
+            'total_produtos': len({cell[4] for cell in self.cells})
+        }
+
+        # Media por categoria no ultimo periodo: soma e contagem das celulas dele
+        ultimo_periodo = periodos[-1]
+        somas, contagens = {}, {}
+        for (periodo, _, categoria, _, _), (soma, contagem, _, _) in self.cells.items():
+            if periodo == ultimo_periodo:
+                somas.setdefault(categoria, []).append(soma)
+                contagens[categoria] = contagens.get(categoria, 0) + contagem
+        precos_medios = {cat: math.fsum(somas[cat]) / contagens[cat] for cat in sorted(somas)}
+
+        return {
+            'anos': anos,
+            'regioes': regioes,
+            'categorias': categorias,
+            'subcategorias': subcategorias,
+            'produtos': produtos,
+            'stats': stats,
+            'precos_medios_ultimo': precos_medios,
+            'ultimo_periodo': ultimo_periodo
+        }
+
+    def to_state(self):
+        """Estado serializavel (JSON): as contribuicoes de cada arquivo"""
+        return {
+            'versao': CACHE_VERSION,
+            'fontes': [
+                [source, contribution._counters_state()]
+                for source, contribution in self.sources.items()
+            ],
+        }
+
+    def _counters_state(self):
+        return {
+            'total': self.total,
+            'cells': [list(key) + stats for key, stats in self.cells.items()],
+            'anos_periodo': self.anos_periodo,
+            'nomenclature': [list(n) for n in self.nomenclature],
+        }
+
+    @classmethod
+    def _from_counters_state(cls, state):
+        acc = cls()
+        acc.total = state['total']
+        acc.cells = {tuple(row[:5]): row[5:] for row in state['cells']}
+        acc.anos_periodo = state['anos_periodo']
+        acc.nomenclature = {tuple(n) for n in state['nomenclature']}
+        return acc
+
+    @classmethod
+    def from_state(cls, state):
+        return cls.from_sources({
+            source: cls._from_counters_state(counters) for source, counters in state['fontes']
+        })
+
+    def save(self, path, detailed_sha256):
+        """Grava os contadores junto do hash do detailed.json que eles descrevem"""
+        state = self.to_state()
+        state['detailed_sha256'] = detailed_sha256
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, detailed_sha256):
+        """Contadores salvos, ou None se ausentes/desatualizados em relacao ao detailed.json"""
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception:
+            return None
+        if state.get('versao') != CACHE_VERSION or state.get('detailed_sha256') != detailed_sha256:
+            return None
+        return cls.from_state(state)
+
+    def cube(self):
+        """Cubo de agregacao (cube.json) a partir das celulas do nivel mais fino"""
+        cells = pd.DataFrame(
+            [key + tuple(stats) for key, stats in self.cells.items()],
+            columns=list(CUBE_DIMENSIONS) + list(CUBE_MEASURES)
+        )
+        return build_cube(cells)
+
+    def nomenclature_review(self):
+        """Combinacoes (ano, categoria, subcategoria, produto, unidade) para padronizacao manual"""
+        rows = {
+            (self.anos_periodo[periodo], categoria, subcategoria, produto, unidade)
+            for periodo, categoria, subcategoria, produto, unidade in self.nomenclature
+        }
+        review = pd.DataFrame(list(rows), columns=NOMENCLATURE_COLUMNS)
+        return review.sort_values(NOMENCLATURE_COLUMNS)
+
+
+def open_record_writers(outputs, args):
+    """Abre os escritores de registros (JSON, Arrow/Parquet e shards) em outputs"""
+    json_writer = outputs.enter_context(DetailedJsonWriter(OUTPUT_DIR / 'detailed.json'))
+    writers = [json_writer]
+    if pa is not None:
+        writers.append(outputs.enter_context(DetailedArrowWriter(OUTPUT_DIR)))
+    if args.shards:
+        writers.append(outputs.enter_context(
+            ShardedJsonWriter(OUTPUT_DIR, by_ano=args.shards == 'categoria-ano')
+        ))
+    return json_writer, writers
+
+
+def write_records(writers, records):
+    """Grava um lote de registros em todos os escritores"""
+    for output in writers:
+        with stage_timer(output.stage):
+            output.write(records)
+
+
+def print_record_outputs(args, total):
+    print(f"  -> detailed.json ({total} registros)")
+    if args.shards:
+        print(f"  -> shards/ (particionado por {args.shards.replace('-', ' e ')}) + manifest.json")
+    if pa is not None:
+        print("  -> detailed.arrow / detailed.parquet")
+    else:
+        print("  pyarrow nao instalado - detailed.arrow/detailed.parquet nao gerados")
+
+
+def rebuild_outputs(args):
+    """Processa todos os boletins e regrava as saidas de registros"""
+    accumulator = AggregationAccumulator()
+    with ExitStack() as outputs:
+        json_writer, writers = open_record_writers(outputs, args)
+
+        for filepath, records in iter_processed_files(
+            jobs=args.jobs, use_cache=not args.no_cache, rebuild_cache=args.rebuild
+        ):
+            write_records(writers, records)
+            with stage_timer('agregacao'):
+                accumulator.update(records, filepath.name)
+
+        if not accumulator.total:
+            for output in writers:
+                output.abort()
+            print("Nenhum registro encontrado!")
+            return None
+
+    print(f"\nTotal de {accumulator.total} registros processados")
+    print_record_outputs(args, accumulator.total)
+    accumulator.detailed_sha256 = json_writer.sha256
+    return accumulator
+
+
+def iter_existing_records():
+    """Gera os registros ja publicados, em lotes (detailed.arrow ou detailed.json)"""
+    arrow_path = OUTPUT_DIR / 'detailed.arrow'
+    if pa is not None and arrow_path.exists():
+        import pyarrow.ipc
+        with pa.memory_map(str(arrow_path), 'r') as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield RecordStore.from_arrow(reader.get_batch(i))
         return
 
-    print(f"\nTotal de {len(records)} registros processados")
+    with open(OUTPUT_DIR / 'detailed.json', 'r', encoding='utf-8') as f:
+        yield RecordStore.from_dicts(json.load(f))
+
 
-    print("\nGerando agregacoes...")
-    aggregations = generate_aggregations(records)
+def splice_records(batches, drop_start, drop_end, insert_at, records):
+    """
+    Gera os lotes de batches (linhas de detailed.json, em ordem) sem as linhas
+    [drop_start, drop_end) e com records inserido antes da linha insert_at.
+    """
+    offset = 0
+    inserted = False
+    for batch in batches:
+        start, end = offset, offset + len(batch)
+        offset = end
+        cuts = sorted({start, end} | {b for b in (drop_start, drop_end, insert_at) if start < b < end})
+        for lo, hi in zip(cuts, cuts[1:]):
+            if lo == insert_at and not inserted:
+                inserted = True
+                yield records
+            if drop_start <= lo and hi <= drop_end:
+                continue
+            yield batch if (lo, hi) == (start, end) else batch.take(range(lo - start, hi - start))
+    if not inserted:
+        yield records
 
-    print("\nGerando planilha de nomenclatura...")
-    generate_nomenclature_review(records)
 
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+def append_bulletin(filepath, args):
+    """
+    Modo --append: processa apenas o boletim novo e o incorpora as saidas.
+    Se o arquivo ja fazia parte das saidas, apenas os registros e as celulas de
+    agregacao vindos dele sao substituidos (varios boletins podem cobrir o mesmo
+    periodo); um arquivo novo entra na posicao que teria no processamento completo.
+    Os contadores salvos na ultima execucao sao atualizados em vez de recalculados.
+    """
+    detailed_path = OUTPUT_DIR / 'detailed.json'
+    if not detailed_path.exists():
+        print(f"{detailed_path} nao encontrado - execute o processamento completo primeiro")
+        return None
 
-    print("\nSalvando arquivos JSON...")
-    with open(OUTPUT_DIR / 'detailed.json', 'w', encoding='utf-8') as f:
-        json.dump(records, f, ensure_ascii=False, indent=None)
-    print(f"  -> detailed.json ({len(records)} registros)")
+    year, month = extract_date_from_filename(filepath.name)
+    if not year:
+        print(f"  Ignorando {filepath.name} - nao foi possivel extrair data")
+        return None
+    in_data_dir = filepath.resolve().parent == DATA_DIR.resolve()
+    if not in_data_dir:
+        print(f"  Aviso: {filepath.name} nao esta em {DATA_DIR}; "
+              "o proximo processamento completo nao o incluira")
+
+    accumulator = AggregationAccumulator.load(STATE_PATH, file_hash(detailed_path))
+    if accumulator is None or None in accumulator.sources:
+        # Sem a contribuicao de cada arquivo nao ha como substituir so este boletim
+        print("  Contadores de agregacao por arquivo ausentes ou desatualizados - "
+              "reprocessando todos os boletins")
+        accumulator = rebuild_outputs(args)
+        if accumulator is None or in_data_dir:
+            return accumulator
+
+    print(f"Processando {filepath.name} ({year}-{month:02d})...")
+    records, error = _parse_file_job(filepath, year, month)
+    if error:
+        print(f"  Erro ao processar {filepath.name}: {error}")
+        return None
+    print(f"  -> {len(records)} registros extraidos")
+    if not len(records):
+        print("Nenhum registro encontrado!")
+        return None
+    if not args.no_cache and not records.incomplete:
+        save_cached_records(cache_key(filepath, year, month), filepath, records)
+
+    source = filepath.name
+    rows = accumulator.source_rows()
+    total_rows = rows[-1][1] + rows[-1][2] if rows else 0
+    known = {name: (start, start + count) for name, start, count in rows}
+    if source in known:
+        drop_start, drop_end = known[source]
+        insert_at, before = drop_start, None
+    else:
+        # Mesma ordem de list_input_files (nome do arquivo) para arquivos de DATA_DIR
+        following = [(start, name) for name, start, _ in rows if in_data_dir and name > source]
+        insert_at, before = min(following) if following else (total_rows, None)
+        drop_start = drop_end = insert_at
+    with stage_timer('agregacao'):
+        accumulator = accumulator.replace_source(source, records, before)
+
+    with ExitStack() as outputs:
+        json_writer, writers = open_record_writers(outputs, args)
+        for part in splice_records(iter_existing_records(), drop_start, drop_end, insert_at, records):
+            write_records(writers, part)
+
+    replaced = drop_end - drop_start
+    print(f"\n{total_rows - replaced} registros mantidos, {replaced} registros anteriores de "
+          f"{source} substituidos por {len(records)}")
+    print_record_outputs(args, accumulator.total)
+    accumulator.detailed_sha256 = json_writer.sha256
+    return accumulator
+
+
+def load_accumulator():
+    """
+    Contadores de agregacao das saidas ja publicadas (etapas sem ingest):
+    usa o estado salvo se corresponder ao detailed.json, senao recalcula.
+    """
+    detailed_path = OUTPUT_DIR / 'detailed.json'
+    if not detailed_path.exists():
+        print(f"{detailed_path} nao encontrado - execute a etapa ingest primeiro")
+        return None
 
-    with open(OUTPUT_DIR / 'aggregated.json', 'w', encoding='utf-8') as f:
-        json.dump(aggregations, f, ensure_ascii=False, indent=2)
-    print("  -> aggregated.json")
+    digest = file_hash(detailed_path)
+    accumulator = AggregationAccumulator.load(STATE_PATH, digest)
+    if accumulator is None:
+        print("  Contadores de agregacao ausentes ou desatualizados - recalculando")
+        accumulator = AggregationAccumulator()
+        for batch in iter_existing_records():
+            accumulator.update(batch)
+        accumulator.save(STATE_PATH, digest)
+    accumulator.detailed_sha256 = digest
+    return accumulator
+
+
+# Etapas executadas por main; scripts/pipeline.py as chama separadamente
+STAGES = ('ingest', 'aggregate', 'nomenclature')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Preprocessamento dos dados de Precos Florestais - DERAL/SEAB PR"
+    )
+    parser.add_argument(
+        '--jobs', '-j', type=int, default=1,
+        help="numero de processos para leitura dos arquivos (0 = todos os nucleos)"
+    )
+    parser.add_argument(
+        '--pdf-jobs', type=int, default=None,
+        help="processos para extracao de tabelas por pagina de PDF "
+             "(0 = todos os nucleos; padrao: todos quando --jobs 1)"
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help="nao le nem grava o cache de parsing por arquivo nem o de tabelas de PDF"
+    )
+    parser.add_argument(
+        '--rebuild', action='store_true',
+        help="ignora o cache existente e reprocessa todos os arquivos"
+    )
+    parser.add_argument(
+        '--shards', nargs='?', const='categoria', choices=['categoria', 'categoria-ano'],
+        help="exporta tambem os registros particionados em shards/ com manifest.json "
+             "(sem a opcao, um shards/ anterior e removido)"
+    )
+    parser.add_argument(
+        '--append', metavar='ARQUIVO',
+        help="incorpora apenas este boletim as saidas existentes "
+             "(substitui os registros vindos do mesmo arquivo)"
+    )
+    parser.add_argument(
+        '--stage', action='append', choices=STAGES, dest='stages',
+        help="executa apenas esta etapa (pode ser repetido; padrao: todas). "
+             "Sem ingest, usa os registros ja publicados em detailed.json"
+    )
+    parser.add_argument(
+        '--profile', nargs='?', const='', metavar='ARQUIVO',
+        help="grava um relatorio JSON com tempos por arquivo e por etapa "
+             "(padrao: .cache/profiles/preprocess-<data>.json)"
+    )
+    parser.add_argument(
+        '--cache-stats', action='store_true',
+        help="exibe as estatisticas de memoizacao ao final"
+    )
+    args = parser.parse_args(argv)
+    args.stages = set(args.stages or STAGES)
+    if args.append and 'ingest' not in args.stages:
+        parser.error("--append requer a etapa ingest")
+    if args.jobs <= 0:
+        args.jobs = os.cpu_count() or 1
+    if args.pdf_jobs is None:
+        args.pdf_jobs = 0 if args.jobs == 1 else 1
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
 
-    print("\n" + "=" * 60)
-    print("RESUMO")
     print("=" * 60)
-    print(f"Total de registros: {len(records)}")
-    print(f"Periodo: {aggregations.get('stats', {}).get('periodo_inicio', '?')} a {aggregations.get('stats', {}).get('periodo_fim', '?')}")
-    print(f"Anos: {aggregations.get('stats', {}).get('total_anos', 0)}")
-    print(f"Regioes: {aggregations.get('stats', {}).get('total_regioes', 0)}")
-    print(f"Categorias: {aggregations.get('stats', {}).get('total_categorias', 0)}")
-    print(f"Produtos unicos: {aggregations.get('stats', {}).get('total_produtos', 0)}")
-
-    # Mostra categorias e produtos
-    print("\nCATEGORIAS E PRODUTOS:")
-    for cat in sorted(aggregations.get('categorias', [])):
-        print(f"\n  {cat}:")
-        for subcat in sorted(aggregations.get('subcategorias', {}).get(cat, [])):
-            prods = aggregations.get('produtos', {}).get(cat, {}).get(subcat, [])
-            print(f"    {subcat}: {', '.join(sorted(prods))}")
+    print("Preprocessamento de Precos Florestais - DERAL/SEAB PR")
+    print("Versao 2025 - Mapeamento Integrado")
+    print("=" * 60)
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    configure_pdf_extraction(args.pdf_jobs, not args.no_cache)
+    configure_profiling(args.profile is not None)
+    started = time.perf_counter()
+
+    if 'ingest' in args.stages:
+        if pa is None:
+            # Evita que consumidores leiam uma tabela colunar desatualizada
+            for name in ('detailed.arrow', 'detailed.parquet'):
+                (OUTPUT_DIR / name).unlink(missing_ok=True)
+        if not args.shards:
+            # Sem --shards, particoes de uma execucao anterior nao descreveriam
+            # o novo detailed.json (generate_forecasts --categoria as prefere)
+            shutil.rmtree(OUTPUT_DIR / 'shards', ignore_errors=True)
+
+        with stage_timer('ingest'):
+            if args.append:
+                accumulator = append_bulletin(Path(args.append), args)
+            else:
+                accumulator = rebuild_outputs(args)
+        if accumulator is None:
+            return
+        with stage_timer('estado_agregacao'):
+            accumulator.save(STATE_PATH, accumulator.detailed_sha256)
+    else:
+        with stage_timer('estado_agregacao'):
+            accumulator = load_accumulator()
+        if accumulator is None:
+            return
+
+    if 'aggregate' in args.stages:
+        print("\nGerando agregacoes...")
+        with stage_timer('agregacao_final'):
+            aggregations = accumulator.result()
+
+    if 'nomenclature' in args.stages:
+        print("\nGerando planilha de nomenclatura...")
+        with stage_timer('nomenclatura'):
+            write_nomenclature_review(accumulator.nomenclature_review())
+
+    if 'aggregate' in args.stages:
+        print("\nSalvando arquivos JSON...")
+        with stage_timer('escrita_aggregated_json'):
+            with open(OUTPUT_DIR / 'aggregated.json', 'w', encoding='utf-8') as f:
+                json.dump(aggregations, f, ensure_ascii=False, indent=2)
+        print("  -> aggregated.json")
+
+        with stage_timer('cubo'):
+            cube = accumulator.cube()
+        with stage_timer('escrita_cube_json'):
+            with open(OUTPUT_DIR / 'cube.json', 'w', encoding='utf-8') as f:
+                json.dump(cube, f, ensure_ascii=False)
+        print("  -> cube.json")
+
+        print("\n" + "=" * 60)
+        print("RESUMO")
+        print("=" * 60)
+        print(f"Total de registros: {accumulator.total}")
+        print(f"Periodo: {aggregations.get('stats', {}).get('periodo_inicio', '?')} a {aggregations.get('stats', {}).get('periodo_fim', '?')}")
+        print(f"Anos: {aggregations.get('stats', {}).get('total_anos', 0)}")
+        print(f"Regioes: {aggregations.get('stats', {}).get('total_regioes', 0)}")
+        print(f"Categorias: {aggregations.get('stats', {}).get('total_categorias', 0)}")
+        print(f"Produtos unicos: {aggregations.get('stats', {}).get('total_produtos', 0)}")
+
+        # Mostra categorias e produtos
+        print("\nCATEGORIAS E PRODUTOS:")
+        for cat in sorted(aggregations.get('categorias', [])):
+            print(f"\n  {cat}:")
+            for subcat in sorted(aggregations.get('subcategorias', {}).get(cat, [])):
+                prods = aggregations.get('produtos', {}).get(cat, {}).get(subcat, [])
+                print(f"    {subcat}: {', '.join(sorted(prods))}")
+
+    if args.cache_stats:
+        print_memo_stats()
+
+    if args.profile is not None:
+        report = build_profile_report(args, time.perf_counter() - started)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        write_profile_report(report, Path(args.profile) if args.profile
+                             else PROFILES_DIR / f"preprocess-{stamp}.json")
 
     print("\nProcessamento concluido!")
 